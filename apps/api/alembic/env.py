@@ -4,7 +4,7 @@ from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 from sqlmodel import SQLModel
-from app.models import User, PayoutAccount, ParkingLot, ParkingSpot, Amenity, LotAmenity, Review, Booking, SpotAvailability, PricingRule, Payment, OTPVerification, UserPreferences, NotificationSettings, UserSession
+from app.models import User, PayoutAccount, ParkingLot, ParkingSpot, Amenity, LotAmenity, Review, Booking, SpotAvailability, PricingRule, Payment, OTPVerification, UserPreferences, NotificationSettings, UserSession, WebhookEvent, OutboxEvent, CheckInEvent, LotOccupancy, PayoutJob, PayoutTransfer, SellerBalance, LotEarningsDaily, ReconciliationRun, ReconciliationDiscrepancy
 import geoalchemy2
 from alembic import context
 from app.config import settings
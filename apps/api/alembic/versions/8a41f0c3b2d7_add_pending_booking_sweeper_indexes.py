@@ -0,0 +1,40 @@
+"""add_pending_booking_sweeper_indexes
+
+Revision ID: 8a41f0c3b2d7
+Revises: 5c2e7d9a4f10
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8a41f0c3b2d7'
+down_revision: Union[str, Sequence[str], None] = '5c2e7d9a4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_booking_pending_created_at',
+        'booking',
+        ['status', 'created_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+    op.create_index(
+        'ix_spotavailability_booking_id',
+        'spotavailability',
+        ['booking_id'],
+        unique=False,
+        postgresql_where=sa.text('booking_id IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_spotavailability_booking_id', table_name='spotavailability')
+    op.drop_index('ix_booking_pending_created_at', table_name='booking')
@@ -0,0 +1,67 @@
+"""add_payout_job_tables
+
+Revision ID: a3c6e9f2b5d8
+Revises: f5b3d8e1a9c7
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c6e9f2b5d8'
+down_revision: Union[str, Sequence[str], None] = 'f5b3d8e1a9c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('payoutjob',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('triggered_by', sa.Uuid(), nullable=True),
+    sa.Column('cursor', sa.Uuid(), nullable=True),
+    sa.Column('sellers_processed', sa.Integer(), nullable=False),
+    sa.Column('sellers_failed', sa.Integer(), nullable=False),
+    sa.Column('amount_paid', sa.Float(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['triggered_by'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_payoutjob_status'), 'payoutjob', ['status'], unique=False)
+    op.create_table('payouttransfer',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('job_id', sa.Uuid(), nullable=False),
+    sa.Column('seller_id', sa.Uuid(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('payment_ids', sa.JSON(), nullable=True),
+    sa.Column('fund_account_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('idempotency_key', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('payout_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['payoutjob.id'], ),
+    sa.ForeignKeyConstraint(['seller_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_payouttransfer_idempotency_key'), 'payouttransfer', ['idempotency_key'], unique=False)
+    op.create_index('ux_payouttransfer_job_seller', 'payouttransfer', ['job_id', 'seller_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_payouttransfer_job_seller', table_name='payouttransfer')
+    op.drop_index(op.f('ix_payouttransfer_idempotency_key'), table_name='payouttransfer')
+    op.drop_table('payouttransfer')
+    op.drop_index(op.f('ix_payoutjob_status'), table_name='payoutjob')
+    op.drop_table('payoutjob')
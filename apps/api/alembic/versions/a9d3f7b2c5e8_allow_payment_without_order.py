@@ -0,0 +1,28 @@
+"""allow_payment_without_order
+
+Revision ID: a9d3f7b2c5e8
+Revises: f8c4a2e6b3d9
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3f7b2c5e8'
+down_revision: Union[str, Sequence[str], None] = 'f8c4a2e6b3d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PENDING_ORDER payments are written before the Razorpay order exists
+    op.alter_column('payment', 'razorpay_order_id', existing_type=sa.VARCHAR(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM payment WHERE razorpay_order_id IS NULL")
+    op.alter_column('payment', 'razorpay_order_id', existing_type=sa.VARCHAR(), nullable=False)
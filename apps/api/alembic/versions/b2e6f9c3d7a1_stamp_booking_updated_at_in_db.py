@@ -0,0 +1,45 @@
+"""stamp_booking_updated_at_in_db
+
+Revision ID: b2e6f9c3d7a1
+Revises: a9d3f7b2c5e8
+Create Date: 2026-10-21 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2e6f9c3d7a1'
+down_revision: Union[str, Sequence[str], None] = 'a9d3f7b2c5e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # booking.updated_at = the writing transaction's start (now(), UTC), so
+    # the gate feed can hold its cursor behind every in-flight transaction
+    op.execute(
+        """
+        CREATE FUNCTION booking_stamp_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := timezone('utc', now());
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER booking_stamp_updated_at
+        BEFORE INSERT OR UPDATE ON booking
+        FOR EACH ROW EXECUTE FUNCTION booking_stamp_updated_at()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER booking_stamp_updated_at ON booking')
+    op.execute('DROP FUNCTION booking_stamp_updated_at()')
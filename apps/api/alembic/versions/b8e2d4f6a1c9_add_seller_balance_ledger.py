@@ -0,0 +1,57 @@
+"""add_seller_balance_ledger
+
+Revision ID: b8e2d4f6a1c9
+Revises: a3c6e9f2b5d8
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2d4f6a1c9'
+down_revision: Union[str, Sequence[str], None] = 'a3c6e9f2b5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sellerbalance',
+    sa.Column('seller_id', sa.Uuid(), nullable=False),
+    sa.Column('amount_due', sa.Float(), nullable=False),
+    sa.Column('payment_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['seller_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('seller_id')
+    )
+    op.create_index(
+        'ix_sellerbalance_due',
+        'sellerbalance',
+        ['seller_id'],
+        unique=False,
+        postgresql_where=sa.text('amount_due > 0'),
+    )
+
+    # Open the ledger with what is currently owed
+    op.execute(
+        """
+        INSERT INTO sellerbalance (seller_id, amount_due, payment_count, updated_at)
+        SELECT parkinglot.owner_user_id,
+               round(sum(payment.seller_payout_amount)::numeric, 2),
+               count(*),
+               now() AT TIME ZONE 'utc'
+        FROM payment
+        JOIN booking ON payment.booking_id = booking.id
+        JOIN parkinglot ON booking.lot_id = parkinglot.id
+        WHERE payment.status = 'PAID_BY_DRIVER'
+        GROUP BY parkinglot.owner_user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sellerbalance_due', table_name='sellerbalance', postgresql_where=sa.text('amount_due > 0'))
+    op.drop_table('sellerbalance')
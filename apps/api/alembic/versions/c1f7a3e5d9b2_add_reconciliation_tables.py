@@ -0,0 +1,58 @@
+"""add_reconciliation_tables
+
+Revision ID: c1f7a3e5d9b2
+Revises: b8e2d4f6a1c9
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f7a3e5d9b2'
+down_revision: Union[str, Sequence[str], None] = 'b8e2d4f6a1c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Report rows without an order id are matched on the payment id
+    op.create_index(op.f('ix_payment_razorpay_payment_id'), 'payment', ['razorpay_payment_id'], unique=False)
+    op.create_table('reconciliationrun',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('source_file', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('rows_read', sa.Integer(), nullable=False),
+    sa.Column('rows_skipped', sa.Integer(), nullable=False),
+    sa.Column('discrepancies', sa.Integer(), nullable=False),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('reconciliationdiscrepancy',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('run_id', sa.Uuid(), nullable=False),
+    sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(length=30), nullable=False),
+    sa.Column('line_number', sa.Integer(), nullable=True),
+    sa.Column('razorpay_payment_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('razorpay_order_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('report_amount', sa.Float(), nullable=True),
+    sa.Column('db_amount', sa.Float(), nullable=True),
+    sa.Column('db_status', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['run_id'], ['reconciliationrun.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_reconciliationdiscrepancy_run_id'), 'reconciliationdiscrepancy', ['run_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_reconciliationdiscrepancy_run_id'), table_name='reconciliationdiscrepancy')
+    op.drop_table('reconciliationdiscrepancy')
+    op.drop_table('reconciliationrun')
+    op.drop_index(op.f('ix_payment_razorpay_payment_id'), table_name='payment')
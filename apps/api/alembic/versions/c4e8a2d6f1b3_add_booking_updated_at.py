@@ -0,0 +1,35 @@
+"""add_booking_updated_at
+
+Revision ID: c4e8a2d6f1b3
+Revises: b7d3e1f9a6c2
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d6f1b3'
+down_revision: Union[str, Sequence[str], None] = 'b7d3e1f9a6c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('booking', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE booking SET updated_at = created_at')
+    op.alter_column('booking', 'updated_at', nullable=False)
+    op.create_index(
+        'ix_booking_lot_id_updated_at',
+        'booking',
+        ['lot_id', 'updated_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_lot_id_updated_at', table_name='booking')
+    op.drop_column('booking', 'updated_at')
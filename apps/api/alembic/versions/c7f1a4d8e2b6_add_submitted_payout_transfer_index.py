@@ -0,0 +1,33 @@
+"""add_submitted_payout_transfer_index
+
+Revision ID: c7f1a4d8e2b6
+Revises: b2e6f9c3d7a1
+Create Date: 2026-10-21 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7f1a4d8e2b6'
+down_revision: Union[str, Sequence[str], None] = 'b2e6f9c3d7a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Payouts accepted by RazorpayX but not final yet, for the status poll
+    op.create_index(
+        'ix_payouttransfer_submitted_updated_at',
+        'payouttransfer',
+        ['updated_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'SUBMITTED'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_payouttransfer_submitted_updated_at', table_name='payouttransfer')
@@ -0,0 +1,41 @@
+"""add_lot_earnings_daily
+
+Revision ID: d6a9c2e4f8b1
+Revises: c1f7a3e5d9b2
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a9c2e4f8b1'
+down_revision: Union[str, Sequence[str], None] = 'c1f7a3e5d9b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled for past days by: python -m app.workers.backfill_earnings --since ...
+    op.create_table('lotearningsdaily',
+    sa.Column('lot_id', sa.Uuid(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('owner_user_id', sa.Uuid(), nullable=False),
+    sa.Column('gross', sa.Float(), nullable=False),
+    sa.Column('commission', sa.Float(), nullable=False),
+    sa.Column('payout', sa.Float(), nullable=False),
+    sa.Column('booking_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['lot_id'], ['parkinglot.id'], ),
+    sa.ForeignKeyConstraint(['owner_user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('lot_id', 'day')
+    )
+    op.create_index('ix_lotearningsdaily_owner_day', 'lotearningsdaily', ['owner_user_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_lotearningsdaily_owner_day', table_name='lotearningsdaily')
+    op.drop_table('lotearningsdaily')
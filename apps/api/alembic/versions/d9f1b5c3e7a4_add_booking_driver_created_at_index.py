@@ -0,0 +1,32 @@
+"""add_booking_driver_created_at_index
+
+Revision ID: d9f1b5c3e7a4
+Revises: c4e8a2d6f1b3
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f1b5c3e7a4'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a2d6f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_booking_driver_created_at',
+        'booking',
+        ['driver_user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+        postgresql_include=['status', 'start_time', 'end_time', 'lot_id'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_driver_created_at', table_name='booking')
@@ -0,0 +1,44 @@
+"""normalize_booking_plates
+
+Revision ID: e2a7c9d4b8f6
+Revises: d9f1b5c3e7a4
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c9d4b8f6'
+down_revision: Union[str, Sequence[str], None] = 'd9f1b5c3e7a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Backfill: uppercase, no separators (app.services.plates.normalize_plate)
+    op.execute(
+        "UPDATE booking "
+        "SET vehicle_plate = NULLIF(upper(regexp_replace(vehicle_plate, '[^A-Za-z0-9]', '', 'g')), '') "
+        "WHERE vehicle_plate IS NOT NULL"
+    )
+    op.execute(
+        'UPDATE "user" '
+        "SET default_vehicle_plate = NULLIF(upper(regexp_replace(default_vehicle_plate, '[^A-Za-z0-9]', '', 'g')), '') "
+        "WHERE default_vehicle_plate IS NOT NULL"
+    )
+    op.create_index(
+        'ix_booking_lot_plate_confirmed',
+        'booking',
+        ['lot_id', 'vehicle_plate'],
+        unique=False,
+        postgresql_where=sa.text("status = 'CONFIRMED'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The original formatting of plates is not restored.
+    op.drop_index('ix_booking_lot_plate_confirmed', table_name='booking')
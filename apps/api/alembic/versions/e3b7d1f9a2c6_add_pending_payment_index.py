@@ -0,0 +1,33 @@
+"""add_pending_payment_index
+
+Revision ID: e3b7d1f9a2c6
+Revises: d6a9c2e4f8b1
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7d1f9a2c6'
+down_revision: Union[str, Sequence[str], None] = 'd6a9c2e4f8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Unpaid extension payments, for the booking sweeper
+    op.create_index(
+        'ix_payment_pending_created_at',
+        'payment',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_payment_pending_created_at', table_name='payment')
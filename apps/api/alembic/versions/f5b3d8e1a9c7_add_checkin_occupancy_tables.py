@@ -0,0 +1,50 @@
+"""add_checkin_occupancy_tables
+
+Revision ID: f5b3d8e1a9c7
+Revises: e2a7c9d4b8f6
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b3d8e1a9c7'
+down_revision: Union[str, Sequence[str], None] = 'e2a7c9d4b8f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('checkinevent',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('booking_id', sa.Uuid(), nullable=False),
+    sa.Column('lot_id', sa.Uuid(), nullable=False),
+    sa.Column('direction', sqlmodel.sql.sqltypes.AutoString(length=3), nullable=False),
+    sa.Column('scanned_by', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['booking_id'], ['booking.id'], ),
+    sa.ForeignKeyConstraint(['lot_id'], ['parkinglot.id'], ),
+    sa.ForeignKeyConstraint(['scanned_by'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_checkinevent_booking_id'), 'checkinevent', ['booking_id'], unique=False)
+    op.create_index(op.f('ix_checkinevent_lot_id'), 'checkinevent', ['lot_id'], unique=False)
+    op.create_table('lotoccupancy',
+    sa.Column('lot_id', sa.Uuid(), nullable=False),
+    sa.Column('occupied', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['lot_id'], ['parkinglot.id'], ),
+    sa.PrimaryKeyConstraint('lot_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('lotoccupancy')
+    op.drop_index(op.f('ix_checkinevent_lot_id'), table_name='checkinevent')
+    op.drop_index(op.f('ix_checkinevent_booking_id'), table_name='checkinevent')
+    op.drop_table('checkinevent')
@@ -0,0 +1,46 @@
+"""add_single_active_payout_job_index
+
+Revision ID: f8c4a2e6b3d9
+Revises: e3b7d1f9a2c6
+Create Date: 2026-10-20 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8c4a2e6b3d9'
+down_revision: Union[str, Sequence[str], None] = 'e3b7d1f9a2c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Jobs that raced in before the index existed: keep the oldest active one
+    op.execute(
+        """
+        UPDATE payoutjob
+        SET status = 'FAILED', last_error = 'Superseded by an earlier active job'
+        WHERE status IN ('PENDING', 'RUNNING')
+          AND id <> (
+            SELECT id FROM payoutjob
+            WHERE status IN ('PENDING', 'RUNNING')
+            ORDER BY created_at
+            LIMIT 1
+          )
+        """
+    )
+    op.create_index(
+        'ux_payoutjob_active',
+        'payoutjob',
+        [sa.text('(true)')],
+        unique=True,
+        postgresql_where=sa.text("status IN ('PENDING', 'RUNNING')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_payoutjob_active', table_name='payoutjob')
@@ -22,6 +22,74 @@ class Settings(BaseSettings):
     RAZORPAY_KEY_SECRET: Optional[str] = None
     RAZORPAY_WEBHOOK_SECRET: Optional[str] = None
     RAZORPAY_X_ACCOUNT_NUMBER: Optional[str] = None  # For Payouts
+    # Points the SDK at another host, e.g. bench/fake_razorpay.py for load tests
+    RAZORPAY_API_BASE_URL: str = "https://api.razorpay.com"
+
+    # "sync" processes webhooks inside the request; "queue" only verifies,
+    # appends to a Redis Stream and lets app/workers/webhook_worker.py apply them.
+    RAZORPAY_WEBHOOK_MODE: str = "sync"
+    WEBHOOK_WORKER_CONCURRENCY: int = 4
+    WEBHOOK_WORKER_BATCH_SIZE: int = 50
+    # Razorpay retries for up to 24h; keep event-id claims a bit longer.
+    WEBHOOK_DEDUPE_TTL_SECONDS: int = 48 * 3600
+    # An in-progress claim lapses after this if the handler never finishes
+    WEBHOOK_CLAIM_TTL_SECONDS: int = 10
+
+    # Spot allocation policy: best_fit | first_fit | pack_by_spot
+    # (see app/services/allocation.py)
+    ALLOCATION_POLICY: str = "best_fit"
+
+    # Signed price quotes (POST /api/book/quote); falls back to JWT_SECRET_KEY
+    QUOTE_SIGNING_SECRET: Optional[str] = None
+    QUOTE_TTL_SECONDS: int = 120
+    # Candidate windows a quote tries before giving up on a soft hold
+    QUOTE_HOLD_ATTEMPTS: int = 3
+
+    # Signed QR tokens (app/services/qr_tokens.py); falls back to JWT_SECRET_KEY
+    QR_SIGNING_SECRET: Optional[str] = None
+
+    # Batch gate scans (POST /api/scan/batch)
+    SCAN_BATCH_MAX_ITEMS: int = 300
+
+    # Live occupancy persistence (app/workers/occupancy_flusher.py)
+    OCCUPANCY_FLUSH_INTERVAL_SECONDS: int = 30
+
+    # Seller payouts (app/services/payout_dispatch.py)
+    PAYOUT_CONCURRENCY: int = 16
+    PAYOUT_MAX_ATTEMPTS: int = 5
+    PAYOUT_BACKOFF_BASE_SECONDS: float = 0.5
+    PAYOUT_BACKOFF_MAX_SECONDS: float = 30.0
+    PAYOUT_HTTP_TIMEOUT_SECONDS: float = 15.0
+    # Payout jobs (app/workers/payout_runner.py)
+    PAYOUT_CHUNK_SIZE: int = 200
+    PAYOUT_JOB_POLL_INTERVAL_SECONDS: int = 5
+    # A RUNNING job without a checkpoint for this long is taken over
+    PAYOUT_JOB_STALE_SECONDS: int = 300
+    PAYOUT_JOB_MAX_ATTEMPTS: int = 5
+    # SUBMITTED transfers not settled by webhook are polled this often
+    PAYOUT_STATUS_POLL_SECONDS: int = 300
+
+    # Settlement reconciliation (app/workers/reconcile_settlements.py)
+    RECONCILE_BATCH_SIZE: int = 5000
+
+    # In-place extensions (POST /api/book/{id}/extend)
+    MAX_EXTENSION_MINUTES: int = 12 * 60
+
+    # Fleet bulk bookings (POST /api/book/bulk)
+    BULK_BOOKING_MAX_SPOTS: int = 200
+
+    # Recurring bookings / monthly passes (POST /api/book/recurring)
+    RECURRING_MAX_OCCURRENCES: int = 62
+
+    # Pending-booking sweeper (app/workers/booking_sweeper.py)
+    BOOKING_PAYMENT_WINDOW_MINUTES: int = 15
+    SWEEPER_BATCH_SIZE: int = 200
+    SWEEPER_INTERVAL_SECONDS: int = 60
+
+    # Outbox relay (app/workers/outbox_relay.py)
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 10
 
     class Config:
         env_file = ".env"
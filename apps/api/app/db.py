@@ -11,8 +11,10 @@ if database_url and database_url.startswith("postgresql://"):
 
 engine = create_async_engine(database_url, echo=True, future=True)
 
+# Shared session factory (also used by the background workers in app/workers)
+async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
 
 async def get_session() -> AsyncSession:
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
     async with async_session() as session:
         yield session
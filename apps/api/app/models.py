@@ -1,8 +1,8 @@
 from typing import Optional, List, Any
-from datetime import datetime
+from datetime import date, datetime
 from geoalchemy2 import Geography
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, JSON, BigInteger, String
+from sqlalchemy import Column, JSON, BigInteger, String, Index, text
 from sqlalchemy.dialects import postgresql
 import uuid
 
@@ -125,6 +125,15 @@ class ParkingSpot(SQLModel, table=True):
 
 
 class SpotAvailability(SQLModel, table=True):
+    __table_args__ = (
+        # Hold/booked windows are looked up by booking when confirming/releasing
+        Index(
+            "ix_spotavailability_booking_id",
+            "booking_id",
+            postgresql_where=text("booking_id IS NOT NULL"),
+        ),
+    )
+
     id: Optional[int] = Field(
         default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True)
     )
@@ -146,6 +155,34 @@ class PricingRule(SQLModel, table=True):
 
 
 class Booking(SQLModel, table=True):
+    __table_args__ = (
+        # Only the expiry sweeper scans PENDING rows; keep that index tiny.
+        Index(
+            "ix_booking_pending_created_at",
+            "status",
+            "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        # Gate device delta sync: a lot's changes in (updated_at, id) order
+        Index("ix_booking_lot_id_updated_at", "lot_id", "updated_at", "id"),
+        # my-bookings keyset pages; the included columns let the
+        # upcoming/past/status filters run without heap fetches
+        Index(
+            "ix_booking_driver_created_at",
+            "driver_user_id",
+            text("created_at DESC"),
+            text("id DESC"),
+            postgresql_include=["status", "start_time", "end_time", "lot_id"],
+        ),
+        # Gate lookup by (normalized) plate among a lot's confirmed bookings
+        Index(
+            "ix_booking_lot_plate_confirmed",
+            "lot_id",
+            "vehicle_plate",
+            postgresql_where=text("status = 'CONFIRMED'"),
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     driver_user_id: uuid.UUID = Field(foreign_key="user.id")
     lot_id: uuid.UUID = Field(foreign_key="parkinglot.id")
@@ -154,15 +191,31 @@ class Booking(SQLModel, table=True):
     end_time: datetime = Field(index=True)
     status: str = Field(default="PENDING", max_length=20)
     qr_code_data: Optional[str] = Field(default=None, unique=True)
-    vehicle_plate: Optional[str] = Field(default=None)
+    vehicle_plate: Optional[str] = Field(default=None)  # normalize_plate()d
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Overwritten by the booking_stamp_updated_at trigger with the writing
+    # transaction's start time (see get_gate_feed)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
 
 
 class Payment(SQLModel, table=True):
+    __table_args__ = (
+        # The sweeper looks for unpaid extension payments; keep it tiny.
+        Index(
+            "ix_payment_pending_created_at",
+            "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     booking_id: uuid.UUID = Field(foreign_key="booking.id")
-    razorpay_order_id: str = Field(index=True)
-    razorpay_payment_id: Optional[str] = Field(default=None)
+    # None while PENDING_ORDER (written before the gateway order exists)
+    razorpay_order_id: Optional[str] = Field(default=None, index=True)
+    razorpay_payment_id: Optional[str] = Field(default=None, index=True)
     amount_charged: float
     commission_fee: float
     seller_payout_amount: float
@@ -181,3 +234,191 @@ class Review(SQLModel, table=True):
     rating: int = Field(ge=1, le=5)
     comment: Optional[str] = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# --- 4. Webhook & Background Processing Models ---
+
+
+class WebhookEvent(SQLModel, table=True):
+    # Razorpay's x-razorpay-event-id; the PK makes duplicate deliveries a no-op
+    event_id: str = Field(primary_key=True, max_length=64)
+    event_type: str = Field(max_length=50)
+    received_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class OutboxEvent(SQLModel, table=True):
+    __table_args__ = (
+        # The relay only ever scans undelivered rows
+        Index(
+            "ix_outboxevent_pending",
+            "id",
+            postgresql_where=text("processed_at IS NULL"),
+        ),
+    )
+
+    id: Optional[int] = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True)
+    )
+    event_type: str = Field(max_length=50)
+    user_id: Optional[uuid.UUID] = Field(default=None)
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    processed_at: Optional[datetime] = Field(default=None)
+
+
+# --- 5. Gate & Occupancy Models ---
+class CheckInEvent(SQLModel, table=True):
+    id: Optional[int] = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True)
+    )
+    booking_id: uuid.UUID = Field(foreign_key="booking.id", index=True)
+    lot_id: uuid.UUID = Field(foreign_key="parkinglot.id", index=True)
+    direction: str = Field(max_length=3)  # IN / OUT
+    scanned_by: uuid.UUID = Field(foreign_key="user.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class LotOccupancy(SQLModel, table=True):
+    """Last persisted value of the Redis live occupancy counter."""
+
+    lot_id: uuid.UUID = Field(foreign_key="parkinglot.id", primary_key=True)
+    occupied: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# --- 6. Payout Batch Models ---
+class PayoutJob(SQLModel, table=True):
+    """
+    One payout batch, processed in seller chunks by app/services/payout_jobs.py.
+    `cursor` is the last seller whose transfer was recorded: a resumed job
+    continues after it.
+    """
+
+    __table_args__ = (
+        # At most one PENDING/RUNNING job: every active row indexes the same
+        # constant key, so a second concurrent trigger can't insert another
+        Index(
+            "ux_payoutjob_active",
+            text("(true)"),
+            unique=True,
+            postgresql_where=text("status IN ('PENDING', 'RUNNING')"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    status: str = Field(default="PENDING", index=True)  # PENDING, RUNNING, COMPLETED, FAILED
+    triggered_by: Optional[uuid.UUID] = Field(default=None, foreign_key="user.id")
+    cursor: Optional[uuid.UUID] = Field(default=None)
+    sellers_processed: int = Field(default=0)
+    sellers_failed: int = Field(default=0)
+    amount_paid: float = Field(default=0.0)
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = Field(default=None)
+
+
+class PayoutTransfer(SQLModel, table=True):
+    """A seller's transfer within a job, recorded before the gateway is called."""
+
+    __table_args__ = (
+        Index("ux_payouttransfer_job_seller", "job_id", "seller_id", unique=True),
+        # Payouts awaiting a final status, for the status poll
+        Index(
+            "ix_payouttransfer_submitted_updated_at",
+            "updated_at",
+            postgresql_where=text("status = 'SUBMITTED'"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    job_id: uuid.UUID = Field(foreign_key="payoutjob.id")
+    seller_id: uuid.UUID = Field(foreign_key="user.id")
+    amount: float
+    payment_ids: List[str] = Field(default_factory=list, sa_column=Column(JSON))
+    fund_account_id: Optional[str] = Field(default=None)
+    idempotency_key: str = Field(max_length=64, index=True)
+    # PENDING, SUBMITTED, PROCESSED, FAILED, REVERSED, SKIPPED
+    status: str = Field(default="PENDING")
+    payout_id: Optional[str] = Field(default=None)
+    error: Optional[str] = Field(default=None)
+    attempts: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class SellerBalance(SQLModel, table=True):
+    """
+    Running amount owed to each seller: credited when a payment confirms,
+    debited when it is refunded or paid out (app/services/seller_balance.py).
+    """
+
+    __table_args__ = (
+        # Payout batches only walk sellers who are owed something
+        Index(
+            "ix_sellerbalance_due",
+            "seller_id",
+            postgresql_where=text("amount_due > 0"),
+        ),
+    )
+
+    seller_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    amount_due: float = Field(default=0.0)
+    payment_count: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class LotEarningsDaily(SQLModel, table=True):
+    """
+    Per lot and day (booking start date, IST) earnings from captured
+    payments, kept by app/services/earnings.py and rebuilt by
+    app/workers/backfill_earnings.py.
+    """
+
+    __table_args__ = (
+        Index("ix_lotearningsdaily_owner_day", "owner_user_id", "day"),
+    )
+
+    lot_id: uuid.UUID = Field(foreign_key="parkinglot.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    owner_user_id: uuid.UUID = Field(foreign_key="user.id")
+    gross: float = Field(default=0.0)
+    commission: float = Field(default=0.0)
+    payout: float = Field(default=0.0)
+    booking_count: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# --- 7. Reconciliation Models ---
+class ReconciliationRun(SQLModel, table=True):
+    """One pass of app/workers/reconcile_settlements.py over a report file."""
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    source_file: str
+    status: str = Field(default="RUNNING")  # RUNNING, COMPLETED, FAILED
+    rows_read: int = Field(default=0)
+    rows_skipped: int = Field(default=0)
+    discrepancies: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = Field(default=None)
+
+
+class ReconciliationDiscrepancy(SQLModel, table=True):
+    id: Optional[int] = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True)
+    )
+    run_id: uuid.UUID = Field(foreign_key="reconciliationrun.id", index=True)
+    # MISSING_IN_DB, NOT_CAPTURED_IN_DB, AMOUNT_MISMATCH, PAYMENT_ID_MISMATCH,
+    # MISSING_IN_REPORT
+    kind: str = Field(max_length=30)
+    line_number: Optional[int] = Field(default=None)  # None for MISSING_IN_REPORT
+    razorpay_payment_id: Optional[str] = Field(default=None)
+    razorpay_order_id: Optional[str] = Field(default=None)
+    report_amount: Optional[float] = Field(default=None)
+    db_amount: Optional[float] = Field(default=None)
+    db_status: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
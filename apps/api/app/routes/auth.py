@@ -37,6 +37,7 @@ from app.security import (
 )
 from app.config import settings
 from app.core.redis_client import redis_client
+from app.services.plates import normalize_plate
 
 router = APIRouter()
 
@@ -280,7 +281,9 @@ async def update_profile(
     if payload.password and len(payload.password) >= 6:
         current_user.password_hash = get_password_hash(payload.password)
     if payload.default_vehicle_plate is not None:
-        current_user.default_vehicle_plate = payload.default_vehicle_plate.upper()
+        current_user.default_vehicle_plate = normalize_plate(
+            payload.default_vehicle_plate
+        )
     if payload.profile_picture_url is not None:
         current_user.profile_picture_url = payload.profile_picture_url
     if payload.bio is not None:
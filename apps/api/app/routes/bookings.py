@@ -5,13 +5,12 @@ from fastapi import (
     HTTPException,
     status,
     Request,
-    BackgroundTasks,
     Header,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from sqlalchemy import and_
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
 import razorpay
 import uuid
 from pytz import timezone
@@ -19,18 +18,62 @@ from pytz import timezone
 from app.db import get_session
 from app.models import (
     User,
-    ParkingLot,
-    ParkingSpot,
-    SpotAvailability,
-    PricingRule,
     Booking,
     Payment,
+    SpotAvailability,
+)
+from app.schemas import (
+    BookingCreate,
+    BookingResponse,
+    BookingCancelResponse,
+    BookingExtend,
+    BookingExtendResponse,
+    BulkBookingCreate,
+    BulkBookingItem,
+    BulkBookingResponse,
+    QuoteResponse,
+    RecurringBookingCreate,
+    RecurringBookingItem,
+    RecurringBookingResponse,
 )
-from app.schemas import BookingCreate, BookingResponse
 from app.deps import get_current_user
 from app.config import settings
-from app.services.logger import log_event
-from app.services.notifications import notify_booking_confirmed
+from app.services.earnings import (
+    apply_earnings_changes,
+    earnings_changes,
+    payment_earnings,
+)
+from app.services.inventory import (
+    carve_window,
+    extend_booked_window,
+    find_windows_for_occurrences,
+    hold_extension_window,
+    lock_available_window,
+    lock_available_windows,
+    lock_window_by_id,
+    lock_windows_by_ids,
+    release_booking_windows,
+    split_window,
+)
+from app.services.pricing import calculate_amount, get_active_rules
+from app.services.bulk_bookings import insert_bookings
+from app.services.outbox import add_outbox_event
+from app.services.plates import normalize_plate
+from app.services.recurrence import assign_spots, expand_occurrences
+from app.services.quotes import (
+    sign_quote,
+    verify_quote,
+    quote_matches,
+    hold_quoted_window,
+    quote_hold_exists,
+    release_quote_hold,
+)
+from app.services.payments import handle_webhook_event
+from app.services.qr_tokens import get_lot_owner, issue_qr_token
+from app.services.scan_cache import qr_cache_key
+from app.services.seller_balance import debit_seller
+from app.services.webhook_queue import enqueue_webhook
+from app.services.webhook_dedupe import claim_event, confirm_event, release_event
 
 router = APIRouter()
 
@@ -41,12 +84,97 @@ if not settings.RAZORPAY_KEY_ID or not settings.RAZORPAY_KEY_SECRET:
     )
 
 # Initialize Razorpay Client
-client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+client = razorpay.Client(
+    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+    base_url=settings.RAZORPAY_API_BASE_URL,
+)
+
+
+@router.post("/quote", response_model=QuoteResponse)
+async def quote_booking(
+    payload: BookingCreate,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Prices a lot/window/vehicle once and returns a short-lived signed quote.
+    Passing the quote_token to create_booking skips re-pricing and the
+    availability search while the soft hold on the quoted window lasts.
+    """
+    ist = timezone("Asia/Kolkata")
+    start_db = payload.start_time.astimezone(ist).replace(tzinfo=None)
+    end_db = payload.end_time.astimezone(ist).replace(tzinfo=None)
+
+    # 1. Price
+    rule = (await get_active_rules(session, [payload.lot_id])).get(payload.lot_id)
+
+    if not rule:
+        raise HTTPException(
+            status_code=400, detail="Pricing configuration error: No active rate found."
+        )
+
+    amount_inr, duration_hours = calculate_amount(rule, start_db, end_db)
+
+    # 2. Pick a Window + Soft Hold (peek only; the hold lives in Redis, not
+    # in a row lock). A window another live quote holds is skipped for the
+    # next candidate.
+    quote_id = uuid.uuid4().hex
+    first_window = held_window = None
+    skipped = []
+    for _ in range(settings.QUOTE_HOLD_ATTEMPTS):
+        window = await lock_available_window(
+            session,
+            payload.lot_id,
+            payload.vehicle_type,
+            start_db,
+            end_db,
+            lock=False,
+            exclude=skipped,
+        )
+        if not window:
+            break
+        first_window = first_window or window
+        if await hold_quoted_window(window.id, quote_id):
+            held_window = window
+            break
+        skipped.append(window.id)
+
+    if not first_window:
+        raise HTTPException(
+            status_code=400,
+            detail="Sorry, this spot is no longer available for the selected time.",
+        )
+
+    # 3. Signed Token; without a hold ("w" unset) create_booking searches again
+    token = sign_quote(
+        {
+            "q": quote_id,
+            "u": str(current_user.id),
+            "l": str(payload.lot_id),
+            "vt": payload.vehicle_type,
+            "st": start_db.isoformat(),
+            "en": end_db.isoformat(),
+            "w": held_window.id if held_window else None,
+            "a": amount_inr,
+            "h": duration_hours,
+        }
+    )
+
+    return QuoteResponse(
+        lot_id=payload.lot_id,
+        spot_id=(held_window or first_window).spot_id,
+        start_time=start_db,
+        end_time=end_db,
+        amount=amount_inr,
+        currency="INR",
+        rate_type=rule.rate_type,
+        quote_token=token,
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.QUOTE_TTL_SECONDS),
+    )
 
 
 @router.post("/", response_model=BookingResponse)
 async def create_booking(
-    background_tasks: BackgroundTasks,
     payload: BookingCreate,
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
@@ -54,9 +182,12 @@ async def create_booking(
     """
     Initiates a booking.
     1. Converts User Time -> IST -> DB Time.
-    2. Checks Availability (Atomic).
-    3. Creates Pending Booking & Payment.
-    4. Returns Razorpay Order ID.
+    2. Fast Path: a valid quote token already priced & soft-held a window.
+    3. Otherwise Calculates Price and Locks a Window (SKIP LOCKED).
+    4. Commits the Hold + Booking + Payment (PENDING_ORDER), releasing the
+       row lock.
+    5. Creates the Razorpay Order (the hold is released if that fails).
+    6. Attaches the order to the Payment + writes the Outbox Event.
     """
     # 1. Timezone Handling (Enforce IST)
     # We assume the input is UTC or ISO format, but we interpret the *intent* as IST
@@ -66,133 +197,732 @@ async def create_booking(
     start_db = payload.start_time.astimezone(ist).replace(tzinfo=None)
     end_db = payload.end_time.astimezone(ist).replace(tzinfo=None)
 
-    # 2. Availability Check
-    # Find a spot in this lot that is OPEN during the requested window
-    statement = (
-        select(ParkingSpot)
-        .join(SpotAvailability)
-        .where(ParkingSpot.lot_id == payload.lot_id)
-        .where(ParkingSpot.spot_type == payload.vehicle_type)
-        .where(
-            and_(
-                SpotAvailability.start_time <= start_db,
-                SpotAvailability.end_time >= end_db,
-                SpotAvailability.status == "AVAILABLE",
+    # 2. Quote Fast Path (no PricingRule or availability search queries)
+    window = None
+    quote = verify_quote(payload.quote_token) if payload.quote_token else None
+
+    if (
+        quote
+        and quote_matches(
+            quote,
+            current_user.id,
+            payload.lot_id,
+            payload.vehicle_type,
+            start_db,
+            end_db,
+        )
+        and quote.get("w") is not None
+        and await quote_hold_exists(quote["w"], quote["q"])
+    ):
+        window = await lock_window_by_id(session, quote["w"], start_db, end_db)
+        amount_inr, duration_hours = float(quote["a"]), float(quote["h"])
+
+    if not window:
+        # 3a. Calculate Price (read-only, before we take any row locks)
+        rule = (await get_active_rules(session, [payload.lot_id])).get(payload.lot_id)
+
+        if not rule:
+            raise HTTPException(
+                status_code=400,
+                detail="Pricing configuration error: No active rate found.",
+            )
+
+        amount_inr, duration_hours = calculate_amount(rule, start_db, end_db)
+
+        # 3b. Availability Check + Hold
+        # Lock a window that is OPEN during the requested window. The lock lives
+        # until the commit below, so no other booking can grab the same window.
+        window = await lock_available_window(
+            session, payload.lot_id, payload.vehicle_type, start_db, end_db
+        )
+
+        if not window:
+            raise HTTPException(
+                status_code=400,
+                detail="Sorry, this spot is no longer available for the selected time.",
             )
+
+    amount_paise = int(amount_inr * 100)
+
+    # IDs are generated here so Booking, Payment and the hold can all be
+    # written in one flush without a refresh round trip.
+    booking_id = uuid.uuid4()
+
+    # 4. Hold + Booking (PENDING) + Payment (PENDING_ORDER, no order yet),
+    # committed before the gateway call so the window lock isn't held
+    # across it. If we die before the order id is attached below, the
+    # sweeper expires both and releases the hold; a capture for an order we
+    # never recorded is refunded by the webhook.
+    split_window(session, window, start_db, end_db, "HELD", booking_id)
+
+    new_booking = Booking(
+        id=booking_id,
+        driver_user_id=current_user.id,
+        lot_id=payload.lot_id,
+        spot_id=window.spot_id,
+        start_time=start_db,
+        end_time=end_db,
+        status="PENDING",
+        vehicle_plate=normalize_plate(
+            payload.vehicle_plate or current_user.default_vehicle_plate
+        ),
+    )
+    new_payment = Payment(
+        booking_id=booking_id,
+        amount_charged=amount_inr,
+        commission_fee=amount_inr * 0.20,  # 20% Platform Fee
+        seller_payout_amount=amount_inr * 0.80,
+        status="PENDING_ORDER",
+    )
+    session.add(new_booking)
+    session.add(new_payment)
+    await session.commit()
+
+    if quote and quote.get("w") is not None:
+        await release_quote_hold(quote["w"], quote["q"])
+
+    # 5. Create Razorpay Order (outside any transaction)
+    # The SDK is blocking; run it in a thread so the event loop keeps serving.
+    try:
+        loop = asyncio.get_running_loop()
+        order_data = await loop.run_in_executor(
+            None,
+            lambda: client.order.create(
+                {
+                    "amount": amount_paise,
+                    "currency": "INR",
+                    "receipt": f"rcpt_{booking_id.hex[:10]}",
+                    "notes": {
+                        "user_id": str(current_user.id),
+                        "lot_id": str(payload.lot_id),
+                        "spot_id": str(new_booking.spot_id),
+                        "booking_id": str(booking_id),
+                    },
+                }
+            ),
+        )
+    except Exception as e:
+        print(f"[Razorpay Error] {e}")
+        # Give the spot straight back instead of waiting for the sweeper
+        await release_booking_windows(session, [booking_id], statuses=("HELD",))
+        await session.delete(new_payment)
+        await session.flush()
+        await session.delete(new_booking)
+        await session.commit()
+        raise HTTPException(
+            status_code=502, detail="Payment gateway error. Please try again."
         )
+
+    # 6. Attach the Order to the Payment (PENDING) + Outbox Event, one commit
+    new_payment.razorpay_order_id = order_data["id"]
+    new_payment.status = "PENDING"
+    new_payment.updated_at = datetime.utcnow()
+    session.add(new_payment)
+    add_outbox_event(
+        session,
+        "booking_initiated",
+        current_user.id,
+        {
+            "booking_id": str(booking_id),
+            "lot_id": str(payload.lot_id),
+            "amount": amount_inr,
+            "duration": duration_hours,
+        },
+    )
+    await session.commit()
+
+    return BookingResponse(
+        booking_id=new_booking.id,
+        razorpay_order_id=order_data["id"],
+        amount=amount_inr,
+        currency="INR",
+        status="PENDING",
     )
-    result = await session.execute(statement)
-    spot = result.scalars().first()
 
-    if not spot:
+
+@router.post("/{booking_id}/extend", response_model=BookingExtendResponse)
+async def extend_booking(
+    booking_id: uuid.UUID,
+    payload: BookingExtend,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Extends a confirmed stay in place (no new search/allocation).
+    Free extensions grow the BOOKED window into the adjacent AVAILABLE
+    fragment with one locked UPDATE and take effect immediately.
+    Paid extensions only HOLD the extra time and charge the price
+    difference with a new Razorpay order; the capture webhook moves the
+    booking's end and reissues its QR, and the sweeper releases the hold
+    if the delta is never paid.
+    """
+    if not 1 <= payload.minutes <= settings.MAX_EXTENSION_MINUTES:
         raise HTTPException(
             status_code=400,
-            detail="Sorry, this spot is no longer available for the selected time.",
+            detail=f"minutes must be between 1 and {settings.MAX_EXTENSION_MINUTES}.",
         )
 
-    # 3. Calculate Price
-    price_stmt = select(PricingRule).where(
-        PricingRule.lot_id == payload.lot_id, PricingRule.is_active == True
+    booking = await session.get(Booking, booking_id, with_for_update=True)
+    if not booking or booking.driver_user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Booking not found")
+
+    if booking.status != "CONFIRMED":
+        raise HTTPException(status_code=400, detail=f"Booking is {booking.status}")
+
+    now_ist = datetime.now(timezone("Asia/Kolkata")).replace(tzinfo=None)
+    if now_ist >= booking.end_time:
+        raise HTTPException(status_code=400, detail="Booking has already ended.")
+
+    # One unpaid extension at a time (its HELD window is tied to its payment)
+    pending_stmt = select(SpotAvailability.id).where(
+        SpotAvailability.booking_id == booking.id,
+        SpotAvailability.status == "HELD",
     )
-    price_result = await session.execute(price_stmt)
-    rule = price_result.scalars().first()
+    if (await session.execute(pending_stmt)).first():
+        raise HTTPException(
+            status_code=409, detail="An earlier extension is still awaiting payment."
+        )
 
+    rule = (await get_active_rules(session, [booking.lot_id])).get(booking.lot_id)
     if not rule:
         raise HTTPException(
             status_code=400, detail="Pricing configuration error: No active rate found."
         )
 
-    duration_hours = max(1.0, (end_db - start_db).total_seconds() / 3600)
+    old_end = booking.end_time
+    new_end = old_end + timedelta(minutes=payload.minutes)
+
+    old_amount, _ = calculate_amount(rule, booking.start_time, old_end)
+    new_amount, _ = calculate_amount(rule, booking.start_time, new_end)
+    delta_inr = max(0.0, new_amount - old_amount)
+    order_id = None
+    event_payload = {
+        "booking_id": str(booking.id),
+        "minutes": payload.minutes,
+        "amount": delta_inr,
+    }
+
+    if delta_inr == 0:
+        # 1a. Nothing to pay: in-place window adjustment
+        extended = await extend_booked_window(
+            session, booking.spot_id, booking.id, old_end, new_end
+        )
+        if not extended:
+            await session.rollback()
+            raise HTTPException(
+                status_code=409, detail="The spot is not free for the extra time."
+            )
 
-    if rule.rate_type == "HOURLY":
-        amount_inr = float(rule.rate) * duration_hours
+        booking.end_time = new_end
+        # The signed QR carries the validity window; reissue it for the new end
+        old_qr_code = booking.qr_code_data
+        booking.qr_code_data = issue_qr_token(booking, current_user.name)
+        session.add(booking)
+        event_payload["invalidate_keys"] = (
+            [qr_cache_key(old_qr_code)] if old_qr_code else []
+        )
     else:
-        # Flat fee (e.g., Event Parking)
-        amount_inr = float(rule.rate)
+        # 1b. Hold the extra time until the delta is captured
+        held = await hold_extension_window(
+            session, booking.spot_id, booking.id, old_end, new_end
+        )
+        if not held:
+            await session.rollback()
+            raise HTTPException(
+                status_code=409, detail="The spot is not free for the extra time."
+            )
 
-    amount_paise = int(amount_inr * 100)
+        # 2. Delta Charge
+        try:
+            loop = asyncio.get_running_loop()
+            order_data = await loop.run_in_executor(
+                None,
+                lambda: client.order.create(
+                    {
+                        "amount": int(delta_inr * 100),
+                        "currency": "INR",
+                        "receipt": f"ext_{booking.id.hex[:10]}",
+                        "notes": {
+                            "user_id": str(current_user.id),
+                            "booking_id": str(booking.id),
+                            "extension_minutes": str(payload.minutes),
+                        },
+                    }
+                ),
+            )
+        except Exception as e:
+            print(f"[Razorpay Error] {e}")
+            await session.rollback()
+            raise HTTPException(
+                status_code=502, detail="Payment gateway error. Please try again."
+            )
 
-    # 4. Create Razorpay Order
-    try:
-        order_data = client.order.create(
+        order_id = order_data["id"]
+        session.add(
+            Payment(
+                booking_id=booking.id,
+                razorpay_order_id=order_id,
+                amount_charged=delta_inr,
+                commission_fee=delta_inr * 0.20,  # 20% Platform Fee
+                seller_payout_amount=delta_inr * 0.80,
+                status="PENDING",
+            )
+        )
+        event_payload["razorpay_order_id"] = order_id
+
+    add_outbox_event(session, "booking_extended", current_user.id, event_payload)
+    await session.commit()
+
+    return BookingExtendResponse(
+        booking_id=booking.id,
+        end_time=new_end,
+        razorpay_order_id=order_id,
+        amount=delta_inr,
+        currency="INR",
+        status="PENDING" if order_id else "CONFIRMED",
+    )
+
+
+@router.post("/{booking_id}/cancel", response_model=BookingCancelResponse)
+async def cancel_booking(
+    booking_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Cancels a booking before it starts, in one transaction.
+    1. Puts its HELD/BOOKED window(s) back to AVAILABLE, merged with the
+       neighbouring free time (locked by booking id, never a scan).
+    2. Captured payments -> REFUND_PENDING, unpaid ones -> CANCELLED.
+    3. Queues the refund, QR revocation + cancellation event in the outbox.
+    Bookings whose payment is being or has been paid out to the seller
+    are rejected.
+    """
+    booking = await session.get(Booking, booking_id, with_for_update=True)
+    if not booking or booking.driver_user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Booking not found")
+
+    if booking.status not in ("PENDING", "CONFIRMED"):
+        raise HTTPException(status_code=400, detail=f"Booking is {booking.status}")
+
+    ist = timezone("Asia/Kolkata")
+    now_ist = datetime.now(ist).replace(tzinfo=None)
+    if now_ist >= booking.start_time:
+        raise HTTPException(
+            status_code=400, detail="Bookings can only be cancelled before they start."
+        )
+
+    payment_stmt = (
+        select(Payment).where(Payment.booking_id == booking.id).with_for_update()
+    )
+    payments = (await session.execute(payment_stmt)).scalars().all()
+
+    # Money paid out (or being paid out) to the seller can't be refunded here
+    if any(
+        p.status in ("PAYOUT_IN_PROGRESS", "PAYOUT_TO_SELLER_COMPLETE") for p in payments
+    ):
+        raise HTTPException(
+            status_code=409,
+            detail="This booking has already been paid out to the lot owner; "
+            "please contact support to cancel it.",
+        )
+
+    # 1. Instant availability restoration
+    await release_booking_windows(session, [booking.id])
+
+    # 2. Payments
+    refunds = []
+    for payment in payments:
+        if payment.status == "PAID_BY_DRIVER":
+            payment.status = "REFUND_PENDING"
+            refunds.append(payment)
+        elif payment.status in ("PENDING", "PENDING_ORDER"):
+            payment.status = "CANCELLED"
+        else:
+            continue
+        payment.updated_at = datetime.utcnow()
+        session.add(payment)
+
+    refund_inr = sum(p.amount_charged for p in refunds)
+
+    # Refunded money is no longer owed to (or earned by) the seller
+    if refunds:
+        lot_owner_id = await get_lot_owner(session, booking.lot_id)
+        await debit_seller(
+            session,
+            lot_owner_id,
+            sum(p.seller_payout_amount for p in refunds),
+            len(refunds),
+        )
+        await apply_earnings_changes(
+            session,
+            earnings_changes(
+                # The booking itself is uncounted once, with its first refund
+                payment_earnings(booking, lot_owner_id, p, bookings=int(i == 0), sign=-1)
+                for i, p in enumerate(refunds)
+            ),
+        )
+
+    booking.status = "CANCELLED"
+    session.add(booking)
+
+    # 3. Outbox (committed with the cancellation)
+    add_outbox_event(
+        session,
+        "booking_cancelled",
+        current_user.id,
+        {
+            "booking_id": str(booking.id),
+            "lot_id": str(booking.lot_id),
+            "spot_id": str(booking.spot_id),
+            "refund_amount": refund_inr,
+            "revoke_qr": {
+                "booking_id": str(booking.id),
+                "end_time": booking.end_time.isoformat(),
+            },
+            "invalidate_keys": (
+                [qr_cache_key(booking.qr_code_data)] if booking.qr_code_data else []
+            ),
+        },
+    )
+    if refunds:
+        add_outbox_event(
+            session,
+            "refund_requested",
+            current_user.id,
+            {
+                "booking_id": str(booking.id),
+                "payments": [
+                    {
+                        "payment_id": str(p.id),
+                        "razorpay_payment_id": p.razorpay_payment_id,
+                        "amount": p.amount_charged,
+                    }
+                    for p in refunds
+                ],
+            },
+        )
+
+    await session.commit()
+
+    return BookingCancelResponse(
+        booking_id=booking.id,
+        status="CANCELLED",
+        refund_amount=refund_inr,
+        currency="INR",
+    )
+
+
+@router.post("/bulk", response_model=BulkBookingResponse)
+async def create_bulk_booking(
+    payload: BulkBookingCreate,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Books N spots across one or more lots for the same window (B2B fleets).
+    1. Prices every lot in one query.
+    2. Locks N free windows in one set-based statement (SKIP LOCKED).
+    3. Creates one aggregated Razorpay order.
+    4. Writes Holds + Bookings + Payments (multi-row) with one commit.
+    """
+    if not 1 <= payload.spot_count <= settings.BULK_BOOKING_MAX_SPOTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"spot_count must be between 1 and {settings.BULK_BOOKING_MAX_SPOTS}.",
+        )
+
+    ist = timezone("Asia/Kolkata")
+    start_db = payload.start_time.astimezone(ist).replace(tzinfo=None)
+    end_db = payload.end_time.astimezone(ist).replace(tzinfo=None)
+
+    # 1. Pricing (lots without an active rate are skipped)
+    rules = await get_active_rules(session, payload.lot_ids)
+    lot_ids = [lot_id for lot_id in payload.lot_ids if lot_id in rules]
+
+    if not lot_ids:
+        raise HTTPException(
+            status_code=400, detail="Pricing configuration error: No active rate found."
+        )
+
+    # 2. Allocation + Hold
+    rows = await lock_available_windows(
+        session, lot_ids, payload.vehicle_type, start_db, end_db, payload.spot_count
+    )
+
+    if not rows or (len(rows) < payload.spot_count and not payload.allow_partial):
+        await session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Only {len(rows)} of {payload.spot_count} spots are available for the selected time.",
+        )
+
+    allocations = []
+    for i, (window, lot_id, spot_name) in enumerate(rows):
+        amount_inr, _ = calculate_amount(rules[lot_id], start_db, end_db)
+        allocations.append(
             {
-                "amount": amount_paise,
-                "currency": "INR",
-                "receipt": f"rcpt_{uuid.uuid4().hex[:10]}",
-                "notes": {
-                    "user_id": str(current_user.id),
-                    "lot_id": str(payload.lot_id),
-                    "spot_id": str(spot.id),
-                },
+                "booking_id": uuid.uuid4(),
+                "window": window,
+                "lot_id": lot_id,
+                "spot_id": window.spot_id,
+                "spot_name": spot_name,
+                "start_time": start_db,
+                "end_time": end_db,
+                "amount": amount_inr,
+                "vehicle_plate": (
+                    normalize_plate(payload.vehicle_plates[i])
+                    if i < len(payload.vehicle_plates)
+                    else None
+                ),
             }
         )
+
+    total_inr = sum(a["amount"] for a in allocations)
+
+    # 3. One Razorpay Order for the whole fleet
+    try:
+        loop = asyncio.get_running_loop()
+        order_data = await loop.run_in_executor(
+            None,
+            lambda: client.order.create(
+                {
+                    "amount": int(total_inr * 100),
+                    "currency": "INR",
+                    "receipt": f"bulk_{allocations[0]['booking_id'].hex[:10]}",
+                    "notes": {
+                        "user_id": str(current_user.id),
+                        "booking_count": str(len(allocations)),
+                        "lot_count": str(len({a["lot_id"] for a in allocations})),
+                    },
+                }
+            ),
+        )
     except Exception as e:
         print(f"[Razorpay Error] {e}")
+        await session.rollback()
         raise HTTPException(
             status_code=502, detail="Payment gateway error. Please try again."
         )
 
-    # 5. Create Booking Record (PENDING)
-    new_booking = Booking(
-        driver_user_id=current_user.id,
-        lot_id=payload.lot_id,
-        spot_id=spot.id,
-        start_time=start_db,
-        end_time=end_db,
-        status="PENDING",
+    # 4. Holds + Bookings + Payments, one commit
+    for a in allocations:
+        split_window(
+            session, a["window"], start_db, end_db, "HELD", a["booking_id"]
+        )
+    await insert_bookings(session, current_user.id, allocations, order_data["id"])
+    add_outbox_event(
+        session,
+        "bulk_booking_initiated",
+        current_user.id,
+        {
+            "razorpay_order_id": order_data["id"],
+            "requested": payload.spot_count,
+            "allocated": len(allocations),
+            "amount": total_inr,
+        },
     )
-    session.add(new_booking)
     await session.commit()
-    await session.refresh(new_booking)
 
-    # 6. Create Payment Ledger (PENDING)
-    new_payment = Payment(
-        booking_id=new_booking.id,
+    return BulkBookingResponse(
         razorpay_order_id=order_data["id"],
-        amount_charged=amount_inr,
-        commission_fee=amount_inr * 0.20,  # 20% Platform Fee
-        seller_payout_amount=amount_inr * 0.80,
+        amount=total_inr,
+        currency="INR",
         status="PENDING",
+        requested=payload.spot_count,
+        allocated=len(allocations),
+        bookings=[
+            BulkBookingItem(
+                booking_id=a["booking_id"],
+                lot_id=a["lot_id"],
+                spot_id=a["spot_id"],
+                spot_name=a["spot_name"],
+                amount=a["amount"],
+                vehicle_plate=a["vehicle_plate"],
+            )
+            for a in allocations
+        ],
     )
-    session.add(new_payment)
-    await session.commit()
 
-    # 7. Log Event
-    background_tasks.add_task(
-        log_event,
-        "booking_initiated",
-        str(current_user.id),
+
+@router.post("/recurring", response_model=RecurringBookingResponse)
+async def create_recurring_booking(
+    payload: RecurringBookingCreate,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Books a commuter pattern (e.g. every weekday 9-6) in one go.
+    1. Expands the RRULE-like pattern into windows.
+    2. Checks all of them in one set-based availability query.
+    3. Keeps one consistent spot wherever possible, then locks those windows.
+    4. One Razorpay order; Holds + Bookings + Payments with one commit.
+    """
+    ist = timezone("Asia/Kolkata")
+    start_db = payload.start_time.astimezone(ist).replace(tzinfo=None)
+    end_db = payload.end_time.astimezone(ist).replace(tzinfo=None)
+    until_db = (
+        payload.until.astimezone(ist).replace(tzinfo=None) if payload.until else None
+    )
+
+    # 1. Expand
+    try:
+        occurrences = expand_occurrences(
+            start_db,
+            end_db,
+            payload.freq,
+            interval=payload.interval,
+            by_weekday=payload.by_weekday,
+            count=payload.count,
+            until=until_db,
+            max_occurrences=settings.RECURRING_MAX_OCCURRENCES,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rule = (await get_active_rules(session, [payload.lot_id])).get(payload.lot_id)
+    if not rule:
+        raise HTTPException(
+            status_code=400, detail="Pricing configuration error: No active rate found."
+        )
+
+    # 2 + 3. One availability query, one consistent spot, one locking query
+    candidates = await find_windows_for_occurrences(
+        session, payload.lot_id, payload.vehicle_type, occurrences
+    )
+    spot_names = {spot_id: name for _, _, spot_id, name in candidates}
+    assignment = assign_spots(
+        [(idx, window_id, spot_id) for idx, window_id, spot_id, _ in candidates],
+        len(occurrences),
+    )
+    locked = await lock_windows_by_ids(
+        session, list({window_id for window_id, _ in assignment.values()})
+    )
+
+    allocations = []
+    for idx, (occ_start, occ_end) in enumerate(occurrences):
+        window_id, spot_id = assignment.get(idx, (None, None))
+        window = locked.get(window_id)
+        # Someone may have taken or trimmed the window since the check
+        if not window or window.start_time > occ_start or window.end_time < occ_end:
+            continue
+
+        amount_inr, _ = calculate_amount(rule, occ_start, occ_end)
+        allocations.append(
+            {
+                "booking_id": uuid.uuid4(),
+                "window": window,
+                "lot_id": payload.lot_id,
+                "spot_id": spot_id,
+                "spot_name": spot_names[spot_id],
+                "start_time": occ_start,
+                "end_time": occ_end,
+                "amount": amount_inr,
+                "vehicle_plate": normalize_plate(payload.vehicle_plate),
+            }
+        )
+
+    booked_starts = {a["start_time"] for a in allocations}
+    unavailable = [s for s, _ in occurrences if s not in booked_starts]
+
+    if not allocations or (unavailable and not payload.allow_partial):
+        await session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"{len(unavailable)} of {len(occurrences)} occurrences are not available.",
+        )
+
+    total_inr = sum(a["amount"] for a in allocations)
+
+    # 4. One Razorpay Order for the whole pattern
+    try:
+        loop = asyncio.get_running_loop()
+        order_data = await loop.run_in_executor(
+            None,
+            lambda: client.order.create(
+                {
+                    "amount": int(total_inr * 100),
+                    "currency": "INR",
+                    "receipt": f"recur_{allocations[0]['booking_id'].hex[:10]}",
+                    "notes": {
+                        "user_id": str(current_user.id),
+                        "lot_id": str(payload.lot_id),
+                        "booking_count": str(len(allocations)),
+                    },
+                }
+            ),
+        )
+    except Exception as e:
+        print(f"[Razorpay Error] {e}")
+        await session.rollback()
+        raise HTTPException(
+            status_code=502, detail="Payment gateway error. Please try again."
+        )
+
+    # Several occurrences can land in one long window; carve them together
+    slices_by_window = {}
+    for a in allocations:
+        slices_by_window.setdefault(a["window"].id, (a["window"], []))[1].append(
+            (a["start_time"], a["end_time"], a["booking_id"])
+        )
+    for window, slices in slices_by_window.values():
+        carve_window(session, window, slices, "HELD")
+
+    await insert_bookings(session, current_user.id, allocations, order_data["id"])
+    add_outbox_event(
+        session,
+        "recurring_booking_initiated",
+        current_user.id,
         {
-            "booking_id": str(new_booking.id),
+            "razorpay_order_id": order_data["id"],
             "lot_id": str(payload.lot_id),
-            "amount": amount_inr,
-            "duration": duration_hours,
+            "occurrences": len(occurrences),
+            "booked": len(allocations),
+            "amount": total_inr,
         },
     )
+    await session.commit()
 
-    return BookingResponse(
-        booking_id=new_booking.id,
+    return RecurringBookingResponse(
         razorpay_order_id=order_data["id"],
-        amount=amount_inr,
+        amount=total_inr,
         currency="INR",
         status="PENDING",
+        occurrences=len(occurrences),
+        booked=len(allocations),
+        spots_used=len({a["spot_id"] for a in allocations}),
+        bookings=[
+            RecurringBookingItem(
+                booking_id=a["booking_id"],
+                lot_id=a["lot_id"],
+                spot_id=a["spot_id"],
+                spot_name=a["spot_name"],
+                amount=a["amount"],
+                vehicle_plate=a["vehicle_plate"],
+                start_time=a["start_time"],
+                end_time=a["end_time"],
+            )
+            for a in allocations
+        ],
+        unavailable=unavailable,
     )
 
 
 @router.post("/webhook")
 async def razorpay_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
     x_razorpay_signature: str = Header(None),
+    x_razorpay_event_id: str = Header(None),
     session: AsyncSession = Depends(get_session),
 ):
     """
     Secure Webhook:
     1. Verifies Signature.
-    2. Updates Payment -> PAID.
-    3. Updates Booking -> CONFIRMED.
-    4. Splits Availability Window.
-    5. Sends SMS Notification.
+    2. Drops Duplicate Deliveries (Event ID claim in Redis, short-lived
+       until the event is committed or queued).
+    3a. Queue Mode: Appends the raw event to the Redis Stream and acks at once.
+    3b. Sync Mode: Confirms Payment/Booking inline; the SMS Notification
+        goes out via the outbox relay.
     """
     if not x_razorpay_signature:
         raise HTTPException(status_code=400, detail="Missing Signature Header")
@@ -207,105 +937,29 @@ async def razorpay_webhook(
         print("[Security] Invalid Razorpay Signature")
         raise HTTPException(status_code=400, detail="Invalid Signature")
 
-    # 2. Process Payload
-    payload = await request.json()
-    event = payload.get("event")
-
-    if event == "payment.captured":
-        payment_entity = payload["payload"]["payment"]["entity"]
-        order_id = payment_entity["order_id"]
-
-        # Find Payment
-        stmt = select(Payment).where(Payment.razorpay_order_id == order_id)
-        result = await session.execute(stmt)
-        payment_record = result.scalars().first()
-
-        if not payment_record:
-            return {"status": "ignored", "reason": "Payment not found in DB"}
-
-        # Idempotency Check
-        if payment_record.status == "PAID_BY_DRIVER":
-            return {"status": "ignored", "reason": "Already processed"}
-
-        # Update Payment
-        payment_record.status = "PAID_BY_DRIVER"
-        payment_record.razorpay_payment_id = payment_entity["id"]
-        session.add(payment_record)
-
-        # Update Booking
-        booking_stmt = select(Booking).where(Booking.id == payment_record.booking_id)
-        booking_result = await session.execute(booking_stmt)
-        booking = booking_result.scalars().first()
-
-        if booking:
-            booking.status = "CONFIRMED"
-            booking.qr_code_data = f"pk_{uuid.uuid4().hex[:12]}"
-            session.add(booking)
-
-            # ---------------------------------------------------------
-            # ATOMIC AVAILABILITY SPLITTING
-            # ---------------------------------------------------------
-            avail_stmt = select(SpotAvailability).where(
-                SpotAvailability.spot_id == booking.spot_id,
-                SpotAvailability.start_time <= booking.start_time,
-                SpotAvailability.end_time >= booking.end_time,
-                SpotAvailability.status == "AVAILABLE",
+    # 2. Dedupe by Event ID (retries never reach Postgres)
+    if x_razorpay_event_id and not await claim_event(x_razorpay_event_id):
+        return {"status": "ignored", "reason": "Duplicate event"}
+
+    try:
+        # 3a. Fast-ack: the webhook worker applies it (app/workers/webhook_worker.py)
+        if settings.RAZORPAY_WEBHOOK_MODE == "queue":
+            await enqueue_webhook(body_bytes.decode(), x_razorpay_event_id)
+            response = {"status": "queued"}
+        else:
+            # 3b. Process Payload (commits before returning)
+            payload = await request.json()
+            response = await handle_webhook_event(
+                session, payload, x_razorpay_event_id
             )
-            avail_result = await session.execute(avail_stmt)
-            original_window = avail_result.scalars().first()
-
-            if original_window:
-                # A. Create "Before" Window (if gap exists)
-                if original_window.start_time < booking.start_time:
-                    before_window = SpotAvailability(
-                        spot_id=booking.spot_id,
-                        start_time=original_window.start_time,
-                        end_time=booking.start_time,
-                        status="AVAILABLE",
-                    )
-                    session.add(before_window)
-
-                # B. Create "Booked" Window
-                booked_window = SpotAvailability(
-                    spot_id=booking.spot_id,
-                    start_time=booking.start_time,
-                    end_time=booking.end_time,
-                    status="BOOKED",
-                    booking_id=booking.id,
-                )
-                session.add(booked_window)
-
-                # C. Create "After" Window (if gap exists)
-                if original_window.end_time > booking.end_time:
-                    after_window = SpotAvailability(
-                        spot_id=booking.spot_id,
-                        start_time=booking.end_time,
-                        end_time=original_window.end_time,
-                        status="AVAILABLE",
-                    )
-                    session.add(after_window)
-
-                # D. Delete Original Window
-                await session.delete(original_window)
-
-            await session.commit()
-
-            # ---------------------------------------------------------
-            # NOTIFICATIONS
-            # ---------------------------------------------------------
-            # Fetch details for SMS
-            user = await session.get(User, booking.driver_user_id)
-            lot = await session.get(ParkingLot, booking.lot_id)
-
-            if user and lot:
-                background_tasks.add_task(
-                    notify_booking_confirmed,
-                    user_phone=user.phone,
-                    user_name=user.name,
-                    lot_name=lot.name,
-                    booking_id=str(booking.id),
-                )
-
-        return {"status": "ok"}
-
-    return {"status": "ignored"}
+    except Exception:
+        # Let Razorpay's retry through instead of dropping it as a duplicate
+        if x_razorpay_event_id:
+            await release_event(x_razorpay_event_id)
+        raise
+
+    # Only a committed/queued event holds the claim for the dedupe window
+    if x_razorpay_event_id:
+        await confirm_event(x_razorpay_event_id)
+
+    return response
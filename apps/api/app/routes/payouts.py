@@ -1,26 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import Date, cast, func, literal_column
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
+from datetime import date, datetime, timedelta
+from pytz import timezone
+from typing import Literal
 import json
-import razorpay
+import uuid
 
 from app.db import get_session
-from app.models import User, PayoutAccount, Payment, Booking, ParkingLot
-from app.schemas import PayoutAccountCreate, PayoutAccountRead
+from app.models import (
+    User,
+    LotEarningsDaily,
+    ParkingLot,
+    PayoutAccount,
+    PayoutJob,
+    SellerBalance,
+)
+from app.schemas import (
+    EarningsResponse,
+    EarningsRow,
+    PayoutAccountCreate,
+    PayoutAccountRead,
+    PayoutJobRead,
+    SellerBalanceRead,
+)
 from app.security import get_current_user
-from app.config import settings
-from app.services.notifications import notify_payout_processed
-from app.services.logger import log_event
+from app.services.payout_jobs import start_payout_job
 
 router = APIRouter()
 
-# Initialize Razorpay Client (for Payouts/Razorpay X)
-# Note: Standard client is for collections. Razorpay X usually requires a separate client
-# or specific API calls, but we use the standard client for the MVP simulation.
-razorpay_client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
-
 
 # --- 1. Payout Account Management (Seller) ---
 
@@ -79,17 +88,120 @@ async def get_my_payout_account(
     return account
 
 
+@router.get("/balance", response_model=SellerBalanceRead)
+async def get_my_balance(
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Amount currently owed to the seller (one ledger row, no payment scan).
+    """
+    balance = await session.get(SellerBalance, current_user.id)
+    if not balance:
+        return SellerBalanceRead()
+    return SellerBalanceRead(
+        amount_due=balance.amount_due,
+        payment_count=balance.payment_count,
+        updated_at=balance.updated_at,
+    )
+
+
+MAX_EARNINGS_RANGE_DAYS = 366
+
+
+@router.get("/earnings", response_model=EarningsResponse)
+async def get_my_earnings(
+    start: date | None = Query(None),
+    end: date | None = Query(None),
+    group_by: Literal["day", "week", "lot"] = Query("day"),
+    lot_id: uuid.UUID | None = Query(None),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Seller earnings for [start, end] (booking dates, IST; default: the last
+    30 days), by day, week or lot. Served from the daily rollups.
+    """
+    today_ist = datetime.now(timezone("Asia/Kolkata")).date()
+    end = end or today_ist
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end.")
+    if (end - start).days >= MAX_EARNINGS_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range can span at most {MAX_EARNINGS_RANGE_DAYS} days.",
+        )
+
+    if group_by == "lot":
+        keys = [LotEarningsDaily.lot_id, ParkingLot.name]
+    elif group_by == "week":
+        # Inlined so SELECT and GROUP BY are the same expression
+        keys = [cast(func.date_trunc(literal_column("'week'"), LotEarningsDaily.day), Date)]
+    else:
+        keys = [LotEarningsDaily.day]
+
+    stmt = (
+        select(
+            *keys,
+            func.sum(LotEarningsDaily.gross),
+            func.sum(LotEarningsDaily.commission),
+            func.sum(LotEarningsDaily.payout),
+            func.sum(LotEarningsDaily.booking_count),
+        )
+        .where(
+            LotEarningsDaily.owner_user_id == current_user.id,
+            LotEarningsDaily.day >= start,
+            LotEarningsDaily.day <= end,
+        )
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    if group_by == "lot":
+        stmt = stmt.join(ParkingLot, ParkingLot.id == LotEarningsDaily.lot_id)
+    if lot_id:
+        stmt = stmt.where(LotEarningsDaily.lot_id == lot_id)
+
+    rows = []
+    for *key, gross, commission, payout, booking_count in (await session.execute(stmt)).all():
+        row = EarningsRow(
+            gross=round(gross or 0.0, 2),
+            commission=round(commission or 0.0, 2),
+            payout=round(payout or 0.0, 2),
+            booking_count=booking_count or 0,
+        )
+        if group_by == "lot":
+            row.lot_id, row.lot_name = key
+        else:
+            row.period = key[0]
+        rows.append(row)
+
+    totals = EarningsRow(
+        gross=round(sum(r.gross for r in rows), 2),
+        commission=round(sum(r.commission for r in rows), 2),
+        payout=round(sum(r.payout for r in rows), 2),
+        booking_count=sum(r.booking_count for r in rows),
+    )
+    return EarningsResponse(
+        group_by=group_by, start=start, end=end, totals=totals, rows=rows
+    )
+
+
 # --- 2. Batch Payout Processing (Admin/Cron Job) ---
 
 
-@router.post("/process-batch")
+@router.post(
+    "/process-batch",
+    response_model=PayoutJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def trigger_payout_batch(
-    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     """
-    Calculates owed amounts for all sellers and triggers Razorpay Payouts.
+    Queues a payout batch for all sellers and returns the job immediately.
+    app/workers/payout_runner.py pays sellers in checkpointed chunks.
     This is designed to be called by a weekly Cron Job.
     """
     # 1. Security Check
@@ -100,105 +212,20 @@ async def trigger_payout_batch(
             f"[Security Warning] Payout batch triggered by {current_user.role} user: {current_user.id}"
         )
 
-    # 2. Find Unsettled Payments (Status: PAID_BY_DRIVER)
-    stmt = select(Payment).where(Payment.status == "PAID_BY_DRIVER")
-    payments = (await session.execute(stmt)).scalars().all()
-
-    if not payments:
-        return {"message": "No pending payouts found.", "processed_count": 0}
-
-    # 3. Aggregate Money by Seller
-    # Structure: { seller_id: { 'amount': 0.0, 'payment_ids': [] } }
-    payouts_map = {}
-
-    for payment in payments:
-        # Fetch associated Booking & Lot to find the Seller
-        booking = await session.get(Booking, payment.booking_id)
-        if not booking:
-            continue
-
-        lot = await session.get(ParkingLot, booking.lot_id)
-        if not lot:
-            continue
-
-        seller_id = lot.owner_user_id
-
-        if seller_id not in payouts_map:
-            payouts_map[seller_id] = {"amount": 0.0, "payment_ids": []}
-
-        payouts_map[seller_id]["amount"] += payment.seller_payout_amount
-        payouts_map[seller_id]["payment_ids"].append(payment.id)
-
-    # 4. Process Transfers
-    results = []
-
-    for seller_id, data in payouts_map.items():
-        total_amount = data["amount"]
-        payment_ids = data["payment_ids"]
-
-        # Fetch Seller's Payout Details
-        acct_stmt = select(PayoutAccount).where(PayoutAccount.user_id == seller_id)
-        payout_account = (await session.execute(acct_stmt)).scalars().first()
-
-        status_msg = "Skipped (No Payout Account Linked)"
-
-        if payout_account and total_amount > 0:
-            try:
-                # REAL LOGIC: Check environment
-                if "dummy" not in settings.RAZORPAY_KEY_ID:
-                    # In a real scenario, you use razorpay_client.payout.create()
-                    # Since that requires a funded RazorpayX account, we simulate success here
-                    # but log that we *would* have called the API.
-
-                    # payload = {
-                    #     "account_number": settings.RAZORPAY_X_ACCOUNT_NUMBER,
-                    #     "amount": int(total_amount * 100),
-                    #     "currency": "INR",
-                    #     "mode": "IMPS",
-                    #     "purpose": "payout",
-                    #     "fund_account_id": json.loads(payout_account.account_details_encrypted).get("id")
-                    # }
-                    # razorpay_client.payout.create(payload)
-
-                    status_msg = "Processed (Simulated)"
-                else:
-                    status_msg = "Processed (Dev Mock)"
-
-                # Update Payment Ledger
-                for pid in payment_ids:
-                    p = await session.get(Payment, pid)
-                    p.status = "PAYOUT_TO_SELLER_COMPLETE"
-                    session.add(p)
-
-                # Notify Seller via SMS
-                seller = await session.get(User, seller_id)
-                if seller:
-                    background_tasks.add_task(
-                        notify_payout_processed,
-                        seller_phone=seller.phone,
-                        amount=total_amount,
-                    )
-
-                # Log Data Event
-                background_tasks.add_task(
-                    log_event,
-                    "payout_processed",
-                    str(seller_id),
-                    {
-                        "amount": total_amount,
-                        "currency": "INR",
-                        "transaction_count": len(payment_ids),
-                    },
-                )
-
-            except Exception as e:
-                status_msg = f"Failed: {str(e)}"
-                print(f"[Payout Error] Seller {seller_id}: {e}")
-
-        results.append(
-            {"seller_id": str(seller_id), "amount": total_amount, "status": status_msg}
-        )
+    # 2. One batch at a time: a second trigger returns the job in progress
+    return await start_payout_job(session, current_user.id)
 
-    await session.commit()
 
-    return {"message": "Batch processing complete", "summary": results}
+@router.get("/jobs/{job_id}", response_model=PayoutJobRead)
+async def get_payout_job(
+    job_id: uuid.UUID,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Progress of a payout batch.
+    """
+    job = await session.get(PayoutJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Payout job not found.")
+    return job
@@ -1,13 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
+from sqlalchemy import String, any_, bindparam, func, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from datetime import datetime
+from datetime import datetime, timedelta
 from pytz import timezone
+from typing import Literal
+import base64
+import hashlib
 import uuid
 
 from app.db import get_session
-from app.models import User, Booking, ParkingLot
+from app.models import User, Booking, ParkingLot, CheckInEvent, LotOccupancy
 from app.deps import get_current_user
+from app.config import settings
+from app.services.plates import normalize_plate
+from app.services.occupancy import (
+    check_in,
+    check_out,
+    get_live_occupancy,
+    is_checked_in,
+)
+from app.services.scan_cache import (
+    cache_many_scan_data,
+    cache_scan_data,
+    get_many_scan_data,
+    get_scan_data,
+    scan_data,
+)
+from app.services.qr_tokens import (
+    export_lot_key,
+    get_lot_owner,
+    is_qr_token,
+    is_revoked,
+    revoked_among,
+    verify_qr_token,
+)
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -24,6 +52,14 @@ class BookingListSchema(BaseModel):
     qr_code_data: str | None
 
 
+class ActiveBookingSchema(BaseModel):
+    id: uuid.UUID
+    lot_name: str
+    start_time: datetime
+    end_time: datetime
+    qr_code_data: str | None
+
+
 class ScanRequest(BaseModel):
     qr_code: str
 
@@ -36,60 +72,274 @@ class ScanResponse(BaseModel):
     time_remaining: str | None = None
 
 
+class PlateScanRequest(BaseModel):
+    lot_id: uuid.UUID
+    plate: str
+
+
+class BatchScanRequest(BaseModel):
+    lot_id: uuid.UUID | None = None  # required for plates
+    qr_codes: list[str] = []
+    plates: list[str] = []
+
+
+class BatchScanItem(ScanResponse):
+    query: str
+    kind: Literal["qr", "plate"]
+
+
+class GateFeedItem(BaseModel):
+    booking_id: uuid.UUID
+    status: str
+    start_time: datetime
+    end_time: datetime
+    vehicle_plate: str | None
+    qr_code_data: str | None
+    updated_at: datetime
+
+
+class GateFeedResponse(BaseModel):
+    lot_id: uuid.UUID
+    next_cursor: str
+    has_more: bool
+    bookings: list[GateFeedItem]
+
+
+class OccupancyResponse(BaseModel):
+    lot_id: uuid.UUID
+    occupied: int
+    source: Literal["live", "persisted"]
+
+
+class GateKeyResponse(BaseModel):
+    lot_id: uuid.UUID
+    key: str
+    algorithm: str
+
+
 # --- Routes ---
 
 
+MY_BOOKINGS_PAGE_SIZE = 50
+
+
+def _encode_booking_cursor(created_at: datetime, booking_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{booking_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_booking_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(booking_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def _paginate_bookings(rows: list, limit: int) -> tuple[list, str | None]:
+    """
+    Trims a limit + 1 fetch to one page; returns the page and the cursor
+    for the next one (None when this is the last page).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _encode_booking_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+
 @router.get("/my-bookings", response_model=list[BookingListSchema])
 async def get_my_bookings(
+    response: Response,
+    scope: Literal["all", "upcoming", "past"] = Query("all"),
+    status_filter: str | None = Query(None, alias="status"),
+    cursor: str | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=200),
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    """Returns all bookings for the logged-in driver."""
+    """
+    Returns the logged-in driver's bookings, newest first.
+    Without cursor or limit, returns all of them (the original contract).
+    Passing either pages them, keyset on (created_at, id) via
+    ix_booking_driver_created_at, `limit` (default 50) at a time; the
+    cursor for the next page is in the X-Next-Cursor header (absent on
+    the last page).
+    """
     stmt = (
-        select(Booking, ParkingLot.name, ParkingLot.address)
+        select(
+            Booking.id,
+            ParkingLot.name.label("lot_name"),
+            ParkingLot.address,
+            Booking.start_time,
+            Booking.end_time,
+            Booking.status,
+            Booking.qr_code_data,
+            Booking.created_at,
+        )
         .join(ParkingLot, Booking.lot_id == ParkingLot.id)
         .where(Booking.driver_user_id == current_user.id)
-        .order_by(Booking.created_at.desc())
     )
-    result = await session.execute(stmt)
-    rows = result.all()
-
-    # FIX: Safe unpacking of rows
-    bookings = []
-    for row in rows:
-        # Unpack the tuple (Booking instance, lot_name string, lot_address string)
-        booking_obj, lot_name, lot_address = row
-
-        bookings.append(
-            BookingListSchema(
-                id=booking_obj.id,
-                lot_name=lot_name,
-                address=lot_address,
-                start_time=booking_obj.start_time,
-                end_time=booking_obj.end_time,
-                status=booking_obj.status,
-                qr_code_data=booking_obj.qr_code_data,
-            )
+
+    if scope != "all":
+        ist = timezone("Asia/Kolkata")
+        now_ist = datetime.now(ist).replace(tzinfo=None)
+        if scope == "upcoming":
+            stmt = stmt.where(Booking.end_time > now_ist)
+        else:
+            stmt = stmt.where(Booking.end_time <= now_ist)
+
+    if status_filter:
+        stmt = stmt.where(Booking.status == status_filter.upper())
+
+    if cursor:
+        stmt = stmt.where(
+            tuple_(Booking.created_at, Booking.id) < tuple_(*_decode_booking_cursor(cursor))
         )
 
-    return bookings
+    stmt = stmt.order_by(Booking.created_at.desc(), Booking.id.desc())
+    if cursor is None and limit is None:
+        return (await session.execute(stmt)).mappings().all()
 
+    limit = limit or MY_BOOKINGS_PAGE_SIZE
+    rows = (await session.execute(stmt.limit(limit + 1))).mappings().all()
+    rows, next_cursor = _paginate_bookings(rows, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-@router.post("/scan", response_model=ScanResponse)
-async def scan_booking(
-    payload: ScanRequest,
+    return rows
+
+
+@router.get("/my-bookings/next", response_model=list[ActiveBookingSchema])
+async def get_next_bookings(
+    limit: int = Query(3, ge=1, le=10),
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     """
-    Seller scans a QR code.
+    Home screen projection: the driver's next few CONFIRMED bookings that
+    haven't ended yet, soonest first.
+    """
+    ist = timezone("Asia/Kolkata")
+    now_ist = datetime.now(ist).replace(tzinfo=None)
+
+    stmt = (
+        select(
+            Booking.id,
+            ParkingLot.name.label("lot_name"),
+            Booking.start_time,
+            Booking.end_time,
+            Booking.qr_code_data,
+        )
+        .join(ParkingLot, Booking.lot_id == ParkingLot.id)
+        .where(
+            Booking.driver_user_id == current_user.id,
+            Booking.status == "CONFIRMED",
+            Booking.end_time > now_ist,
+        )
+        .order_by(Booking.start_time)
+        .limit(limit)
+    )
+    return (await session.execute(stmt)).mappings().all()
+
+
+def evaluate_scan(
+    status: str,
+    start_time: datetime,
+    end_time: datetime,
+    driver_name: str | None,
+    vehicle_plate: str | None,
+) -> ScanResponse:
+    """Gate verdict for a booking's status/window (Strict IST)."""
+    ist = timezone("Asia/Kolkata")
+    now_ist = datetime.now(ist).replace(tzinfo=None)
+
+    if status != "CONFIRMED":
+        return ScanResponse(success=False, message=f"Booking is {status}")
+
+    if now_ist < start_time:
+        wait_minutes = int((start_time - now_ist).total_seconds() / 60)
+        return ScanResponse(
+            success=False,
+            message=f"Too Early! Check in starts in {wait_minutes} mins.",
+            driver_name=driver_name,
+        )
+
+    if now_ist > end_time:
+        return ScanResponse(
+            success=False, message="Booking Expired!", driver_name=driver_name
+        )
+
+    return ScanResponse(
+        success=True,
+        message="Verified ✅",
+        driver_name=driver_name,
+        vehicle_plate=vehicle_plate or "Not Provided",
+    )
+
+
+async def resolve_scan(
+    session: AsyncSession, code: str, current_user: User
+) -> tuple[ScanResponse, dict]:
+    """
+    Looks a QR code up for the lot owner scanning it and returns the
+    verdict plus the booking it belongs to (booking_id, lot_id, end_time).
+    Signed QR tokens are verified with CPU only (plus a Redis revocation
+    check); revoked tokens and legacy `pk_` codes are served from the
+    `qr:{code}` cache, falling back to the DB join.
     """
-    # 1. Find Booking
+    # 1. Fast Path: self-verifying token
+    if is_qr_token(code):
+        claims = verify_qr_token(code)
+        if not claims:
+            raise HTTPException(status_code=404, detail="Invalid QR Code.")
+
+        lot_owner_id = await get_lot_owner(session, claims["lot_id"])
+        if lot_owner_id != current_user.id:
+            raise HTTPException(
+                status_code=403, detail="You do not own this parking lot."
+            )
+
+        if not await is_revoked(claims["booking_id"]):
+            verdict = evaluate_scan(
+                "CONFIRMED",
+                claims["start_time"],
+                claims["end_time"],
+                claims["driver_name"],
+                claims["vehicle_plate"],
+            )
+            return verdict, {
+                "booking_id": claims["booking_id"],
+                "lot_id": claims["lot_id"],
+                "end_time": claims["end_time"],
+            }
+
+    # 2. Cached Verdict Data (one Redis GET)
+    cached = await get_scan_data(code)
+    if cached and "booking_id" in cached:
+        if cached["lot_owner_id"] != str(current_user.id):
+            raise HTTPException(
+                status_code=403, detail="You do not own this parking lot."
+            )
+        end_time = datetime.fromisoformat(cached["end_time"])
+        verdict = evaluate_scan(
+            cached["status"],
+            datetime.fromisoformat(cached["start_time"]),
+            end_time,
+            cached["driver_name"],
+            cached["vehicle_plate"],
+        )
+        return verdict, {
+            "booking_id": uuid.UUID(cached["booking_id"]),
+            "lot_id": uuid.UUID(cached["lot_id"]),
+            "end_time": end_time,
+        }
+
+    # 3. Find Booking
     stmt = (
         select(Booking, User.name, ParkingLot.owner_user_id)
         .join(User, Booking.driver_user_id == User.id)
         .join(ParkingLot, Booking.lot_id == ParkingLot.id)
-        .where(Booking.qr_code_data == payload.qr_code)
+        .where(Booking.qr_code_data == code)
     )
     result = await session.execute(stmt)
     row = result.first()
@@ -100,33 +350,510 @@ async def scan_booking(
     # FIX: Safe unpacking
     booking, driver_name, lot_owner_id = row
 
-    # 2. Verify Ownership
+    # 4. Verify Ownership
     if lot_owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="You do not own this parking lot.")
 
-    # 3. Verify Logic (Strict IST)
+    # Read-through: the owner's next scan of this code skips the join
+    await cache_scan_data(scan_data(booking, driver_name, lot_owner_id))
+
+    # 5. Verify Logic
+    verdict = evaluate_scan(
+        booking.status,
+        booking.start_time,
+        booking.end_time,
+        driver_name,
+        booking.vehicle_plate,
+    )
+    return verdict, {
+        "booking_id": booking.id,
+        "lot_id": booking.lot_id,
+        "end_time": booking.end_time,
+    }
+
+
+@router.post("/scan", response_model=ScanResponse)
+async def scan_booking(
+    payload: ScanRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Seller scans a QR code (verification only; see scan_in/scan_out).
+    """
+    verdict, _ = await resolve_scan(session, payload.qr_code, current_user)
+    return verdict
+
+
+@router.post("/scan/in", response_model=ScanResponse)
+async def scan_in(
+    payload: ScanRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Entry gate: verifies like scan_booking, then records a check-in event
+    and bumps the lot's live occupancy counter. A second scan-in of a car
+    that is already inside is rejected.
+    """
+    verdict, ref = await resolve_scan(session, payload.qr_code, current_user)
+    if not verdict.success:
+        return verdict
+
+    already_in = ScanResponse(
+        success=False,
+        message="Already checked in.",
+        driver_name=verdict.driver_name,
+        vehicle_plate=verdict.vehicle_plate,
+    )
+    if await is_checked_in(ref["booking_id"]):
+        return already_in
+
+    event = CheckInEvent(
+        booking_id=ref["booking_id"],
+        lot_id=ref["lot_id"],
+        direction="IN",
+        scanned_by=current_user.id,
+    )
+    session.add(event)
+    await session.commit()
+
+    # The counter only moves once the event is durable
+    occupied = await check_in(ref["booking_id"], ref["lot_id"], ref["end_time"])
+    if occupied is None:
+        # A concurrent scan of the same car got there first
+        await session.delete(event)
+        await session.commit()
+        return already_in
+
+    return verdict
+
+
+@router.post("/scan/out", response_model=ScanResponse)
+async def scan_out(
+    payload: ScanRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Exit gate: records a check-out event and decrements the lot's live
+    occupancy. Works after the booking ended (overstays still have to
+    leave); only cars that checked in can check out.
+    """
+    verdict, ref = await resolve_scan(session, payload.qr_code, current_user)
+
+    not_in = ScanResponse(
+        success=False,
+        message="Not checked in.",
+        driver_name=verdict.driver_name,
+        vehicle_plate=verdict.vehicle_plate,
+    )
+    if not await is_checked_in(ref["booking_id"]):
+        return not_in
+
+    event = CheckInEvent(
+        booking_id=ref["booking_id"],
+        lot_id=ref["lot_id"],
+        direction="OUT",
+        scanned_by=current_user.id,
+    )
+    session.add(event)
+    await session.commit()
+
+    # The counter only moves once the event is durable
+    occupied = await check_out(ref["booking_id"], ref["lot_id"])
+    if occupied is None:
+        # A concurrent scan of the same car got there first
+        await session.delete(event)
+        await session.commit()
+        return not_in
+
+    return ScanResponse(
+        success=True,
+        message="Checked out 👋",
+        driver_name=verdict.driver_name,
+        vehicle_plate=verdict.vehicle_plate,
+    )
+
+
+def _active_plate_bookings(lot_id: uuid.UUID, now_ist: datetime):
+    """
+    A lot's CONFIRMED, not-yet-ended bookings (+ driver name), soonest
+    first; callers add the plate condition. Served by the partial index
+    ix_booking_lot_plate_confirmed (plates are stored normalized).
+    """
+    return (
+        select(Booking, User.name)
+        .join(User, Booking.driver_user_id == User.id)
+        .where(
+            Booking.lot_id == lot_id,
+            Booking.status == "CONFIRMED",
+            Booking.end_time > now_ist,
+        )
+        .order_by(Booking.start_time)
+    )
+
+
+@router.post("/scan/plate", response_model=ScanResponse)
+async def scan_plate(
+    payload: PlateScanRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Verifies a driver by plate when the QR can't be shown: one index probe
+    for the lot's current (or next) confirmed booking on that plate.
+    """
+    plate = normalize_plate(payload.plate)
+    if not plate:
+        raise HTTPException(status_code=400, detail="Invalid plate.")
+
+    if await get_lot_owner(session, payload.lot_id) != current_user.id:
+        raise HTTPException(status_code=403, detail="You do not own this parking lot.")
+
     ist = timezone("Asia/Kolkata")
     now_ist = datetime.now(ist).replace(tzinfo=None)
+    stmt = (
+        _active_plate_bookings(payload.lot_id, now_ist)
+        .where(Booking.vehicle_plate == plate)
+        .limit(1)
+    )
+    row = (await session.execute(stmt)).first()
 
-    if booking.status != "CONFIRMED":
-        return ScanResponse(success=False, message=f"Booking is {booking.status}")
+    if not row:
+        return ScanResponse(success=False, message="No active booking for this plate.")
 
-    if now_ist < booking.start_time:
-        wait_minutes = int((booking.start_time - now_ist).total_seconds() / 60)
-        return ScanResponse(
-            success=False,
-            message=f"Too Early! Check in starts in {wait_minutes} mins.",
-            driver_name=driver_name,
+    booking, driver_name = row
+    return evaluate_scan(
+        booking.status,
+        booking.start_time,
+        booking.end_time,
+        driver_name,
+        booking.vehicle_plate,
+    )
+
+
+@router.post("/scan/batch", response_model=list[BatchScanItem])
+async def scan_batch(
+    payload: BatchScanRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Verifies a burst of QR codes and/or plates (ANPR cameras) at once,
+    with the same rules as scan_booking:
+    1. Signed tokens: CPU + one batched revocation check.
+    2. Other codes: one Redis MGET, then one `= ANY(...)` query for misses.
+    3. Plates: one `= ANY(...)` probe of ix_booking_lot_plate_confirmed.
+    Results come back in request order (codes first, then plates).
+    """
+    codes = list(dict.fromkeys(payload.qr_codes))
+    plates = list(dict.fromkeys(payload.plates))
+
+    if len(codes) + len(plates) > settings.SCAN_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.SCAN_BATCH_MAX_ITEMS} items per batch.",
         )
+    if plates and not payload.lot_id:
+        raise HTTPException(status_code=400, detail="lot_id is required for plates.")
 
-    if now_ist > booking.end_time:
-        return ScanResponse(
-            success=False, message="Booking Expired!", driver_name=driver_name
+    not_owned = ScanResponse(success=False, message="You do not own this parking lot.")
+    invalid = ScanResponse(success=False, message="Invalid QR Code.")
+    verdicts: dict[str, ScanResponse] = {}
+
+    # 1. Signed Tokens
+    unresolved = []
+    token_claims = {}
+    for code in codes:
+        if not is_qr_token(code):
+            unresolved.append(code)
+        elif claims := verify_qr_token(code):
+            token_claims[code] = claims
+        else:
+            verdicts[code] = invalid
+
+    revoked = await revoked_among([c["booking_id"] for c in token_claims.values()])
+    owners = {
+        lot_id: await get_lot_owner(session, lot_id)
+        for lot_id in {c["lot_id"] for c in token_claims.values()}
+    }
+    for code, claims in token_claims.items():
+        if claims["booking_id"] in revoked:
+            unresolved.append(code)
+        elif owners[claims["lot_id"]] != current_user.id:
+            verdicts[code] = not_owned
+        else:
+            verdicts[code] = evaluate_scan(
+                "CONFIRMED",
+                claims["start_time"],
+                claims["end_time"],
+                claims["driver_name"],
+                claims["vehicle_plate"],
+            )
+
+    # 2. Cached Verdict Data (one MGET), then one query for the misses
+    misses = []
+    for code, cached in zip(unresolved, await get_many_scan_data(unresolved)):
+        if not cached:
+            misses.append(code)
+        elif cached["lot_owner_id"] != str(current_user.id):
+            verdicts[code] = not_owned
+        else:
+            verdicts[code] = evaluate_scan(
+                cached["status"],
+                datetime.fromisoformat(cached["start_time"]),
+                datetime.fromisoformat(cached["end_time"]),
+                cached["driver_name"],
+                cached["vehicle_plate"],
+            )
+
+    if misses:
+        stmt = (
+            select(Booking, User.name, ParkingLot.owner_user_id)
+            .join(User, Booking.driver_user_id == User.id)
+            .join(ParkingLot, Booking.lot_id == ParkingLot.id)
+            .where(
+                Booking.qr_code_data
+                == any_(bindparam("codes", misses, type_=ARRAY(String)))
+            )
         )
+        rows = (await session.execute(stmt)).all()
+        # Read-through for the caller's own lots only (after the owner check)
+        await cache_many_scan_data(
+            [
+                scan_data(booking, name, owner)
+                for booking, name, owner in rows
+                if owner == current_user.id
+            ]
+        )
+        for booking, driver_name, lot_owner_id in rows:
+            if lot_owner_id != current_user.id:
+                verdicts[booking.qr_code_data] = not_owned
+            else:
+                verdicts[booking.qr_code_data] = evaluate_scan(
+                    booking.status,
+                    booking.start_time,
+                    booking.end_time,
+                    driver_name,
+                    booking.vehicle_plate,
+                )
 
-    return ScanResponse(
-        success=True,
-        message="Verified ✅",
-        driver_name=driver_name,
-        vehicle_plate=booking.vehicle_plate or "Not Provided",
+    # 3. Plates
+    plate_verdicts: dict[str, ScanResponse] = {}
+    if plates:
+        normalized = {plate: normalize_plate(plate) for plate in plates}
+        if await get_lot_owner(session, payload.lot_id) != current_user.id:
+            plate_verdicts = {plate: not_owned for plate in plates}
+        else:
+            ist = timezone("Asia/Kolkata")
+            now_ist = datetime.now(ist).replace(tzinfo=None)
+            stmt = _active_plate_bookings(payload.lot_id, now_ist).where(
+                Booking.vehicle_plate
+                == any_(
+                    bindparam(
+                        "plates",
+                        [p for p in normalized.values() if p],
+                        type_=ARRAY(String),
+                    )
+                )
+            )
+            # Current (or soonest) booking per plate
+            by_plate = {}
+            for booking, driver_name in (await session.execute(stmt)).all():
+                by_plate.setdefault(booking.vehicle_plate, (booking, driver_name))
+
+            for plate, norm in normalized.items():
+                if norm not in by_plate:
+                    plate_verdicts[plate] = ScanResponse(
+                        success=False, message="No active booking for this plate."
+                    )
+                    continue
+                booking, driver_name = by_plate[norm]
+                plate_verdicts[plate] = evaluate_scan(
+                    booking.status,
+                    booking.start_time,
+                    booking.end_time,
+                    driver_name,
+                    booking.vehicle_plate,
+                )
+
+    return [
+        BatchScanItem(query=code, kind="qr", **verdicts.get(code, invalid).model_dump())
+        for code in codes
+    ] + [
+        BatchScanItem(query=plate, kind="plate", **plate_verdicts[plate].model_dump())
+        for plate in plates
+    ]
+
+
+@router.get("/lots/{lot_id}/occupancy", response_model=OccupancyResponse)
+async def get_lot_occupancy(
+    lot_id: uuid.UUID,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Cars currently inside a lot (scan-in minus scan-out), from the live Redis
+    counter; falls back to the last persisted value if Redis has none.
+    """
+    occupied = await get_live_occupancy(lot_id)
+    if occupied is not None:
+        return OccupancyResponse(lot_id=lot_id, occupied=occupied, source="live")
+
+    persisted = await session.get(LotOccupancy, lot_id)
+    return OccupancyResponse(
+        lot_id=lot_id,
+        occupied=persisted.occupied if persisted else 0,
+        source="persisted",
+    )
+
+
+@router.get("/lots/{lot_id}/gate-key", response_model=GateKeyResponse)
+async def get_gate_key(
+    lot_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Provisions a gate device with its lot's QR verification key, so it can
+    validate signed QR tokens offline.
+    """
+    lot_owner_id = await get_lot_owner(session, lot_id)
+    if lot_owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="You do not own this parking lot.")
+
+    return GateKeyResponse(lot_id=lot_id, key=export_lot_key(lot_id), algorithm="HS256")
+
+
+# booking.updated_at is stamped by trigger with its transaction's start
+# time, so every row a still-running transaction wrote (or will write) is
+# at or after that transaction's xact_start. The feed only hands out rows
+# strictly older than the oldest in-flight writer's start: nothing can
+# later commit behind a cursor.
+_FEED_SETTLED_AT = select(
+    func.timezone(
+        "utc",
+        func.least(func.now(), func.coalesce(func.min(text("xact_start")), func.now())),
+    )
+).select_from(text("pg_stat_activity")).where(text("backend_xid IS NOT NULL"))
+
+
+def _encode_feed_cursor(updated_at: datetime, booking_id: uuid.UUID, horizon: datetime) -> str:
+    raw = f"{updated_at.isoformat()}|{booking_id}|{horizon.isoformat()}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_feed_cursor(cursor: str) -> tuple[datetime, uuid.UUID, datetime]:
+    try:
+        updated_at, booking_id, horizon = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        return (
+            datetime.fromisoformat(updated_at),
+            uuid.UUID(booking_id),
+            datetime.fromisoformat(horizon),
+        )
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+@router.get("/lots/{lot_id}/gate-feed", response_model=GateFeedResponse)
+async def get_gate_feed(
+    lot_id: uuid.UUID,
+    hours: int = Query(12, ge=1, le=48),
+    cursor: str | None = Query(None),
+    limit: int = Query(500, ge=1, le=2000),
+    if_none_match: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Delta sync for offline gate scanners.
+    - No cursor: the lot's CONFIRMED bookings overlapping the next `hours`.
+    - With cursor: only bookings changed since (any status except PENDING,
+      so devices drop cancelled ones) plus bookings that moved into the
+      window since the last sync.
+    Pages in (updated_at, id) order via ix_booking_lot_id_updated_at;
+    keep following next_cursor while has_more. Sends an ETag and answers
+    a matching If-None-Match with 304 (nothing new; keep the old cursor).
+    """
+    lot_owner_id = await get_lot_owner(session, lot_id)
+    if lot_owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="You do not own this parking lot.")
+
+    ist = timezone("Asia/Kolkata")
+    now_ist = datetime.now(ist).replace(tzinfo=None)
+    horizon = now_ist + timedelta(hours=hours)
+    settled = (await session.execute(_FEED_SETTLED_AT)).scalar_one()
+
+    in_window = (
+        Booking.lot_id == lot_id,
+        Booking.start_time < horizon,
+        Booking.end_time > now_ist,
+    )
+
+    # 1. Changed Bookings (keyset page)
+    stmt = select(Booking).where(*in_window, Booking.updated_at < settled)
+    entered = []
+
+    if cursor:
+        after_updated_at, after_id, prev_horizon = _decode_feed_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(Booking.updated_at, Booking.id) > tuple_(after_updated_at, after_id),
+            Booking.status != "PENDING",
+        )
+
+        # 2. Unchanged Bookings that entered the window since the last sync
+        if horizon > prev_horizon:
+            entered_stmt = select(Booking).where(
+                *in_window,
+                Booking.status == "CONFIRMED",
+                Booking.start_time >= prev_horizon,
+                Booking.updated_at <= after_updated_at,
+            )
+            entered = (await session.execute(entered_stmt)).scalars().all()
+    else:
+        after_updated_at, after_id = datetime.min, uuid.UUID(int=0)
+        stmt = stmt.where(Booking.status == "CONFIRMED")
+
+    stmt = stmt.order_by(Booking.updated_at, Booking.id).limit(limit + 1)
+    changed = (await session.execute(stmt)).scalars().all()
+
+    has_more = len(changed) > limit
+    changed = changed[:limit]
+    if changed:
+        after_updated_at, after_id = changed[-1].updated_at, changed[-1].id
+    elif not has_more and after_updated_at < settled:
+        # Caught up: nothing up to `settled` is left to send
+        after_updated_at, after_id = settled, uuid.UUID(int=0)
+
+    feed = GateFeedResponse(
+        lot_id=lot_id,
+        next_cursor=_encode_feed_cursor(after_updated_at, after_id, horizon),
+        has_more=has_more,
+        bookings=[
+            GateFeedItem(
+                booking_id=b.id,
+                status=b.status,
+                start_time=b.start_time,
+                end_time=b.end_time,
+                vehicle_plate=b.vehicle_plate,
+                qr_code_data=b.qr_code_data,
+                updated_at=b.updated_at,
+            )
+            for b in [*entered, *changed]
+        ],
+    )
+
+    # 3. ETag over the bookings only: the cursor moves with the clock, and on
+    # a 304 the device simply keeps (and re-sends) the cursor it has.
+    content = feed.model_dump_json(exclude={"next_cursor"})
+    etag = f'"{hashlib.sha256(content.encode()).hexdigest()[:32]}"'
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return Response(
+        content=feed.model_dump_json(),
+        media_type="application/json",
+        headers={"ETag": etag},
     )
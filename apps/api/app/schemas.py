@@ -2,7 +2,7 @@
 from pydantic import BaseModel
 from typing import Optional, List
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 
 
 # --- Request Schemas ---
@@ -156,6 +156,20 @@ class BookingCreate(BaseModel):
     start_time: datetime
     end_time: datetime
     vehicle_type: str = "CAR"
+    vehicle_plate: Optional[str] = None  # defaults to the user's default plate
+    quote_token: Optional[str] = None
+
+
+class QuoteResponse(BaseModel):
+    lot_id: uuid.UUID
+    spot_id: uuid.UUID
+    start_time: datetime
+    end_time: datetime
+    amount: float
+    currency: str
+    rate_type: str
+    quote_token: str
+    expires_at: datetime
 
 
 class BookingResponse(BaseModel):
@@ -166,6 +180,87 @@ class BookingResponse(BaseModel):
     status: str
 
 
+class BookingExtend(BaseModel):
+    minutes: int
+
+
+class BookingExtendResponse(BaseModel):
+    booking_id: uuid.UUID
+    end_time: datetime
+    razorpay_order_id: Optional[str] = None
+    amount: float
+    currency: str
+    status: str
+
+
+class BookingCancelResponse(BaseModel):
+    booking_id: uuid.UUID
+    status: str
+    refund_amount: float
+    currency: str
+
+
+class BulkBookingCreate(BaseModel):
+    lot_ids: List[uuid.UUID]
+    spot_count: int
+    start_time: datetime
+    end_time: datetime
+    vehicle_type: str = "CAR"
+    vehicle_plates: List[str] = []
+    allow_partial: bool = False
+
+
+class BulkBookingItem(BaseModel):
+    booking_id: uuid.UUID
+    lot_id: uuid.UUID
+    spot_id: uuid.UUID
+    spot_name: str
+    amount: float
+    vehicle_plate: Optional[str] = None
+
+
+class BulkBookingResponse(BaseModel):
+    razorpay_order_id: str
+    amount: float
+    currency: str
+    status: str
+    requested: int
+    allocated: int
+    bookings: List[BulkBookingItem]
+
+
+class RecurringBookingCreate(BaseModel):
+    lot_id: uuid.UUID
+    # First occurrence; later ones repeat the same time of day
+    start_time: datetime
+    end_time: datetime
+    vehicle_type: str = "CAR"
+    vehicle_plate: Optional[str] = None
+    freq: str = "WEEKLY"  # DAILY | WEEKLY
+    interval: int = 1
+    by_weekday: List[str] = []  # MO, TU, WE, TH, FR, SA, SU
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+    allow_partial: bool = False
+
+
+class RecurringBookingItem(BulkBookingItem):
+    start_time: datetime
+    end_time: datetime
+
+
+class RecurringBookingResponse(BaseModel):
+    razorpay_order_id: str
+    amount: float
+    currency: str
+    status: str
+    occurrences: int
+    booked: int
+    spots_used: int
+    bookings: List[RecurringBookingItem]
+    unavailable: List[datetime]
+
+
 class PayoutAccountCreate(BaseModel):
     account_type: str = "upi"
     details: dict
@@ -177,6 +272,43 @@ class PayoutAccountRead(BaseModel):
     is_active: bool
 
 
+class SellerBalanceRead(BaseModel):
+    amount_due: float = 0.0
+    payment_count: int = 0
+    currency: str = "INR"
+    updated_at: Optional[datetime] = None
+
+
+class EarningsRow(BaseModel):
+    period: Optional[date] = None  # day, or the Monday of the week
+    lot_id: Optional[uuid.UUID] = None
+    lot_name: Optional[str] = None
+    gross: float = 0.0
+    commission: float = 0.0
+    payout: float = 0.0
+    booking_count: int = 0
+
+
+class EarningsResponse(BaseModel):
+    group_by: str
+    start: date
+    end: date
+    currency: str = "INR"
+    totals: EarningsRow
+    rows: List[EarningsRow]
+
+
+class PayoutJobRead(BaseModel):
+    id: uuid.UUID
+    status: str
+    sellers_processed: int
+    sellers_failed: int
+    amount_paid: float
+    last_error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
 class PricingCreate(BaseModel):
     lot_id: uuid.UUID
     rate: float
@@ -0,0 +1,98 @@
+# apps/api/app/services/allocation.py
+"""
+Spot allocation policies.
+
+Every policy picks among AVAILABLE windows that fully contain the request:
+- first_fit:    earliest-starting window (what the DB used to hand back).
+- best_fit:     smallest containing window, so short stays fill short gaps
+                and long open windows stay intact for long stays.
+- pack_by_spot: spots that already have bookings that day first (then
+                best-fit), keeping other spots completely free.
+
+Each policy exists twice with the same semantics: as ORDER BY clauses for the
+locking query in app/services/inventory.py, and as choose_window() over
+in-memory windows (used by bench/allocation_simulator.py).
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+
+from app.models import SpotAvailability
+
+POLICIES = ("first_fit", "best_fit", "pack_by_spot")
+BUSY_STATUSES = ("BOOKED", "HELD")
+
+
+def _day_bounds(start: datetime) -> tuple[datetime, datetime]:
+    day_start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day_start, day_start + timedelta(days=1)
+
+
+def allocation_order(policy: str, start: datetime) -> list:
+    """ORDER BY clauses implementing `policy` on SpotAvailability rows."""
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown allocation policy: {policy}")
+
+    if policy == "first_fit":
+        return [SpotAvailability.start_time, SpotAvailability.id]
+
+    slack = SpotAvailability.end_time - SpotAvailability.start_time
+
+    if policy == "best_fit":
+        return [slack, SpotAvailability.id]
+
+    # pack_by_spot: busiest spot of the day first
+    day_start, day_end = _day_bounds(start)
+    other = aliased(SpotAvailability)
+    busy = (
+        select(func.count())
+        .where(
+            other.spot_id == SpotAvailability.spot_id,
+            other.status.in_(BUSY_STATUSES),
+            other.start_time < day_end,
+            other.end_time > day_start,
+        )
+        .correlate(SpotAvailability)
+        .scalar_subquery()
+    )
+    return [busy.desc(), slack, SpotAvailability.id]
+
+
+def choose_window(windows: list, start: datetime, end: datetime, policy: str):
+    """
+    In-memory equivalent of allocation_order(): `windows` are all windows of
+    the candidate spots (any status, anything with spot_id/start_time/
+    end_time/status). Returns the chosen AVAILABLE window or None.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown allocation policy: {policy}")
+
+    candidates = [
+        w
+        for w in windows
+        if w.status == "AVAILABLE" and w.start_time <= start and w.end_time >= end
+    ]
+    if not candidates:
+        return None
+
+    if policy == "first_fit":
+        return min(candidates, key=lambda w: w.start_time)
+
+    if policy == "best_fit":
+        return min(candidates, key=lambda w: w.end_time - w.start_time)
+
+    day_start, day_end = _day_bounds(start)
+    busy = {}
+    for w in windows:
+        if (
+            w.status in BUSY_STATUSES
+            and w.start_time < day_end
+            and w.end_time > day_start
+        ):
+            busy[w.spot_id] = busy.get(w.spot_id, 0) + 1
+
+    return min(
+        candidates,
+        key=lambda w: (-busy.get(w.spot_id, 0), w.end_time - w.start_time),
+    )
@@ -0,0 +1,62 @@
+# apps/api/app/services/bulk_bookings.py
+from datetime import datetime
+import uuid
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Booking, Payment
+
+
+async def insert_bookings(
+    session: AsyncSession,
+    driver_user_id: uuid.UUID,
+    allocations: list[dict],
+    razorpay_order_id: str,
+):
+    """
+    Writes PENDING bookings and their payment ledger rows with one multi-row
+    INSERT per table. All payments share the aggregated gateway order, so a
+    single payment.captured webhook confirms the whole set.
+
+    Each allocation dict needs: booking_id, lot_id, spot_id, start_time,
+    end_time, amount and (optionally) vehicle_plate.
+    """
+    now = datetime.utcnow()
+
+    await session.execute(
+        insert(Booking).values(
+            [
+                {
+                    "id": a["booking_id"],
+                    "driver_user_id": driver_user_id,
+                    "lot_id": a["lot_id"],
+                    "spot_id": a["spot_id"],
+                    "start_time": a["start_time"],
+                    "end_time": a["end_time"],
+                    "status": "PENDING",
+                    "vehicle_plate": a.get("vehicle_plate"),
+                    "created_at": now,
+                }
+                for a in allocations
+            ]
+        )
+    )
+
+    await session.execute(
+        insert(Payment).values(
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "booking_id": a["booking_id"],
+                    "razorpay_order_id": razorpay_order_id,
+                    "amount_charged": a["amount"],
+                    "commission_fee": a["amount"] * 0.20,  # 20% Platform Fee
+                    "seller_payout_amount": a["amount"] * 0.80,
+                    "status": "PENDING",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for a in allocations
+            ]
+        )
+    )
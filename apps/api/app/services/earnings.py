@@ -0,0 +1,169 @@
+# apps/api/app/services/earnings.py
+"""
+Daily seller earnings rollups (LotEarningsDaily).
+
+A captured payment counts towards its booking's lot on the booking's start
+date (naive IST), so the incremental path and the backfill bucket it the
+same way whenever they run:
+- confirm_captured_payment adds it (and +1 booking for a new confirmation);
+- a cancellation that refunds it takes it back out;
+- rebuild_earnings() recomputes a date range from Payment (backfill).
+
+The live writers hold a shared advisory lock (EARNINGS_LOCK_KEY) until
+they commit and the rebuild takes it exclusively, so a confirmation is
+never half inside a rebuild's snapshot: it either committed before the
+rebuild read Payment, or applies its delta on top of the rebuilt rows.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time
+import uuid
+
+from sqlalchemy import BigInteger, Date, Numeric, cast, delete, distinct, func, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import Booking, LotEarningsDaily, ParkingLot, Payment
+
+# pg advisory lock key shared by the rollup writers and rebuild_earnings()
+EARNINGS_LOCK_KEY = 0x4541524E  # "EARN"
+
+# Captured and not refunded
+EARNED_STATUSES = ("PAID_BY_DRIVER", "PAYOUT_IN_PROGRESS", "PAYOUT_TO_SELLER_COMPLETE")
+
+
+def payment_earnings(
+    booking, owner_user_id: uuid.UUID, payment, bookings: int, sign: int = 1
+) -> tuple:
+    """One payment's contribution, as an earnings_changes() entry."""
+    return (
+        booking.lot_id,
+        booking.start_time.date(),
+        owner_user_id,
+        sign * payment.amount_charged,
+        sign * payment.commission_fee,
+        sign * payment.seller_payout_amount,
+        sign * bookings,
+    )
+
+
+def earnings_changes(entries) -> dict:
+    """
+    Sums (lot_id, day, owner_user_id, gross, commission, payout, bookings)
+    entries into {(lot_id, day): [owner_user_id, gross, commission, payout, bookings]}.
+    """
+    changes = defaultdict(lambda: [None, 0.0, 0.0, 0.0, 0])
+    for lot_id, day, owner_user_id, gross, commission, payout, bookings in entries:
+        change = changes[(lot_id, day)]
+        change[0] = owner_user_id
+        change[1] += gross
+        change[2] += commission
+        change[3] += payout
+        change[4] += bookings
+    return dict(changes)
+
+
+async def apply_earnings_changes(session: AsyncSession, changes: dict) -> None:
+    """
+    Adds earnings_changes() to the rollups with one multi-row upsert
+    (rows in key order, so concurrent confirmations lock them in the same
+    order). The caller commits.
+    """
+    if not changes:
+        return
+
+    # Shared: writers don't wait for each other, only for a rebuild
+    await session.execute(
+        select(func.pg_advisory_xact_lock_shared(literal(EARNINGS_LOCK_KEY, BigInteger)))
+    )
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "lot_id": lot_id,
+            "day": day,
+            "owner_user_id": owner_user_id,
+            "gross": gross,
+            "commission": commission,
+            "payout": payout,
+            "booking_count": bookings,
+            "updated_at": now,
+        }
+        for (lot_id, day), (owner_user_id, gross, commission, payout, bookings) in sorted(
+            changes.items(), key=lambda c: (str(c[0][0]), c[0][1])
+        )
+    ]
+
+    stmt = insert(LotEarningsDaily).values(rows)
+    table = LotEarningsDaily.__table__.c
+
+    def add(column: str):
+        # Rounded to paise so repeated float adds can't drift
+        return func.round(cast(table[column] + stmt.excluded[column], Numeric), 2)
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["lot_id", "day"],
+        set_={
+            "gross": add("gross"),
+            "commission": add("commission"),
+            "payout": add("payout"),
+            "booking_count": table.booking_count + stmt.excluded.booking_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def rebuild_earnings(session: AsyncSession, since: date, until: date) -> int:
+    """
+    Recomputes the rollups for days in [since, until) from Payment with one
+    INSERT ... SELECT (replacing what was there). Returns the rows written.
+    Holds EARNINGS_LOCK_KEY exclusively, so live confirmations and
+    cancellations wait until the caller commits.
+    """
+    await session.execute(
+        select(func.pg_advisory_xact_lock(literal(EARNINGS_LOCK_KEY, BigInteger)))
+    )
+    await session.execute(
+        delete(LotEarningsDaily).where(
+            LotEarningsDaily.day >= since, LotEarningsDaily.day < until
+        )
+    )
+
+    day = cast(Booking.start_time, Date)
+    source = (
+        select(
+            Booking.lot_id,
+            day.label("day"),
+            ParkingLot.owner_user_id,
+            func.round(cast(func.sum(Payment.amount_charged), Numeric), 2),
+            func.round(cast(func.sum(Payment.commission_fee), Numeric), 2),
+            func.round(cast(func.sum(Payment.seller_payout_amount), Numeric), 2),
+            func.count(distinct(Payment.booking_id)),
+            literal(datetime.utcnow()),
+        )
+        .join(Booking, Payment.booking_id == Booking.id)
+        .join(ParkingLot, Booking.lot_id == ParkingLot.id)
+        .where(
+            Payment.status.in_(EARNED_STATUSES),
+            Booking.start_time >= datetime.combine(since, time.min),
+            Booking.start_time < datetime.combine(until, time.min),
+        )
+        .group_by(Booking.lot_id, day, ParkingLot.owner_user_id)
+    )
+    result = await session.execute(
+        insert(LotEarningsDaily).from_select(
+            [
+                "lot_id",
+                "day",
+                "owner_user_id",
+                "gross",
+                "commission",
+                "payout",
+                "booking_count",
+                "updated_at",
+            ],
+            source,
+        )
+    )
+    return result.rowcount
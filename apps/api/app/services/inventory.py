@@ -0,0 +1,389 @@
+# apps/api/app/services/inventory.py
+from datetime import datetime
+import uuid
+from sqlalchemy import DateTime, Integer, and_, case, cast, delete, func, or_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.config import settings
+from app.models import ParkingSpot, SpotAvailability
+from app.services.allocation import allocation_order
+
+
+async def lock_available_window(
+    session: AsyncSession,
+    lot_id: uuid.UUID,
+    vehicle_type: str,
+    start: datetime,
+    end: datetime,
+    policy: str | None = None,
+    lock: bool = True,
+    exclude: list[int] | None = None,
+) -> SpotAvailability | None:
+    """
+    Finds an AVAILABLE window in the lot that fully contains [start, end]
+    and row-locks it for the rest of the transaction.
+    Which window wins is decided by the allocation policy (ALLOCATION_POLICY).
+    SKIP LOCKED lets concurrent bookers move on to the next free spot
+    instead of queueing behind a row someone else is already holding.
+    lock=False only peeks (used for quotes); `exclude` skips window ids a
+    quote already found soft-held.
+    """
+    statement = (
+        select(SpotAvailability)
+        .join(ParkingSpot, ParkingSpot.id == SpotAvailability.spot_id)
+        .where(ParkingSpot.lot_id == lot_id)
+        .where(ParkingSpot.spot_type == vehicle_type)
+        .where(
+            SpotAvailability.start_time <= start,
+            SpotAvailability.end_time >= end,
+            SpotAvailability.status == "AVAILABLE",
+        )
+        .order_by(*allocation_order(policy or settings.ALLOCATION_POLICY, start))
+        .limit(1)
+    )
+    if exclude:
+        statement = statement.where(SpotAvailability.id.not_in(exclude))
+    if lock:
+        statement = statement.with_for_update(of=SpotAvailability, skip_locked=True)
+
+    result = await session.execute(statement)
+    return result.scalars().first()
+
+
+async def lock_window_by_id(
+    session: AsyncSession, window_id: int, start: datetime, end: datetime
+) -> SpotAvailability | None:
+    """
+    Locks one specific window (primary-key lookup) if it is still AVAILABLE
+    and still contains [start, end]; used when a quote already chose it.
+    """
+    statement = (
+        select(SpotAvailability)
+        .where(
+            SpotAvailability.id == window_id,
+            SpotAvailability.start_time <= start,
+            SpotAvailability.end_time >= end,
+            SpotAvailability.status == "AVAILABLE",
+        )
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(statement)
+    return result.scalars().first()
+
+
+async def lock_available_windows(
+    session: AsyncSession,
+    lot_ids: list[uuid.UUID],
+    vehicle_type: str,
+    start: datetime,
+    end: datetime,
+    limit: int,
+    policy: str | None = None,
+) -> list[tuple[SpotAvailability, uuid.UUID, str]]:
+    """
+    Set-based version of lock_available_window for bulk bookings: locks up to
+    `limit` free windows across the given lots in a single statement.
+    Windows of one spot never overlap, so each containing window is a
+    distinct spot. Returns (window, lot_id, spot_name) rows.
+    """
+    statement = (
+        select(SpotAvailability, ParkingSpot.lot_id, ParkingSpot.name)
+        .join(ParkingSpot, ParkingSpot.id == SpotAvailability.spot_id)
+        .where(ParkingSpot.lot_id.in_(lot_ids))
+        .where(ParkingSpot.spot_type == vehicle_type)
+        .where(
+            SpotAvailability.start_time <= start,
+            SpotAvailability.end_time >= end,
+            SpotAvailability.status == "AVAILABLE",
+        )
+        .order_by(
+            ParkingSpot.lot_id,
+            *allocation_order(policy or settings.ALLOCATION_POLICY, start),
+        )
+        .limit(limit)
+        .with_for_update(of=SpotAvailability, skip_locked=True)
+    )
+    result = await session.execute(statement)
+    return [tuple(row) for row in result.all()]
+
+
+def split_window(
+    session: AsyncSession,
+    window: SpotAvailability,
+    start: datetime,
+    end: datetime,
+    status: str,
+    booking_id: uuid.UUID,
+) -> SpotAvailability:
+    """
+    Carves [start, end] out of an AVAILABLE window.
+    The original row is re-used for the carved part (one UPDATE instead of
+    DELETE + INSERT) and the leftover gaps become new AVAILABLE rows.
+    Nothing is flushed here; the caller commits everything in one go.
+    """
+    return carve_window(session, window, [(start, end, booking_id)], status)[0]
+
+
+def carve_window(
+    session: AsyncSession,
+    window: SpotAvailability,
+    slices: list[tuple[datetime, datetime, uuid.UUID]],
+    status: str,
+) -> list[SpotAvailability]:
+    """
+    Multi-slice split_window(): carves several non-overlapping
+    (start, end, booking_id) slices out of one AVAILABLE window, e.g. when a
+    recurring booking lands several occurrences in one long window.
+    """
+    window_end = window.end_time
+    cursor = window.start_time
+    carved = []
+
+    for start, end, booking_id in sorted(slices, key=lambda s: s[0]):
+        # Gap before this slice stays AVAILABLE
+        if cursor < start:
+            session.add(
+                SpotAvailability(
+                    spot_id=window.spot_id,
+                    start_time=cursor,
+                    end_time=start,
+                    status="AVAILABLE",
+                )
+            )
+
+        if not carved:
+            # Re-use the original row for the first slice
+            piece = window
+            piece.start_time = start
+            piece.end_time = end
+            piece.status = status
+            piece.booking_id = booking_id
+        else:
+            piece = SpotAvailability(
+                spot_id=window.spot_id,
+                start_time=start,
+                end_time=end,
+                status=status,
+                booking_id=booking_id,
+            )
+        session.add(piece)
+        carved.append(piece)
+        cursor = end
+
+    # Gap after the last slice stays AVAILABLE
+    if cursor < window_end:
+        session.add(
+            SpotAvailability(
+                spot_id=window.spot_id,
+                start_time=cursor,
+                end_time=window_end,
+                status="AVAILABLE",
+            )
+        )
+
+    return carved
+
+
+async def find_windows_for_occurrences(
+    session: AsyncSession,
+    lot_id: uuid.UUID,
+    vehicle_type: str,
+    occurrences: list[tuple[datetime, datetime]],
+) -> list[tuple[int, int, uuid.UUID, str]]:
+    """
+    One set-based availability check for many (start, end) occurrences:
+    joins the unnested occurrence arrays against the lot's AVAILABLE windows
+    and returns every (occurrence_index, window_id, spot_id, spot_name) that
+    could host an occurrence.
+    """
+    requested = select(
+        func.unnest(cast(list(range(len(occurrences))), ARRAY(Integer))).label("idx"),
+        func.unnest(cast([s for s, _ in occurrences], ARRAY(DateTime))).label(
+            "start_time"
+        ),
+        func.unnest(cast([e for _, e in occurrences], ARRAY(DateTime))).label(
+            "end_time"
+        ),
+    ).subquery("requested")
+
+    statement = (
+        select(
+            requested.c.idx,
+            SpotAvailability.id,
+            SpotAvailability.spot_id,
+            ParkingSpot.name,
+        )
+        .select_from(requested)
+        .join(
+            SpotAvailability,
+            and_(
+                SpotAvailability.start_time <= requested.c.start_time,
+                SpotAvailability.end_time >= requested.c.end_time,
+                SpotAvailability.status == "AVAILABLE",
+            ),
+        )
+        .join(ParkingSpot, ParkingSpot.id == SpotAvailability.spot_id)
+        .where(ParkingSpot.lot_id == lot_id)
+        .where(ParkingSpot.spot_type == vehicle_type)
+    )
+    result = await session.execute(statement)
+    return [tuple(row) for row in result.all()]
+
+
+async def lock_windows_by_ids(
+    session: AsyncSession, window_ids: list[int]
+) -> dict[int, SpotAvailability]:
+    """Locks the given windows if still AVAILABLE (SKIP LOCKED), keyed by id."""
+    statement = (
+        select(SpotAvailability)
+        .where(
+            SpotAvailability.id.in_(window_ids),
+            SpotAvailability.status == "AVAILABLE",
+        )
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(statement)
+    return {w.id: w for w in result.scalars().all()}
+
+
+async def release_window(session: AsyncSession, window: SpotAvailability):
+    """
+    Turns a HELD/BOOKED window back into AVAILABLE time and merges it with
+    the AVAILABLE fragments directly before/after it on the same spot, so
+    search keeps seeing one contiguous window instead of slivers.
+    Only the (indexed) spot's touching rows are locked, never a scan.
+    """
+    neighbours_stmt = (
+        select(SpotAvailability)
+        .where(
+            SpotAvailability.spot_id == window.spot_id,
+            SpotAvailability.status == "AVAILABLE",
+            or_(
+                SpotAvailability.end_time == window.start_time,
+                SpotAvailability.start_time == window.end_time,
+            ),
+        )
+        .with_for_update()
+    )
+    neighbours = (await session.execute(neighbours_stmt)).scalars().all()
+
+    for neighbour in neighbours:
+        window.start_time = min(window.start_time, neighbour.start_time)
+        window.end_time = max(window.end_time, neighbour.end_time)
+        await session.delete(neighbour)
+
+    window.status = "AVAILABLE"
+    window.booking_id = None
+    session.add(window)
+    return window
+
+
+async def release_booking_windows(
+    session: AsyncSession,
+    booking_ids: list[uuid.UUID],
+    statuses: tuple[str, ...] = ("HELD", "BOOKED"),
+) -> int:
+    """
+    Locks the windows carved for `booking_ids` (ix_spotavailability_booking_id)
+    and releases each one back into its spot's free time.
+    """
+    statement = (
+        select(SpotAvailability)
+        .where(
+            SpotAvailability.booking_id.in_(booking_ids),
+            SpotAvailability.status.in_(statuses),
+        )
+        .with_for_update()
+    )
+    windows = (await session.execute(statement)).scalars().all()
+    for window in windows:
+        await release_window(session, window)
+    return len(windows)
+
+
+async def extend_booked_window(
+    session: AsyncSession,
+    spot_id: uuid.UUID,
+    booking_id: uuid.UUID,
+    old_end: datetime,
+    new_end: datetime,
+) -> bool:
+    """
+    Grows a BOOKED window into the AVAILABLE fragment that starts exactly at
+    its end, with one locked UPDATE touching just those two rows:
+    the BOOKED row's end moves to new_end and the fragment's start follows.
+    Returns False (caller rolls back) if the fragment doesn't cover new_end.
+    """
+    is_free = SpotAvailability.status == "AVAILABLE"
+    statement = (
+        update(SpotAvailability)
+        .where(
+            SpotAvailability.spot_id == spot_id,
+            or_(
+                and_(
+                    is_free,
+                    SpotAvailability.start_time == old_end,
+                    SpotAvailability.end_time >= new_end,
+                ),
+                and_(
+                    SpotAvailability.status == "BOOKED",
+                    SpotAvailability.booking_id == booking_id,
+                    SpotAvailability.end_time == old_end,
+                ),
+            ),
+        )
+        .values(
+            start_time=case((is_free, new_end), else_=SpotAvailability.start_time),
+            end_time=case((is_free, SpotAvailability.end_time), else_=new_end),
+        )
+        .returning(
+            SpotAvailability.id, SpotAvailability.status, SpotAvailability.end_time
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await session.execute(statement)).all()
+
+    if {row.status for row in rows} != {"AVAILABLE", "BOOKED"}:
+        return False
+
+    # The extension used up the whole fragment; drop the empty row
+    for row in rows:
+        if row.status == "AVAILABLE" and row.end_time == new_end:
+            await session.execute(
+                delete(SpotAvailability)
+                .where(SpotAvailability.id == row.id)
+                .execution_options(synchronize_session=False)
+            )
+    return True
+
+
+async def hold_extension_window(
+    session: AsyncSession,
+    spot_id: uuid.UUID,
+    booking_id: uuid.UUID,
+    old_end: datetime,
+    new_end: datetime,
+) -> SpotAvailability | None:
+    """
+    Paid extensions: carves [old_end, new_end] out of the AVAILABLE fragment
+    that starts exactly at the booking's end as a HELD window for the
+    booking. The BOOKED window stays as it is until the delta is captured;
+    the sweeper releases the hold if it never is.
+    Returns None if the fragment doesn't cover new_end.
+    """
+    statement = (
+        select(SpotAvailability)
+        .where(
+            SpotAvailability.spot_id == spot_id,
+            SpotAvailability.start_time == old_end,
+            SpotAvailability.end_time >= new_end,
+            SpotAvailability.status == "AVAILABLE",
+        )
+        .with_for_update()
+    )
+    window = (await session.execute(statement)).scalars().first()
+    if not window:
+        return None
+    return split_window(session, window, old_end, new_end, "HELD", booking_id)
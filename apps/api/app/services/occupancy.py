@@ -0,0 +1,122 @@
+# apps/api/app/services/occupancy.py
+"""
+Live per-lot occupancy, kept in Redis and persisted by
+app/workers/occupancy_flusher.py.
+
+- `lot_occupancy` (hash):           lot_id -> cars inside (HINCRBY).
+- `lot_occupancy:dirty` (set):      lots changed since the last flush.
+- `checked_in:{booking_id}` (key):  the car is inside; makes scan-in/out
+                                    idempotent per booking.
+Each transition is one Lua script, so the marker and counter never diverge.
+"""
+from datetime import datetime
+import uuid
+
+from pytz import timezone
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis_client import redis_client
+from app.models import LotOccupancy
+
+OCCUPANCY_KEY = "lot_occupancy"
+DIRTY_KEY = "lot_occupancy:dirty"
+# Overstaying cars keep their marker this long past the booking end
+OVERSTAY_GRACE_SECONDS = 24 * 3600
+
+_CHECK_IN = redis_client.register_script(
+    """
+    if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[2]) then
+        return false
+    end
+    redis.call('SADD', KEYS[3], ARGV[1])
+    return redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+    """
+)
+
+_CHECK_OUT = redis_client.register_script(
+    """
+    if redis.call('DEL', KEYS[1]) == 0 then
+        return false
+    end
+    redis.call('SADD', KEYS[3], ARGV[1])
+    local occupied = redis.call('HINCRBY', KEYS[2], ARGV[1], -1)
+    if occupied < 0 then
+        redis.call('HSET', KEYS[2], ARGV[1], 0)
+        occupied = 0
+    end
+    return occupied
+    """
+)
+
+
+def _marker(booking_id: uuid.UUID) -> str:
+    return f"checked_in:{booking_id}"
+
+
+async def is_checked_in(booking_id: uuid.UUID) -> bool:
+    """Read-only marker check; check_in()/check_out() stay the atomic gate."""
+    return bool(await redis_client.exists(_marker(booking_id)))
+
+
+async def check_in(
+    booking_id: uuid.UUID, lot_id: uuid.UUID, end_time: datetime
+) -> int | None:
+    """Marks the car inside; returns the new occupancy, or None if already in."""
+    now_ist = datetime.now(timezone("Asia/Kolkata")).replace(tzinfo=None)
+    ttl = max(int((end_time - now_ist).total_seconds()), 0) + OVERSTAY_GRACE_SECONDS
+    return await _CHECK_IN(
+        keys=[_marker(booking_id), OCCUPANCY_KEY, DIRTY_KEY],
+        args=[str(lot_id), ttl],
+    )
+
+
+async def check_out(booking_id: uuid.UUID, lot_id: uuid.UUID) -> int | None:
+    """Marks the car gone; returns the new occupancy, or None if it wasn't in."""
+    return await _CHECK_OUT(
+        keys=[_marker(booking_id), OCCUPANCY_KEY, DIRTY_KEY],
+        args=[str(lot_id)],
+    )
+
+
+async def get_live_occupancy(lot_id: uuid.UUID) -> int | None:
+    occupied = await redis_client.hget(OCCUPANCY_KEY, str(lot_id))
+    return int(occupied) if occupied is not None else None
+
+
+async def flush_occupancy(session: AsyncSession) -> int:
+    """
+    Persists the counters of lots changed since the last flush with one
+    multi-row upsert. Returns the number of lots written.
+    """
+    # Pop the dirty set atomically; changes after this land in a new one.
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.smembers(DIRTY_KEY)
+        pipe.delete(DIRTY_KEY)
+        lot_ids, _ = await pipe.execute()
+
+    if not lot_ids:
+        return 0
+
+    lot_ids = sorted(lot_ids)
+    counts = await redis_client.hmget(OCCUPANCY_KEY, lot_ids)
+    now = datetime.utcnow()
+    rows = [
+        {"lot_id": uuid.UUID(lot_id), "occupied": int(count or 0), "updated_at": now}
+        for lot_id, count in zip(lot_ids, counts)
+    ]
+
+    stmt = insert(LotOccupancy).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["lot_id"],
+        set_={"occupied": stmt.excluded.occupied, "updated_at": stmt.excluded.updated_at},
+    )
+    try:
+        await session.execute(stmt)
+        await session.commit()
+    except Exception:
+        # Put the lots back so the next flush retries them
+        await redis_client.sadd(DIRTY_KEY, *lot_ids)
+        raise
+
+    return len(rows)
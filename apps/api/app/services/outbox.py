@@ -0,0 +1,69 @@
+# apps/api/app/services/outbox.py
+"""
+Transactional outbox for booking side effects.
+
+Write paths call add_outbox_event() before their commit, so the event exists
+if and only if the Booking/Payment change does. app/workers/outbox_relay.py
+drains the table and calls dispatch_event() (at-least-once: a crash between
+dispatch and marking the row processed re-delivers it).
+
+Every event goes to the event log; some event types carry extra effects:
+- payload["notify"]:          kwargs for notify_booking_confirmed (SMS).
+- payload["notify_payout"]:   kwargs for notify_payout_processed (SMS).
+- payload["invalidate_keys"]: Redis keys to delete (cache invalidation).
+- payload["revoke_qr"]:       booking_id/end_time to add to the QR revocation set.
+- payload["cache_qr"]:        scan_data() entries to warm the `qr:{code}` cache.
+"""
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+import uuid
+
+from app.core.redis_client import redis_client
+from app.models import OutboxEvent
+from app.services.logger import log_event
+from app.services.notifications import notify_booking_confirmed, notify_payout_processed
+from app.services.qr_tokens import revoke_qr_token
+from app.services.scan_cache import cache_many_scan_data
+
+
+def add_outbox_event(
+    session: AsyncSession,
+    event_type: str,
+    user_id: uuid.UUID | None,
+    payload: dict,
+) -> None:
+    """Stages an event in the caller's transaction (no commit here)."""
+    session.add(OutboxEvent(event_type=event_type, user_id=user_id, payload=payload))
+
+
+async def dispatch_event(event: OutboxEvent) -> None:
+    """Delivers one event. Raises if any side effect fails so it is retried."""
+    payload = dict(event.payload or {})
+    notify = payload.pop("notify", None)
+    notify_payout = payload.pop("notify_payout", None)
+    invalidate_keys = payload.pop("invalidate_keys", None)
+    revoke_qr = payload.pop("revoke_qr", None)
+    cache_qr = payload.pop("cache_qr", None)
+
+    if revoke_qr:
+        await revoke_qr_token(
+            revoke_qr["booking_id"], datetime.fromisoformat(revoke_qr["end_time"])
+        )
+
+    if invalidate_keys:
+        await redis_client.delete(*invalidate_keys)
+
+    if cache_qr:
+        await cache_many_scan_data(cache_qr)
+
+    if notify:
+        await notify_booking_confirmed(**notify)
+
+    if notify_payout:
+        await notify_payout_processed(**notify_payout)
+
+    await log_event(
+        event.event_type,
+        str(event.user_id) if event.user_id else None,
+        payload,
+    )
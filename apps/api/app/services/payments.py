@@ -0,0 +1,344 @@
+# apps/api/app/services/payments.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+
+from app.models import (
+    User,
+    ParkingLot,
+    SpotAvailability,
+    Booking,
+    Payment,
+    WebhookEvent,
+)
+from app.services.earnings import (
+    apply_earnings_changes,
+    earnings_changes,
+    payment_earnings,
+)
+from app.services.inventory import split_window
+from app.services.outbox import add_outbox_event
+from app.services.payout_jobs import apply_payout_event
+from app.services.qr_tokens import issue_qr_token
+from app.services.scan_cache import qr_cache_key, scan_data
+from app.services.seller_balance import apply_balance_changes, balance_changes
+
+# Payment states a payment.captured event may still move forward.
+# EXPIRED/CANCELLED cover a capture that lands after the sweeper gave up on
+# it or the driver cancelled; those are refunded, never confirmed.
+UNPAID_STATUSES = ("PENDING", "EXPIRED", "CANCELLED")
+
+# RazorpayX payout webhooks that can settle a SUBMITTED transfer
+PAYOUT_EVENTS = ("payout.processed", "payout.failed", "payout.reversed", "payout.rejected")
+
+
+async def handle_webhook_event(
+    session: AsyncSession, payload: dict, event_id: str | None = None
+) -> dict:
+    """
+    Applies a verified Razorpay webhook payload and returns the response body.
+    Side effects (SMS, event log) are written to the outbox in the same
+    transaction and delivered by app/workers/outbox_relay.py.
+    """
+    event = payload.get("event")
+
+    # Durable dedupe: the event row commits together with the confirmation,
+    # and a concurrent duplicate blocks on the PK then inserts nothing.
+    if event_id:
+        stmt = (
+            insert(WebhookEvent)
+            .values(event_id=event_id, event_type=event or "unknown")
+            .on_conflict_do_nothing(index_elements=["event_id"])
+            .returning(WebhookEvent.event_id)
+        )
+        inserted = (await session.execute(stmt)).first()
+        if not inserted:
+            await session.rollback()
+            return {"status": "ignored", "reason": "Duplicate event"}
+
+    if event == "payment.captured":
+        response = await confirm_captured_payment(
+            session, payload["payload"]["payment"]["entity"]
+        )
+    elif event in PAYOUT_EVENTS:
+        response = await apply_payout_event(session, payload["payload"]["payout"]["entity"])
+    else:
+        response = {"status": "ignored"}
+
+    await session.commit()
+    return response
+
+
+async def confirm_captured_payment(session: AsyncSession, payment_entity: dict) -> dict:
+    """
+    1. Converts the Spot Hold(s) -> BOOKED; a paid extension's hold also
+       moves the booking's end and reissues its QR.
+    2. Updates Payment(s) -> PAID (bulk orders carry one payment per booking),
+       or -> REFUND_PENDING when there is no window left to confirm.
+    3. Updates Booking(s) -> CONFIRMED.
+    4. Stages the confirmation SMS, scan cache warm-up + event in the outbox.
+    The caller commits.
+    """
+    order_id = payment_entity["order_id"]
+
+    # Lock order: Booking rows, then Payment rows, then windows -- the same
+    # as the sweeper and cancel_booking. A concurrent expiry/cancellation
+    # either commits first (and its statuses are read below) or finds the
+    # bookings locked and leaves them for the next sweep.
+    booking_ids_stmt = select(Payment.booking_id).where(
+        Payment.razorpay_order_id == order_id
+    )
+    order_booking_ids = set((await session.execute(booking_ids_stmt)).scalars().all())
+
+    if not order_booking_ids:
+        # Money for an order we never recorded (e.g. the request died after
+        # creating it): nothing to confirm, so it goes back.
+        add_outbox_event(
+            session,
+            "refund_requested",
+            None,
+            {
+                "razorpay_order_id": order_id,
+                "payments": [
+                    {
+                        "payment_id": None,
+                        "razorpay_payment_id": payment_entity["id"],
+                        "amount": payment_entity.get("amount", 0) / 100,
+                    }
+                ],
+            },
+        )
+        return {"status": "ok", "reason": "Unknown order; refund requested"}
+
+    booking_stmt = (
+        select(Booking)
+        .where(Booking.id.in_(order_booking_ids))
+        .order_by(Booking.id)
+        .with_for_update()
+    )
+    locked_bookings = {
+        b.id: b for b in (await session.execute(booking_stmt)).scalars().all()
+    }
+
+    # Find Payments (statuses as of the locks above)
+    stmt = (
+        select(Payment)
+        .where(Payment.razorpay_order_id == order_id)
+        .order_by(Payment.id)
+        .with_for_update()
+    )
+    payment_records = (await session.execute(stmt)).scalars().all()
+
+    # Idempotency Check
+    unpaid = [p for p in payment_records if p.status in UNPAID_STATUSES]
+    if not unpaid:
+        return {"status": "ignored", "reason": "Already processed"}
+
+    # Captured after the driver cancelled or the sweeper expired it: the
+    # spot was already given back, so the money goes straight back too.
+    refund_ids = {p.id for p in unpaid if p.status in ("CANCELLED", "EXPIRED")}
+    captured = [p for p in unpaid if p.id not in refund_ids]
+
+    bookings = [
+        locked_bookings[booking_id]
+        for booking_id in sorted({p.booking_id for p in captured})
+        if booking_id in locked_bookings
+    ]
+
+    # ---------------------------------------------------------
+    # HOLD -> BOOKED
+    # ---------------------------------------------------------
+    # New bookings carved out a HELD window at checkout, paid extensions
+    # a HELD window for their extra time.
+    held_windows = []
+    if bookings:
+        held_stmt = (
+            select(SpotAvailability)
+            .where(
+                SpotAvailability.booking_id.in_([b.id for b in bookings]),
+                SpotAvailability.status == "HELD",
+            )
+            .with_for_update()
+        )
+        held_windows = (await session.execute(held_stmt)).scalars().all()
+    held_booking_ids = {w.booking_id for w in held_windows}
+
+    # A booking is only confirmed with a BOOKED window behind it
+    booked_ids = set()
+    for booking in bookings:
+        if booking.status == "CONFIRMED" or (
+            booking.status == "PENDING" and booking.id in held_booking_ids
+        ):
+            booked_ids.add(booking.id)
+            continue
+        if booking.status != "PENDING":
+            continue
+
+        # Legacy bookings (created before holds) split on confirmation.
+        avail_stmt = (
+            select(SpotAvailability)
+            .where(
+                SpotAvailability.spot_id == booking.spot_id,
+                SpotAvailability.start_time <= booking.start_time,
+                SpotAvailability.end_time >= booking.end_time,
+                SpotAvailability.status == "AVAILABLE",
+            )
+            .with_for_update()
+        )
+        avail_result = await session.execute(avail_stmt)
+        original_window = avail_result.scalars().first()
+
+        if original_window:
+            split_window(
+                session,
+                original_window,
+                booking.start_time,
+                booking.end_time,
+                "BOOKED",
+                booking.id,
+            )
+            booked_ids.add(booking.id)
+        else:
+            # The spot went to someone else; nothing left to confirm
+            booking.status = "EXPIRED"
+            session.add(booking)
+
+    for held_window in held_windows:
+        if held_window.booking_id in booked_ids:
+            held_window.status = "BOOKED"
+            session.add(held_window)
+
+    refund_ids.update(p.id for p in captured if p.booking_id not in booked_ids)
+
+    # Update Payments
+    refunds = [p for p in unpaid if p.id in refund_ids]
+    for payment_record in unpaid:
+        payment_record.status = (
+            "REFUND_PENDING" if payment_record.id in refund_ids else "PAID_BY_DRIVER"
+        )
+        payment_record.razorpay_payment_id = payment_entity["id"]
+        session.add(payment_record)
+
+    if refunds:
+        add_outbox_event(
+            session,
+            "refund_requested",
+            None,
+            {
+                "razorpay_order_id": order_id,
+                "payments": [
+                    {
+                        "payment_id": str(p.id),
+                        "razorpay_payment_id": p.razorpay_payment_id,
+                        "amount": p.amount_charged,
+                    }
+                    for p in refunds
+                ],
+            },
+        )
+
+    # Update Bookings
+    paid = [p for p in unpaid if p.id not in refund_ids]
+    bookings = [b for b in bookings if b.id in booked_ids]
+    if not paid or not bookings:
+        return {"status": "ok"}
+
+    # Already-confirmed bookings here are paying for an extension
+    newly_confirmed = [b for b in bookings if b.status != "CONFIRMED"]
+
+    # Every booking in an order belongs to the same driver
+    user = await session.get(User, bookings[0].driver_user_id)
+
+    for booking in newly_confirmed:
+        booking.status = "CONFIRMED"
+        booking.qr_code_data = issue_qr_token(booking, user.name if user else None)
+        session.add(booking)
+
+    # Paid extensions: the stay now runs to the end of the held time, and
+    # the signed QR (which carries the validity window) is reissued
+    newly_confirmed_ids = {b.id for b in newly_confirmed}
+    extended_ends = {}
+    for held_window in held_windows:
+        if held_window.booking_id in booked_ids - newly_confirmed_ids:
+            extended_ends[held_window.booking_id] = max(
+                held_window.end_time,
+                extended_ends.get(held_window.booking_id, held_window.end_time),
+            )
+
+    extended = [b for b in bookings if b.id in extended_ends]
+    stale_qr_codes = [b.qr_code_data for b in extended if b.qr_code_data]
+    for booking in extended:
+        booking.end_time = extended_ends[booking.id]
+        booking.qr_code_data = issue_qr_token(booking, user.name if user else None)
+        session.add(booking)
+
+    # ---------------------------------------------------------
+    # OUTBOX (committed together with the confirmation)
+    # ---------------------------------------------------------
+    # One SMS per order, even when a fleet order covers many bookings
+    booking = bookings[0]
+    lot_stmt = select(ParkingLot).where(
+        ParkingLot.id.in_({b.lot_id for b in bookings})
+    )
+    lots = {l.id: l for l in (await session.execute(lot_stmt)).scalars().all()}
+    lot = lots.get(booking.lot_id)
+
+    # Seller ledger + earnings rollups, in the confirming transaction
+    owners = {b.id: lots[b.lot_id].owner_user_id for b in bookings if b.lot_id in lots}
+    credited = [p for p in paid if p.booking_id in owners]
+    await apply_balance_changes(
+        session,
+        balance_changes(
+            (owners[p.booking_id], p.seller_payout_amount, 1) for p in credited
+        ),
+    )
+
+    bookings_by_id = {b.id: b for b in bookings}
+    await apply_earnings_changes(
+        session,
+        earnings_changes(
+            payment_earnings(
+                bookings_by_id[p.booking_id],
+                owners[p.booking_id],
+                p,
+                bookings=1 if p.booking_id in newly_confirmed_ids else 0,
+            )
+            for p in credited
+        ),
+    )
+
+    booking_ref = str(booking.id)
+    if len(bookings) > 1:
+        booking_ref += f" (+{len(bookings) - 1} more)"
+
+    event_payload = {
+        "razorpay_order_id": order_id,
+        "razorpay_payment_id": payment_entity["id"],
+        "booking_ids": [str(b.id) for b in bookings],
+        "amount": sum(p.amount_charged for p in paid),
+    }
+    if user and lot and newly_confirmed:
+        event_payload["notify"] = {
+            "user_phone": user.phone,
+            "user_name": user.name,
+            "lot_name": lot.name,
+            "booking_id": booking_ref,
+        }
+
+    # Warm the scan cache (qr:{code}) for the gate
+    event_payload["cache_qr"] = [
+        scan_data(b, user.name if user else None, lots[b.lot_id].owner_user_id)
+        for b in newly_confirmed + extended
+        if b.lot_id in lots
+    ]
+    if stale_qr_codes:
+        event_payload["invalidate_keys"] = [qr_cache_key(c) for c in stale_qr_codes]
+
+    add_outbox_event(
+        session,
+        "booking_confirmed" if newly_confirmed else "booking_extension_paid",
+        booking.driver_user_id,
+        event_payload,
+    )
+
+    return {"status": "ok"}
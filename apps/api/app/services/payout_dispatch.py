@@ -0,0 +1,254 @@
+# apps/api/app/services/payout_dispatch.py
+"""
+Concurrent RazorpayX payout dispatch.
+
+dispatch_payouts() sends one transfer per seller over a shared
+httpx.AsyncClient, at most PAYOUT_CONCURRENCY at a time. A 429 from the
+gateway pauses every worker (honouring Retry-After when present) and
+doubles the shared backoff; successes halve it again. Transient failures
+(429, 5xx, network) are retried with the same X-Payout-Idempotency key, so
+a retried transfer can't pay a seller twice. Each transfer yields its own
+outcome dict; nothing here touches the DB.
+
+A 2xx only means RazorpayX accepted the payout: its status may still be
+queued/pending/processing. Such transfers come back "submitted" and are
+settled later from the payout.* webhooks or fetch_payout_statuses().
+"""
+import asyncio
+import hashlib
+import json
+import random
+import uuid
+
+import httpx
+
+from app.config import settings
+
+
+# RazorpayX payout statuses that end a payout without paying the seller.
+PAYOUT_FAILED_STATUSES = ("failed", "reversed", "rejected", "cancelled")
+
+
+def payout_outcome(payout_status: str | None) -> str:
+    """Maps a RazorpayX payout status to "processed", "failed" or "submitted"."""
+    if payout_status == "processed":
+        return "processed"
+    if payout_status in PAYOUT_FAILED_STATUSES:
+        return "failed"
+    return "submitted"
+
+
+def payout_error(payout: dict) -> str | None:
+    """Why a payout failed, from its status_details (or just its status)."""
+    if payout_outcome(payout.get("status")) != "failed":
+        return None
+    details = payout.get("status_details") or {}
+    return details.get("description") or f"Payout {payout.get('status')}"
+
+
+def payouts_mode() -> str:
+    """
+    "live" when RazorpayX is configured, "simulated" with real keys but no
+    RazorpayX account, "mock" with dummy dev keys.
+    """
+    if not settings.RAZORPAY_KEY_ID or "dummy" in settings.RAZORPAY_KEY_ID:
+        return "mock"
+    if not settings.RAZORPAY_X_ACCOUNT_NUMBER:
+        return "simulated"
+    return "live"
+
+
+def payout_idempotency_key(seller_id: uuid.UUID, payment_ids: list[uuid.UUID]) -> str:
+    """Stable per (seller, set of payments): a re-run of the same batch reuses it."""
+    digest = hashlib.sha256(str(seller_id).encode())
+    for payment_id in sorted(str(p) for p in payment_ids):
+        digest.update(payment_id.encode())
+    return digest.hexdigest()[:32]
+
+
+def fund_account_id(account_details: str | None) -> str | None:
+    """The RazorpayX fund account stored with the seller's PayoutAccount."""
+    try:
+        details = json.loads(account_details or "{}")
+    except ValueError:
+        return None
+    if not isinstance(details, dict):
+        return None
+    return details.get("fund_account_id") or details.get("id")
+
+
+class _Backoff:
+    """Backoff shared by all workers of one dispatch (AIMD-style)."""
+
+    def __init__(self):
+        self.delay = settings.PAYOUT_BACKOFF_BASE_SECONDS
+        self.resume_at = 0.0
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        pause = self.resume_at - loop.time()
+        if pause > 0:
+            # Jitter so paused workers don't all fire at the same instant
+            await asyncio.sleep(pause + random.uniform(0, 0.1 * self.delay))
+
+    def throttle(self, retry_after: float | None) -> None:
+        loop = asyncio.get_running_loop()
+        pause = retry_after if retry_after is not None else self.delay
+        self.resume_at = max(self.resume_at, loop.time() + pause)
+        self.delay = min(self.delay * 2, settings.PAYOUT_BACKOFF_MAX_SECONDS)
+
+    def relax(self) -> None:
+        self.delay = max(self.delay / 2, settings.PAYOUT_BACKOFF_BASE_SECONDS)
+
+    def retry_delay(self, attempt: int) -> float:
+        return min(
+            settings.PAYOUT_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1),
+            settings.PAYOUT_BACKOFF_MAX_SECONDS,
+        )
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _error_description(response: httpx.Response) -> str:
+    try:
+        return response.json()["error"]["description"]
+    except (ValueError, KeyError, TypeError):
+        return f"HTTP {response.status_code}"
+
+
+def _outcome(transfer: dict, status: str = "failed", error: str | None = None) -> dict:
+    return {
+        "seller_id": transfer["seller_id"],
+        "amount": transfer["amount"],
+        "idempotency_key": transfer["idempotency_key"],
+        "status": status,
+        "payout_id": None,
+        "payout_status": None,
+        "error": error,
+        "attempts": 0,
+    }
+
+
+async def _send_transfer(
+    client: httpx.AsyncClient, backoff: _Backoff, transfer: dict
+) -> dict:
+    outcome = _outcome(transfer)
+
+    if not transfer.get("fund_account_id"):
+        outcome["error"] = "No fund account id on payout account"
+        return outcome
+
+    body = {
+        "account_number": settings.RAZORPAY_X_ACCOUNT_NUMBER,
+        "fund_account_id": transfer["fund_account_id"],
+        "amount": int(round(transfer["amount"] * 100)),
+        "currency": "INR",
+        "mode": "IMPS",
+        "purpose": "payout",
+        "queue_if_low_balance": True,
+        "reference_id": transfer["idempotency_key"],
+        "narration": "ParkEase payout",
+    }
+    headers = {"X-Payout-Idempotency": transfer["idempotency_key"]}
+
+    for attempt in range(1, settings.PAYOUT_MAX_ATTEMPTS + 1):
+        await backoff.wait()
+        outcome["attempts"] = attempt
+        delay = backoff.retry_delay(attempt)
+
+        try:
+            response = await client.post("/v1/payouts", json=body, headers=headers)
+        except httpx.TransportError as e:
+            outcome["error"] = f"{type(e).__name__}: {e}"
+        else:
+            if response.is_success:
+                backoff.relax()
+                payout = response.json()
+                outcome.update(
+                    status=payout_outcome(payout.get("status")),
+                    payout_id=payout.get("id"),
+                    payout_status=payout.get("status"),
+                    error=payout_error(payout),
+                )
+                return outcome
+
+            outcome["error"] = _error_description(response)
+            if response.status_code == 429:
+                backoff.throttle(_retry_after(response))
+                continue
+            if response.status_code < 500:
+                # Validation/auth errors won't succeed on retry
+                return outcome
+
+        if attempt < settings.PAYOUT_MAX_ATTEMPTS:
+            await asyncio.sleep(delay)
+
+    return outcome
+
+
+async def dispatch_payouts(transfers: list[dict]) -> list[dict]:
+    """
+    Sends `transfers` (dicts with seller_id, amount in INR, fund_account_id,
+    idempotency_key) and returns one outcome per transfer, in order:
+    status "processed" or "submitted" (accepted, not yet final; both with
+    payout_id and payout_status) or "failed" (with error).
+    Outside live mode nothing is sent and every transfer is "processed".
+    """
+    mode = payouts_mode()
+    if mode != "live":
+        return [_outcome(t, status="processed") for t in transfers]
+
+    concurrency = settings.PAYOUT_CONCURRENCY
+    semaphore = asyncio.Semaphore(concurrency)
+    backoff = _Backoff()
+
+    async with httpx.AsyncClient(
+        base_url=settings.RAZORPAY_API_BASE_URL,
+        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+        timeout=settings.PAYOUT_HTTP_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_connections=concurrency),
+    ) as client:
+
+        async def run(transfer: dict) -> dict:
+            async with semaphore:
+                try:
+                    return await _send_transfer(client, backoff, transfer)
+                except Exception as e:
+                    # One malformed response must not sink the whole batch
+                    return _outcome(transfer, error=f"{type(e).__name__}: {e}")
+
+        return await asyncio.gather(*(run(t) for t in transfers))
+
+
+async def fetch_payout_statuses(payout_ids: list[str]) -> dict[str, dict]:
+    """
+    Current RazorpayX payout entities for `payout_ids`, keyed by id. Ids
+    that can't be fetched right now are left out (the next poll retries).
+    """
+    if payouts_mode() != "live" or not payout_ids:
+        return {}
+
+    semaphore = asyncio.Semaphore(settings.PAYOUT_CONCURRENCY)
+    async with httpx.AsyncClient(
+        base_url=settings.RAZORPAY_API_BASE_URL,
+        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+        timeout=settings.PAYOUT_HTTP_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_connections=settings.PAYOUT_CONCURRENCY),
+    ) as client:
+
+        async def fetch(payout_id: str) -> dict | None:
+            async with semaphore:
+                try:
+                    response = await client.get(f"/v1/payouts/{payout_id}")
+                    return response.json() if response.is_success else None
+                except (httpx.TransportError, ValueError):
+                    return None
+
+        payouts = await asyncio.gather(*(fetch(p) for p in payout_ids))
+
+    return {p["id"]: p for p in payouts if p and p.get("id")}
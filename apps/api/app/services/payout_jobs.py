@@ -0,0 +1,581 @@
+# apps/api/app/services/payout_jobs.py
+"""
+Resumable payout batches.
+
+A PayoutJob walks the sellers the SellerBalance ledger says are owed money
+in seller_id order, PAYOUT_CHUNK_SIZE sellers at a time. Each chunk is
+two commits:
+
+1. Checkpoint: the chunk's payments move to PAYOUT_IN_PROGRESS (so they
+   can no longer be cancelled and refunded), and its PayoutTransfer rows
+   (status PENDING, with their idempotency keys) and the advanced job
+   cursor are written for exactly the payments reserved.
+2. Outcome: after dispatch_payouts(), the transfer results, the settled
+   payments (debited from the ledger), the failed transfers' payments
+   (back to PAID_BY_DRIVER) and the outbox events (SMS + event log).
+   A payout RazorpayX accepted but hasn't finished leaves its transfer
+   SUBMITTED with the payments still reserved; the payout.* webhook
+   (apply_payout_event) or poll_submitted_transfers() settles it once the
+   payout is processed, failed or reversed.
+
+A job that dies between the two re-dispatches its PENDING transfers with
+the same idempotency keys when resumed, so the gateway pays each seller
+once; reserved and settled payments drop out of the aggregation, so no
+later chunk picks them up again.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+import uuid
+
+from sqlalchemy import Uuid, and_, any_, bindparam, func, literal_column, or_, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.config import settings
+from app.models import (
+    Booking,
+    ParkingLot,
+    Payment,
+    PayoutAccount,
+    PayoutJob,
+    PayoutTransfer,
+    SellerBalance,
+    User,
+)
+from app.services.outbox import add_outbox_event
+from app.services.payout_dispatch import (
+    dispatch_payouts,
+    fetch_payout_statuses,
+    fund_account_id,
+    payout_error,
+    payout_idempotency_key,
+    payout_outcome,
+)
+from app.services.seller_balance import apply_balance_changes, balance_changes
+
+ACTIVE_JOB_STATUSES = ("PENDING", "RUNNING")
+
+
+class LeaseLost(Exception):
+    """Another runner took the job over (its attempts moved on); stop."""
+
+
+async def _lock_job(session: AsyncSession, job: PayoutJob, lease: int) -> None:
+    """
+    Locks and re-reads `job` (refreshing its counters) and checks this
+    runner still holds it: each claim bumps attempts, so the attempts value
+    seen at claim time is the runner's lease.
+    """
+    stmt = (
+        select(PayoutJob)
+        .where(PayoutJob.id == job.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    current = (await session.execute(stmt)).scalars().one()
+    if current.status != "RUNNING" or current.attempts != lease:
+        await session.rollback()
+        raise LeaseLost(f"Payout job {job.id} is now held by attempt {current.attempts}")
+
+
+def seller_totals_stmt(after: uuid.UUID | None, limit: int):
+    """
+    Per-seller totals of unsettled payments, with the payout account, as
+    one GROUP BY. Only the next `limit` sellers the ledger says are owed
+    something (keyset on seller_id) are aggregated, so a batch costs
+    O(sellers with a balance), not a scan of every PAID_BY_DRIVER payment.
+    """
+    due = (
+        select(SellerBalance.seller_id)
+        # Inlined (not a bind param) so it matches ix_sellerbalance_due
+        .where(SellerBalance.amount_due > literal_column("0"))
+        .order_by(SellerBalance.seller_id)
+        .limit(limit)
+    )
+    if after is not None:
+        due = due.where(SellerBalance.seller_id > after)
+    due = due.cte("due")
+
+    account_subq = (
+        select(PayoutAccount.account_details_encrypted)
+        .where(PayoutAccount.user_id == due.c.seller_id)
+        .order_by(PayoutAccount.is_active.desc(), PayoutAccount.updated_at.desc())
+        .limit(1)
+        .correlate(due)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            due.c.seller_id,
+            func.coalesce(func.sum(Payment.seller_payout_amount), 0.0).label("amount"),
+            func.array_remove(func.array_agg(Payment.id), None).label("payment_ids"),
+            account_subq.label("account_details"),
+        )
+        .select_from(due)
+        .outerjoin(ParkingLot, ParkingLot.owner_user_id == due.c.seller_id)
+        .outerjoin(Booking, Booking.lot_id == ParkingLot.id)
+        .outerjoin(
+            Payment,
+            and_(Payment.booking_id == Booking.id, Payment.status == "PAID_BY_DRIVER"),
+        )
+        .group_by(due.c.seller_id)
+        .order_by(due.c.seller_id)
+    )
+
+
+async def _reserve_payments(
+    session: AsyncSession, payment_ids: list[uuid.UUID]
+) -> dict[uuid.UUID, float]:
+    """
+    Moves still-unsettled payments to PAYOUT_IN_PROGRESS (cancel_booking
+    refuses to refund those) and returns {payment_id: seller_payout_amount}
+    for the rows actually reserved; one refunded since the aggregation is
+    left out.
+    """
+    if not payment_ids:
+        return {}
+    reserved = await session.execute(
+        update(Payment)
+        .where(
+            Payment.id == any_(bindparam("payment_ids", payment_ids, type_=ARRAY(Uuid))),
+            Payment.status == "PAID_BY_DRIVER",
+            # Zero-value rows would leave an unpayable transfer holding them
+            Payment.seller_payout_amount > 0,
+        )
+        .values(status="PAYOUT_IN_PROGRESS", updated_at=datetime.utcnow())
+        .returning(Payment.id, Payment.seller_payout_amount)
+        .execution_options(synchronize_session=False)
+    )
+    return dict(reserved.all())
+
+
+async def _checkpoint_next_chunk(
+    session: AsyncSession, job: PayoutJob, lease: int
+) -> list[PayoutTransfer] | None:
+    """
+    Reserves the next chunk's payments, records its transfers (for exactly
+    the reserved rows) and moves the cursor past it, in one commit.
+    """
+    await _lock_job(session, job, lease)
+    rows = (
+        await session.execute(seller_totals_stmt(job.cursor, settings.PAYOUT_CHUNK_SIZE))
+    ).all()
+    if not rows:
+        await session.commit()
+        return None
+
+    # Sellers without a payout account are skipped, so nothing is reserved
+    reserved = await _reserve_payments(
+        session,
+        [
+            payment_id
+            for _, _, payment_ids, account_details in rows
+            if account_details
+            for payment_id in payment_ids
+        ],
+    )
+
+    transfers = []
+    for seller_id, _, payment_ids, account_details in rows:
+        payment_ids = [p for p in payment_ids if p in reserved]
+        amount = round(sum(reserved[p] for p in payment_ids), 2)
+        payable = bool(account_details) and amount > 0
+        if not account_details:
+            skip_reason = "No Payout Account Linked"
+        elif not payable:
+            skip_reason = "Nothing to pay"
+        transfer = PayoutTransfer(
+            job_id=job.id,
+            seller_id=seller_id,
+            amount=amount,
+            payment_ids=[str(p) for p in payment_ids],
+            fund_account_id=fund_account_id(account_details),
+            idempotency_key=payout_idempotency_key(seller_id, payment_ids),
+            status="PENDING" if payable else "SKIPPED",
+            error=None if payable else skip_reason,
+        )
+        session.add(transfer)
+        transfers.append(transfer)
+
+    job.cursor = rows[-1][0]
+    job.updated_at = datetime.utcnow()
+    session.add(job)
+    await session.commit()
+
+    return [t for t in transfers if t.status == "PENDING"]
+
+
+async def _lock_transfers(
+    session: AsyncSession, transfer_ids: list[uuid.UUID]
+) -> list[PayoutTransfer]:
+    """
+    Locks the transfers' jobs, then the transfers (re-read): the same order
+    as a runner recording outcomes, so webhook/poll settlement can't
+    deadlock against it.
+    """
+    if not transfer_ids:
+        return []
+    job_ids = select(PayoutTransfer.job_id).where(PayoutTransfer.id.in_(transfer_ids))
+    await session.execute(
+        select(PayoutJob.id)
+        .where(PayoutJob.id.in_(job_ids))
+        .order_by(PayoutJob.id)
+        .with_for_update()
+    )
+    stmt = (
+        select(PayoutTransfer)
+        .where(PayoutTransfer.id.in_(transfer_ids))
+        .order_by(PayoutTransfer.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def settle_transfers(
+    session: AsyncSession, results: list[tuple[PayoutTransfer, dict]]
+) -> None:
+    """
+    Applies dispatch outcomes (or payout webhook/poll results) to locked
+    transfers: "processed" settles their payments and debits the ledger,
+    "failed" releases them to PAID_BY_DRIVER (a PROCESSED transfer whose
+    payout came back is REVERSED and re-credited), "submitted" only records
+    the payout id. Updates the jobs' counters and stages the outbox events.
+    The caller commits.
+    """
+    processed = [t for t, o in results if o["status"] == "processed"]
+    phones = {}
+    if processed:
+        stmt = select(User.id, User.phone).where(User.id.in_([t.seller_id for t in processed]))
+        phones = dict((await session.execute(stmt)).all())
+
+    now = datetime.utcnow()
+    settled_ids, released_ids, reversed_ids = [], [], []
+    counters = defaultdict(lambda: [0, 0, 0.0])  # job_id: [processed, failed, paid]
+    for transfer, outcome in results:
+        previous = transfer.status
+        transfer.status = {
+            "processed": "PROCESSED",
+            "failed": "REVERSED" if previous == "PROCESSED" else "FAILED",
+            "submitted": "SUBMITTED",
+        }[outcome["status"]]
+        transfer.payout_id = outcome["payout_id"] or transfer.payout_id
+        transfer.error = outcome["error"]
+        transfer.attempts += outcome.get("attempts", 0)
+        transfer.updated_at = now
+        session.add(transfer)
+        if transfer.status == "SUBMITTED":
+            # Accepted by RazorpayX; its payments stay reserved until it ends
+            continue
+
+        event_payload = {
+            "job_id": str(transfer.job_id),
+            "amount": transfer.amount,
+            "currency": "INR",
+            "transaction_count": len(transfer.payment_ids),
+            "payout_id": transfer.payout_id,
+            "idempotency_key": transfer.idempotency_key,
+        }
+        job_counters = counters[transfer.job_id]
+        payment_ids = [uuid.UUID(p) for p in transfer.payment_ids]
+        if transfer.status == "PROCESSED":
+            settled_ids.extend(payment_ids)
+            job_counters[0] += 1
+            job_counters[2] += transfer.amount
+            event_payload["notify_payout"] = {
+                "seller_phone": phones.get(transfer.seller_id),
+                "amount": transfer.amount,
+            }
+            add_outbox_event(session, "payout_processed", transfer.seller_id, event_payload)
+            continue
+
+        if transfer.status == "REVERSED":
+            reversed_ids.extend(payment_ids)
+            job_counters[0] -= 1
+            job_counters[2] -= transfer.amount
+        else:
+            released_ids.extend(payment_ids)
+        job_counters[1] += 1
+        event_payload["error"] = transfer.error
+        event_type = "payout_reversed" if transfer.status == "REVERSED" else "payout_failed"
+        add_outbox_event(session, event_type, transfer.seller_id, event_payload)
+
+    for job_id, (n_processed, n_failed, paid) in sorted(counters.items()):
+        await session.execute(
+            update(PayoutJob)
+            .where(PayoutJob.id == job_id)
+            .values(
+                sellers_processed=PayoutJob.sellers_processed + n_processed,
+                sellers_failed=PayoutJob.sellers_failed + n_failed,
+                amount_paid=PayoutJob.amount_paid + paid,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    seller_of = {p: t.seller_id for t, _ in results for p in t.payment_ids}
+    if settled_ids:
+        settled = await session.execute(
+            update(Payment)
+            .where(
+                Payment.id == any_(bindparam("settled_ids", settled_ids, type_=ARRAY(Uuid))),
+                Payment.status == "PAYOUT_IN_PROGRESS",
+            )
+            .values(status="PAYOUT_TO_SELLER_COMPLETE", updated_at=now)
+            .returning(Payment.id, Payment.seller_payout_amount)
+            .execution_options(synchronize_session=False)
+        )
+        # Reserved payments can't be refunded, so this is the transfer's set
+        await apply_balance_changes(
+            session,
+            balance_changes(
+                (seller_of[str(payment_id)], -amount, -1)
+                for payment_id, amount in settled.all()
+            ),
+        )
+
+    if released_ids:
+        # Failed transfers give their payments back to the next batch
+        await session.execute(
+            update(Payment)
+            .where(
+                Payment.id == any_(bindparam("released_ids", released_ids, type_=ARRAY(Uuid))),
+                Payment.status == "PAYOUT_IN_PROGRESS",
+            )
+            .values(status="PAID_BY_DRIVER", updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+    if reversed_ids:
+        # A returned payout is owed again: back to the batch and the ledger
+        restored = await session.execute(
+            update(Payment)
+            .where(
+                Payment.id == any_(bindparam("reversed_ids", reversed_ids, type_=ARRAY(Uuid))),
+                Payment.status == "PAYOUT_TO_SELLER_COMPLETE",
+            )
+            .values(status="PAID_BY_DRIVER", updated_at=now)
+            .returning(Payment.id, Payment.seller_payout_amount)
+            .execution_options(synchronize_session=False)
+        )
+        await apply_balance_changes(
+            session,
+            balance_changes(
+                (seller_of[str(payment_id)], amount, 1)
+                for payment_id, amount in restored.all()
+            ),
+        )
+
+
+async def _record_outcomes(
+    session: AsyncSession, job: PayoutJob, transfers: list[PayoutTransfer], lease: int
+) -> None:
+    outcomes = await dispatch_payouts(
+        [
+            {
+                "seller_id": t.seller_id,
+                "amount": t.amount,
+                "fund_account_id": t.fund_account_id,
+                "idempotency_key": t.idempotency_key,
+            }
+            for t in transfers
+        ]
+    )
+
+    # A runner that lost the job while dispatching records nothing (the new
+    # holder re-sends with the same idempotency keys), and transfers that
+    # already have an outcome (e.g. from a payout webhook) are never
+    # counted twice.
+    await _lock_job(session, job, lease)
+    pending_stmt = (
+        select(PayoutTransfer.id)
+        .where(
+            PayoutTransfer.id.in_([t.id for t in transfers]),
+            PayoutTransfer.status == "PENDING",
+        )
+        .with_for_update()
+    )
+    still_pending = set((await session.execute(pending_stmt)).scalars().all())
+    await settle_transfers(
+        session, [(t, o) for t, o in zip(transfers, outcomes) if t.id in still_pending]
+    )
+
+    job.updated_at = datetime.utcnow()
+    session.add(job)
+    await session.commit()
+
+
+async def apply_payout_event(session: AsyncSession, payout_entity: dict) -> dict:
+    """
+    Settles the transfer behind a payout.* webhook (matched on the
+    reference_id we send, which is its idempotency key) once the payout
+    reaches a final status. The caller commits.
+    """
+    stmt = (
+        select(PayoutTransfer.id)
+        .where(
+            PayoutTransfer.idempotency_key == payout_entity.get("reference_id"),
+            or_(
+                PayoutTransfer.payout_id == payout_entity.get("id"),
+                PayoutTransfer.payout_id.is_(None),
+            ),
+            PayoutTransfer.status.in_(("PENDING", "SUBMITTED", "PROCESSED")),
+        )
+        .order_by(PayoutTransfer.created_at.desc())
+        .limit(1)
+    )
+    transfer_id = (await session.execute(stmt)).scalar_one_or_none()
+    transfers = await _lock_transfers(session, [transfer_id] if transfer_id else [])
+    if not transfers:
+        return {"status": "ignored", "reason": "Unknown payout"}
+
+    transfer = transfers[0]
+    outcome = payout_outcome(payout_entity.get("status"))
+    if transfer.status == "PROCESSED" and outcome != "failed":
+        return {"status": "ignored", "reason": "Payout already settled"}
+    if transfer.status in ("FAILED", "REVERSED") or (
+        transfer.status == "SUBMITTED" and outcome == "submitted"
+    ):
+        return {"status": "ignored", "reason": "No change"}
+
+    await settle_transfers(
+        session,
+        [
+            (
+                transfer,
+                {
+                    "status": outcome,
+                    "payout_id": payout_entity.get("id"),
+                    "error": payout_error(payout_entity),
+                },
+            )
+        ],
+    )
+    return {"status": "ok"}
+
+
+async def poll_submitted_transfers(session: AsyncSession) -> int:
+    """
+    Backstop for missed payout webhooks: fetches the status of transfers
+    SUBMITTED more than PAYOUT_STATUS_POLL_SECONDS ago and settles the ones
+    that reached a final status. Returns how many were settled.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.PAYOUT_STATUS_POLL_SECONDS)
+    stmt = (
+        select(PayoutTransfer.id, PayoutTransfer.payout_id)
+        .where(PayoutTransfer.status == "SUBMITTED", PayoutTransfer.updated_at < cutoff)
+        .order_by(PayoutTransfer.updated_at)
+        .limit(settings.PAYOUT_CHUNK_SIZE)
+    )
+    due = (await session.execute(stmt)).all()
+    # No locks held across the gateway calls
+    await session.commit()
+    if not due:
+        return 0
+
+    payouts = await fetch_payout_statuses([p for _, p in due if p])
+
+    now = datetime.utcnow()
+    results = []
+    for transfer in await _lock_transfers(session, [t for t, _ in due]):
+        if transfer.status != "SUBMITTED":
+            continue
+        payout = payouts.get(transfer.payout_id)
+        if payout and payout_outcome(payout.get("status")) != "submitted":
+            results.append(
+                (
+                    transfer,
+                    {
+                        "status": payout_outcome(payout["status"]),
+                        "payout_id": payout["id"],
+                        "error": payout_error(payout),
+                    },
+                )
+            )
+        else:
+            # Still in flight (or unreachable): ask again next interval
+            transfer.updated_at = now
+            session.add(transfer)
+
+    await settle_transfers(session, results)
+    await session.commit()
+    return len(results)
+
+
+async def process_next_chunk(session: AsyncSession, job: PayoutJob, lease: int) -> bool:
+    """
+    Pays one chunk of sellers. Transfers left PENDING by an interrupted run
+    are finished first. Returns False once there is nothing left to pay.
+    Raises LeaseLost if another runner took the job over.
+    """
+    stmt = (
+        select(PayoutTransfer)
+        .where(PayoutTransfer.job_id == job.id, PayoutTransfer.status == "PENDING")
+        .order_by(PayoutTransfer.seller_id)
+    )
+    transfers = (await session.execute(stmt)).scalars().all()
+
+    if not transfers:
+        transfers = await _checkpoint_next_chunk(session, job, lease)
+        if transfers is None:
+            return False
+
+    if transfers:
+        await _record_outcomes(session, job, transfers, lease)
+    return True
+
+
+async def run_payout_job(session: AsyncSession, job: PayoutJob, lease: int) -> None:
+    """
+    Runs (or resumes) `job` until every seller has a transfer outcome.
+    `lease` is job.attempts as set by the claim that handed it to us.
+    """
+    while await process_next_chunk(session, job, lease):
+        pass
+
+    await _lock_job(session, job, lease)
+    job.status = "COMPLETED"
+    job.finished_at = job.updated_at = datetime.utcnow()
+    session.add(job)
+    await session.commit()
+
+
+async def get_active_job(session: AsyncSession) -> PayoutJob | None:
+    stmt = (
+        select(PayoutJob)
+        .where(PayoutJob.status.in_(ACTIVE_JOB_STATUSES))
+        .order_by(PayoutJob.created_at)
+        .limit(1)
+    )
+    return (await session.execute(stmt)).scalars().first()
+
+
+async def start_payout_job(
+    session: AsyncSession, triggered_by: uuid.UUID | None
+) -> PayoutJob:
+    """
+    Creates a PENDING job, or returns the active one. ux_payoutjob_active
+    allows a single PENDING/RUNNING job, so of two concurrent triggers one
+    inserts nothing (ON CONFLICT DO NOTHING) and gets the other's job.
+    """
+    job = await get_active_job(session)
+    if job:
+        return job
+
+    job = PayoutJob(triggered_by=triggered_by)
+    stmt = (
+        insert(PayoutJob)
+        .values(**job.model_dump())
+        .on_conflict_do_nothing()
+        .returning(PayoutJob.id)
+    )
+    inserted = (await session.execute(stmt)).first()
+    await session.commit()
+
+    if not inserted:
+        # Lost the race; the winner's job (unless it already finished)
+        return await get_active_job(session) or await start_payout_job(
+            session, triggered_by
+        )
+    return await session.get(PayoutJob, job.id)
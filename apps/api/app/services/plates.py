@@ -0,0 +1,11 @@
+# apps/api/app/services/plates.py
+import re
+
+_SEPARATORS = re.compile(r"[^A-Za-z0-9]")
+
+
+def normalize_plate(plate: str | None) -> str | None:
+    """'mh-12 ab 1234' -> 'MH12AB1234' (uppercase, no separators)."""
+    if not plate:
+        return None
+    return _SEPARATORS.sub("", plate).upper() or None
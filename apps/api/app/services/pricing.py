@@ -0,0 +1,37 @@
+# apps/api/app/services/pricing.py
+from datetime import datetime
+import uuid
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import PricingRule
+
+
+async def get_active_rules(
+    session: AsyncSession, lot_ids: list[uuid.UUID]
+) -> dict[uuid.UUID, PricingRule]:
+    """Highest-priority active rule per lot, fetched in one query."""
+    stmt = (
+        select(PricingRule)
+        .where(PricingRule.lot_id.in_(lot_ids), PricingRule.is_active == True)
+        .order_by(PricingRule.priority.desc())
+    )
+    rules = {}
+    for rule in (await session.execute(stmt)).scalars().all():
+        rules.setdefault(rule.lot_id, rule)
+    return rules
+
+
+def calculate_amount(
+    rule: PricingRule, start: datetime, end: datetime
+) -> tuple[float, float]:
+    """Returns (amount_inr, duration_hours) for a stay under this rule."""
+    duration_hours = max(1.0, (end - start).total_seconds() / 3600)
+
+    if rule.rate_type == "HOURLY":
+        amount_inr = float(rule.rate) * duration_hours
+    else:
+        # Flat fee (e.g., Event Parking)
+        amount_inr = float(rule.rate)
+
+    return amount_inr, duration_hours
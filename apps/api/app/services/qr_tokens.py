@@ -0,0 +1,118 @@
+# apps/api/app/services/qr_tokens.py
+"""
+Self-verifying QR tokens for gate scans.
+
+A token carries the booking id, lot id, validity window, plate and driver
+name, signed with a per-lot key derived from QR_SIGNING_SECRET. The scan
+endpoint (and gate devices provisioned with their lot's key) validate it
+with pure CPU; the only lookups are a Redis revocation set and the cached
+lot owner.
+"""
+from datetime import datetime
+import base64
+import hashlib
+import hmac
+import uuid
+
+from pytz import timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.redis_client import redis_client
+from app.models import ParkingLot
+from app.services.signing import read_payload, sign_payload, verify_payload
+
+REVOKED_KEY = "qr:revoked"
+LOT_OWNER_TTL_SECONDS = 24 * 3600
+
+
+def lot_key(lot_id: uuid.UUID | str) -> bytes:
+    """Per-lot signing key: a leaked gate device can't forge other lots' QRs."""
+    secret = (settings.QR_SIGNING_SECRET or settings.JWT_SECRET_KEY).encode()
+    return hmac.new(secret, str(uuid.UUID(str(lot_id))).encode(), hashlib.sha256).digest()
+
+
+def export_lot_key(lot_id: uuid.UUID) -> str:
+    """The lot key as provisioned to gate devices."""
+    return base64.urlsafe_b64encode(lot_key(lot_id)).decode()
+
+
+def issue_qr_token(booking, driver_name: str | None) -> str:
+    return sign_payload(
+        {
+            "b": booking.id.hex,
+            "l": booking.lot_id.hex,
+            "st": booking.start_time.isoformat(),
+            "en": booking.end_time.isoformat(),
+            "p": booking.vehicle_plate,
+            "n": driver_name,
+        },
+        lot_key(booking.lot_id),
+    )
+
+
+def is_qr_token(code: str) -> bool:
+    """Signed tokens contain a '.'; legacy `pk_...` codes don't."""
+    return "." in code
+
+
+def verify_qr_token(token: str) -> dict | None:
+    """
+    Returns the claims (ids as UUIDs, times as naive IST datetimes) if the
+    token was signed with its lot's key, otherwise None.
+    """
+    unverified = read_payload(token)
+    if not isinstance(unverified, dict) or "l" not in unverified:
+        return None
+
+    try:
+        claims = verify_payload(token, lot_key(unverified["l"]))
+        if not claims:
+            return None
+        return {
+            "booking_id": uuid.UUID(claims["b"]),
+            "lot_id": uuid.UUID(claims["l"]),
+            "start_time": datetime.fromisoformat(claims["st"]),
+            "end_time": datetime.fromisoformat(claims["en"]),
+            "vehicle_plate": claims.get("p"),
+            "driver_name": claims.get("n"),
+        }
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+async def revoke_qr_token(booking_id: uuid.UUID | str, end_time: datetime) -> None:
+    """
+    Adds a booking to the revocation set until its window ends. Entries
+    are scored by end time (naive IST, like `now` below), so the set only
+    ever holds live revocations.
+    """
+    now_ist = datetime.now(timezone("Asia/Kolkata")).replace(tzinfo=None)
+    await redis_client.zadd(REVOKED_KEY, {str(booking_id): end_time.timestamp()})
+    await redis_client.zremrangebyscore(REVOKED_KEY, "-inf", now_ist.timestamp())
+
+
+async def is_revoked(booking_id: uuid.UUID) -> bool:
+    return await redis_client.zscore(REVOKED_KEY, str(booking_id)) is not None
+
+
+async def revoked_among(booking_ids: list[uuid.UUID]) -> set[uuid.UUID]:
+    """Batch is_revoked(): the subset of `booking_ids` that is revoked."""
+    if not booking_ids:
+        return set()
+    scores = await redis_client.zmscore(REVOKED_KEY, [str(b) for b in booking_ids])
+    return {b for b, score in zip(booking_ids, scores) if score is not None}
+
+
+async def get_lot_owner(session: AsyncSession, lot_id: uuid.UUID) -> uuid.UUID | None:
+    """Lot owner from Redis, falling back to (and refilling from) the DB."""
+    key = f"lot_owner:{lot_id}"
+    cached = await redis_client.get(key)
+    if cached:
+        return uuid.UUID(cached)
+
+    lot = await session.get(ParkingLot, lot_id)
+    if not lot:
+        return None
+    await redis_client.set(key, str(lot.owner_user_id), ex=LOT_OWNER_TTL_SECONDS)
+    return lot.owner_user_id
@@ -0,0 +1,81 @@
+# apps/api/app/services/quotes.py
+from datetime import datetime
+import time
+
+from app.config import settings
+from app.core.redis_client import redis_client
+from app.services.signing import sign_payload, verify_payload
+
+
+# Deletes the hold only while it still belongs to the releasing quote
+_RELEASE_HOLD = redis_client.register_script(
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+)
+
+
+def _quote_key() -> bytes:
+    return (settings.QUOTE_SIGNING_SECRET or settings.JWT_SECRET_KEY).encode()
+
+
+def _hold_key(window_id: int) -> str:
+    return f"quote_hold:{window_id}"
+
+
+def sign_quote(claims: dict) -> str:
+    """Signs quote claims; `exp` (unix seconds) is added from QUOTE_TTL_SECONDS."""
+    return sign_payload(
+        {**claims, "exp": int(time.time()) + settings.QUOTE_TTL_SECONDS},
+        _quote_key(),
+    )
+
+
+def verify_quote(token: str) -> dict | None:
+    """Returns the quote claims if the token is authentic and not expired."""
+    claims = verify_payload(token, _quote_key())
+    if not claims or claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+def quote_matches(
+    claims: dict,
+    user_id,
+    lot_id,
+    vehicle_type: str,
+    start: datetime,
+    end: datetime,
+) -> bool:
+    """A quote is only honoured for the exact request it was issued for."""
+    return (
+        claims.get("u") == str(user_id)
+        and claims.get("l") == str(lot_id)
+        and claims.get("vt") == vehicle_type
+        and claims.get("st") == start.isoformat()
+        and claims.get("en") == end.isoformat()
+    )
+
+
+async def hold_quoted_window(window_id: int, quote_id: str) -> bool:
+    """
+    Soft-holds the quoted window in Redis for the quote's lifetime.
+    Returns False if another live quote already holds it.
+    """
+    return bool(
+        await redis_client.set(
+            _hold_key(window_id), quote_id, nx=True, ex=settings.QUOTE_TTL_SECONDS
+        )
+    )
+
+
+async def quote_hold_exists(window_id: int, quote_id: str) -> bool:
+    return await redis_client.get(_hold_key(window_id)) == quote_id
+
+
+async def release_quote_hold(window_id: int, quote_id: str):
+    """Releases the hold if `quote_id` still owns it (compare-and-delete)."""
+    await _RELEASE_HOLD(keys=[_hold_key(window_id)], args=[quote_id])
@@ -0,0 +1,251 @@
+# apps/api/app/services/reconciliation.py
+"""
+Settlement report reconciliation against Payment.
+
+The report is streamed in batches (never held in memory). Each batch is
+loaded into a session temp table and matched with one INSERT ... SELECT
+that joins it to Payment on razorpay_order_id / razorpay_payment_id and
+writes the mismatching lines straight into ReconciliationDiscrepancy, so
+only the current batch ever lives in Python. Matched ids are kept in a
+second temp table to find captured payments the report never mentions.
+
+Run through app/workers/reconcile_settlements.py.
+"""
+from datetime import datetime
+import csv
+import gzip
+import uuid
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Float,
+    MetaData,
+    String,
+    Table,
+    Uuid,
+    and_,
+    case,
+    distinct,
+    exists,
+    func,
+    literal,
+    or_,
+    true,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import select
+
+from app.models import Payment, ReconciliationDiscrepancy
+
+# Payment statuses meaning Razorpay captured the money
+CAPTURED_STATUSES = (
+    "PAID_BY_DRIVER",
+    "PAYOUT_IN_PROGRESS",
+    "PAYOUT_TO_SELLER_COMPLETE",
+    "REFUND_PENDING",
+)
+AMOUNT_TOLERANCE = 0.01
+
+# Temp tables (per connection); the batch table empties on every commit
+report_tables = MetaData()
+report_batch = Table(
+    "recon_batch",
+    report_tables,
+    Column("line_number", BigInteger),
+    Column("razorpay_payment_id", String),
+    Column("razorpay_order_id", String),
+    Column("amount", Float),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DELETE ROWS",
+)
+report_seen = Table(
+    "recon_seen",
+    report_tables,
+    Column("ref", String, primary_key=True),  # order or payment id
+    prefixes=["TEMPORARY"],
+)
+
+
+def parse_report_row(row: dict, amount_unit: str = "inr") -> dict | None:
+    """
+    Normalizes one report line (Razorpay settlement or payment export
+    headers). Returns None for non-payment lines and unusable rows.
+    """
+    row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+
+    entity_type = row.get("type") or row.get("entity")
+    if entity_type and entity_type != "payment":
+        return None
+
+    payment_id = (
+        row.get("entity_id") or row.get("payment_id") or row.get("razorpay_payment_id")
+    )
+    order_id = row.get("order_id") or row.get("razorpay_order_id")
+    if not payment_id and not order_id:
+        return None
+
+    try:
+        amount = float(row.get("amount", ""))
+    except ValueError:
+        return None
+    if amount_unit == "paise":
+        amount /= 100
+
+    return {
+        "razorpay_payment_id": payment_id or None,
+        "razorpay_order_id": order_id or None,
+        "amount": amount,
+    }
+
+
+def iter_report_batches(path: str, batch_size: int, amount_unit: str = "inr"):
+    """
+    Yields (rows, skipped) per `batch_size` usable lines of the CSV at
+    `path` (gzip if it ends in .gz). Rows carry their line number.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        rows, skipped = [], 0
+        for raw in reader:
+            parsed = parse_report_row(raw, amount_unit)
+            if parsed is None:
+                skipped += 1
+                continue
+            parsed["line_number"] = reader.line_num
+            rows.append(parsed)
+            if len(rows) >= batch_size:
+                yield rows, skipped
+                rows, skipped = [], 0
+        if rows or skipped:
+            yield rows, skipped
+
+
+async def create_report_tables(conn: AsyncConnection) -> None:
+    await conn.run_sync(lambda sync_conn: report_tables.create_all(sync_conn, checkfirst=False))
+
+
+async def drop_report_tables(conn: AsyncConnection) -> None:
+    await conn.run_sync(lambda sync_conn: report_tables.drop_all(sync_conn, checkfirst=False))
+
+
+async def reconcile_batch(conn: AsyncConnection, run_id: uuid.UUID, rows: list[dict]) -> int:
+    """
+    Matches one batch and records its discrepancies. Returns how many were
+    found. The caller commits (which also empties recon_batch).
+    """
+    if not rows:
+        return 0
+
+    await conn.execute(report_batch.insert(), rows)
+
+    r = report_batch
+    # All Payment rows of the line's order (bulk orders have several)
+    matched = (
+        select(
+            func.count(Payment.id).label("payment_count"),
+            func.sum(Payment.amount_charged).label("db_amount"),
+            func.bool_or(Payment.status.in_(CAPTURED_STATUSES)).label("captured"),
+            func.string_agg(distinct(Payment.status), literal(",")).label("db_status"),
+            func.max(Payment.razorpay_payment_id).label("db_payment_id"),
+        )
+        .where(
+            or_(
+                Payment.razorpay_order_id == r.c.razorpay_order_id,
+                Payment.razorpay_payment_id == r.c.razorpay_payment_id,
+            )
+        )
+        .lateral("matched")
+    )
+    kind = case(
+        (matched.c.payment_count == 0, "MISSING_IN_DB"),
+        (~matched.c.captured, "NOT_CAPTURED_IN_DB"),
+        (func.abs(matched.c.db_amount - r.c.amount) > AMOUNT_TOLERANCE, "AMOUNT_MISMATCH"),
+        (
+            and_(
+                r.c.razorpay_payment_id.is_not(None),
+                matched.c.db_payment_id.is_not(None),
+                matched.c.db_payment_id != r.c.razorpay_payment_id,
+            ),
+            "PAYMENT_ID_MISMATCH",
+        ),
+        else_=None,
+    )
+    candidates = (
+        select(
+            literal(run_id, Uuid).label("run_id"),
+            kind.label("kind"),
+            r.c.line_number,
+            r.c.razorpay_payment_id,
+            r.c.razorpay_order_id,
+            r.c.amount.label("report_amount"),
+            matched.c.db_amount,
+            matched.c.db_status,
+            literal(datetime.utcnow()).label("created_at"),
+        )
+        .select_from(r.join(matched, true()))
+        .subquery()
+    )
+    columns = [c.name for c in candidates.c]
+    result = await conn.execute(
+        insert(ReconciliationDiscrepancy).from_select(
+            columns,
+            select(*candidates.c).where(candidates.c.kind.is_not(None)),
+        )
+    )
+
+    # Remember what the report covered, for record_missing_in_report()
+    for ref in (r.c.razorpay_order_id, r.c.razorpay_payment_id):
+        await conn.execute(
+            insert(report_seen)
+            .from_select(["ref"], select(ref).where(ref.is_not(None)).distinct())
+            .on_conflict_do_nothing()
+        )
+
+    return result.rowcount
+
+
+async def record_missing_in_report(
+    conn: AsyncConnection, run_id: uuid.UUID, since: datetime, until: datetime
+) -> int:
+    """
+    Records captured orders created in [since, until) (UTC) that no report
+    line referenced. Only meaningful once the whole file has been read.
+    """
+    seen = report_seen.c.ref
+    missing = (
+        select(
+            literal(run_id, Uuid).label("run_id"),
+            literal("MISSING_IN_REPORT").label("kind"),
+            func.max(Payment.razorpay_payment_id).label("razorpay_payment_id"),
+            Payment.razorpay_order_id,
+            func.sum(Payment.amount_charged).label("db_amount"),
+            func.string_agg(distinct(Payment.status), literal(",")).label("db_status"),
+            literal(datetime.utcnow()).label("created_at"),
+        )
+        .where(
+            Payment.status.in_(CAPTURED_STATUSES),
+            Payment.created_at >= since,
+            Payment.created_at < until,
+            ~exists().where(seen == Payment.razorpay_order_id),
+            ~exists().where(seen == Payment.razorpay_payment_id),
+        )
+        .group_by(Payment.razorpay_order_id)
+    )
+    result = await conn.execute(
+        insert(ReconciliationDiscrepancy).from_select(
+            [
+                "run_id",
+                "kind",
+                "razorpay_payment_id",
+                "razorpay_order_id",
+                "db_amount",
+                "db_status",
+                "created_at",
+            ],
+            missing,
+        )
+    )
+    return result.rowcount
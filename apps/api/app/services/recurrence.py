@@ -0,0 +1,106 @@
+# apps/api/app/services/recurrence.py
+from datetime import datetime, timedelta
+import uuid
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+def expand_occurrences(
+    start: datetime,
+    end: datetime,
+    freq: str,
+    interval: int = 1,
+    by_weekday: list[str] | None = None,
+    count: int | None = None,
+    until: datetime | None = None,
+    max_occurrences: int = 62,
+) -> list[tuple[datetime, datetime]]:
+    """
+    Expands an RRULE-like pattern into concrete (start, end) windows.
+    - freq DAILY: every `interval` days from `start`.
+    - freq WEEKLY: every `interval` weeks on `by_weekday` (MO..SU),
+      defaulting to the weekday of `start`.
+    The first occurrence is `start` itself (if it matches the pattern);
+    expansion stops at `count` occurrences or once a start passes `until`.
+    Raises ValueError for patterns we can't (or won't) expand.
+    """
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    if interval < 1:
+        raise ValueError("interval must be at least 1")
+    if count is None and until is None:
+        raise ValueError("Either count or until is required")
+
+    limit = min(count or max_occurrences, max_occurrences)
+    duration = end - start
+
+    if freq == "DAILY":
+        step_days = [0]
+        period = timedelta(days=interval)
+    elif freq == "WEEKLY":
+        codes = by_weekday or [WEEKDAYS[start.weekday()]]
+        if any(code not in WEEKDAYS for code in codes):
+            raise ValueError(f"by_weekday must be drawn from {WEEKDAYS}")
+        # Offsets from the Monday of the first week
+        step_days = sorted({WEEKDAYS.index(code) for code in codes})
+        period = timedelta(weeks=interval)
+    else:
+        raise ValueError("freq must be DAILY or WEEKLY")
+
+    anchor = start
+    if freq == "WEEKLY":
+        anchor = start - timedelta(days=start.weekday())
+
+    occurrences = []
+    done = False
+    while not done and len(occurrences) < limit:
+        for offset in step_days:
+            occ_start = anchor + timedelta(days=offset)
+            if occ_start < start:
+                continue
+            if until and occ_start > until:
+                done = True
+                break
+            occurrences.append((occ_start, occ_start + duration))
+            if len(occurrences) >= limit:
+                break
+        anchor += period
+
+    for (_, prev_end), (next_start, _) in zip(occurrences, occurrences[1:]):
+        if next_start < prev_end:
+            raise ValueError("Occurrences overlap; shorten the window")
+
+    return occurrences
+
+
+def assign_spots(
+    candidates: list[tuple[int, int, uuid.UUID]], occurrence_count: int
+) -> dict[int, tuple[int, uuid.UUID]]:
+    """
+    Picks a window for each occurrence from (occurrence_index, window_id,
+    spot_id) candidates, keeping the commuter on one spot where possible:
+    the spot covering the most occurrences wins them all, then the spot
+    covering most of the rest, and so on. Uncoverable occurrences are left out.
+    """
+    by_spot: dict[uuid.UUID, dict[int, int]] = {}
+    for idx, window_id, spot_id in candidates:
+        by_spot.setdefault(spot_id, {})[idx] = window_id
+
+    assignment = {}
+    remaining = set(range(occurrence_count))
+
+    while remaining and by_spot:
+        spot_id, windows = min(
+            by_spot.items(),
+            key=lambda item: (-len(remaining & item[1].keys()), str(item[0])),
+        )
+        covered = remaining & windows.keys()
+        if not covered:
+            break
+
+        for idx in covered:
+            assignment[idx] = (windows[idx], spot_id)
+        remaining -= covered
+        del by_spot[spot_id]
+
+    return assignment
@@ -0,0 +1,71 @@
+# apps/api/app/services/scan_cache.py
+"""
+Redis cache of what scan_booking needs per QR code, under `qr:{code}`.
+
+Entries expire exactly when the booking ends (EXPIREAT end_time), are
+warmed by the outbox relay when a payment confirms the booking, and are
+deleted (via the outbox) when the booking's status changes.
+"""
+from datetime import datetime
+import json
+import uuid
+
+from pytz import timezone
+
+from app.core.redis_client import redis_client
+
+
+def qr_cache_key(code: str) -> str:
+    return f"qr:{code}"
+
+
+def scan_data(
+    booking, driver_name: str | None, lot_owner_id: uuid.UUID | str
+) -> dict:
+    """The cached tuple, JSON-ready."""
+    return {
+        "code": booking.qr_code_data,
+        "booking_id": str(booking.id),
+        "lot_id": str(booking.lot_id),
+        "status": booking.status,
+        "start_time": booking.start_time.isoformat(),
+        "end_time": booking.end_time.isoformat(),
+        "driver_name": driver_name,
+        "vehicle_plate": booking.vehicle_plate,
+        "lot_owner_id": str(lot_owner_id),
+    }
+
+
+def _expire_at(data: dict) -> int:
+    end_time = datetime.fromisoformat(data["end_time"])
+    return int(timezone("Asia/Kolkata").localize(end_time).timestamp())
+
+
+async def cache_scan_data(data: dict) -> None:
+    """Stores `data` until its booking's end_time (naive IST)."""
+    await cache_many_scan_data([data])
+
+
+async def cache_many_scan_data(entries: list[dict]) -> None:
+    """cache_scan_data() for many entries in one round trip."""
+    if not entries:
+        return
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for data in entries:
+            key = qr_cache_key(data["code"])
+            pipe.set(key, json.dumps(data))
+            pipe.expireat(key, _expire_at(data))
+        await pipe.execute()
+
+
+async def get_scan_data(code: str) -> dict | None:
+    cached = await redis_client.get(qr_cache_key(code))
+    return json.loads(cached) if cached else None
+
+
+async def get_many_scan_data(codes: list[str]) -> list[dict | None]:
+    """One MGET; entries line up with `codes` (None on a miss)."""
+    if not codes:
+        return []
+    cached = await redis_client.mget([qr_cache_key(code) for code in codes])
+    return [json.loads(c) if c else None for c in cached]
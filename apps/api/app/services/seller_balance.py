@@ -0,0 +1,69 @@
+# apps/api/app/services/seller_balance.py
+"""
+The seller balance ledger (SellerBalance).
+
+Every Payment transition into or out of the owed states (PAID_BY_DRIVER,
+and PAYOUT_IN_PROGRESS while a payout batch has it reserved) adjusts the
+owning seller's row in the same transaction: confirmation credits it,
+refunds and settled payouts debit it. amount_due therefore always equals
+the sum of the seller's owed payments, without scanning Payment.
+"""
+from collections import defaultdict
+from datetime import datetime
+import uuid
+
+from sqlalchemy import Numeric, cast, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import SellerBalance
+
+
+def balance_changes(entries) -> dict:
+    """Sums (seller_id, amount, count) entries into {seller_id: (amount, count)}."""
+    changes = defaultdict(lambda: (0.0, 0))
+    for seller_id, amount, count in entries:
+        total, n = changes[seller_id]
+        changes[seller_id] = (total + amount, n + count)
+    return dict(changes)
+
+
+async def apply_balance_changes(session: AsyncSession, changes: dict) -> None:
+    """
+    Adds {seller_id: (amount, payment_count)} to the ledger (negative to
+    debit) with one multi-row upsert. Rows are written in seller order so
+    concurrent transactions lock them in the same order. The caller commits.
+    """
+    if not changes:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "seller_id": seller_id,
+            "amount_due": amount,
+            "payment_count": count,
+            "updated_at": now,
+        }
+        for seller_id, (amount, count) in sorted(changes.items(), key=lambda c: str(c[0]))
+    ]
+
+    stmt = insert(SellerBalance).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["seller_id"],
+        set_={
+            # Rounded to paise so repeated float adds can't leave dust behind
+            "amount_due": func.round(
+                cast(SellerBalance.amount_due + stmt.excluded.amount_due, Numeric), 2
+            ),
+            "payment_count": SellerBalance.payment_count + stmt.excluded.payment_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def debit_seller(
+    session: AsyncSession, seller_id: uuid.UUID, amount: float, count: int = 1
+) -> None:
+    await apply_balance_changes(session, {seller_id: (-amount, -count)})
@@ -0,0 +1,43 @@
+# apps/api/app/services/signing.py
+import base64
+import hashlib
+import hmac
+import json
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign_payload(payload: dict, key: bytes) -> str:
+    """Compact `<payload>.<signature>` token (base64url JSON + HMAC-SHA256)."""
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    signature = hmac.new(key, body.encode(), hashlib.sha256).digest()
+    return f"{body}.{_b64encode(signature)}"
+
+
+def verify_payload(token: str, key: bytes) -> dict | None:
+    """Returns the payload if the signature matches, otherwise None."""
+    try:
+        body, signature = token.split(".")
+        expected = hmac.new(key, body.encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        return json.loads(_b64decode(body))
+    except (ValueError, TypeError):
+        return None
+
+
+def read_payload(token: str) -> dict | None:
+    """
+    Decodes the payload WITHOUT checking the signature. Only for picking
+    the key to verify with; never trust the result on its own.
+    """
+    try:
+        return json.loads(_b64decode(token.split(".")[0]))
+    except (ValueError, TypeError):
+        return None
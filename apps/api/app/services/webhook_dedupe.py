@@ -0,0 +1,38 @@
+# apps/api/app/services/webhook_dedupe.py
+from app.config import settings
+from app.core.redis_client import redis_client
+
+
+def _event_key(event_id: str) -> str:
+    return f"rzp:event:{event_id}"
+
+
+async def claim_event(event_id: str) -> bool:
+    """
+    Atomically claims a Razorpay event id while it is being handled
+    (SET NX with a short in-progress TTL). Returns False when another
+    delivery of the same event holds or completed the claim, so retries are
+    dropped before they touch Postgres.
+
+    If the process dies before confirm_event(), the claim lapses within
+    WEBHOOK_CLAIM_TTL_SECONDS and Razorpay's retry is processed; the
+    WebhookEvent PK still guards against applying the event twice.
+    """
+    return bool(
+        await redis_client.set(
+            _event_key(event_id),
+            "1",
+            nx=True,
+            ex=settings.WEBHOOK_CLAIM_TTL_SECONDS,
+        )
+    )
+
+
+async def confirm_event(event_id: str):
+    """Keeps the claim for the full dedupe window once the event is committed/queued."""
+    await redis_client.expire(_event_key(event_id), settings.WEBHOOK_DEDUPE_TTL_SECONDS)
+
+
+async def release_event(event_id: str):
+    """Frees the claim after a failure so Razorpay's retry gets processed."""
+    await redis_client.delete(_event_key(event_id))
@@ -0,0 +1,27 @@
+# apps/api/app/services/webhook_queue.py
+from app.core.redis_client import redis_client
+
+# Redis Stream holding verified-but-unprocessed Razorpay webhooks.
+# Entries are only removed after the worker has committed them (XACK + XDEL),
+# so anything still in the stream survives API/worker restarts.
+WEBHOOK_STREAM = "razorpay:webhooks"
+WEBHOOK_GROUP = "webhook-workers"
+WEBHOOK_DEAD_LETTER_STREAM = "razorpay:webhooks:dead"
+
+
+async def enqueue_webhook(body: str, event_id: str | None = None) -> str:
+    """Appends the raw (already verified) webhook body to the stream."""
+    return await redis_client.xadd(
+        WEBHOOK_STREAM, {"body": body, "event_id": event_id or ""}
+    )
+
+
+async def ensure_consumer_group():
+    """Creates the consumer group (and the stream) if they don't exist yet."""
+    try:
+        await redis_client.xgroup_create(
+            WEBHOOK_STREAM, WEBHOOK_GROUP, id="0", mkstream=True
+        )
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
@@ -0,0 +1,55 @@
+# apps/api/app/workers/backfill_earnings.py
+"""
+(Re)builds the daily earnings rollups (LotEarningsDaily) from Payment,
+one transaction per chunk of days. Safe to re-run: each chunk replaces
+its days. Safe to run while the API is live: each chunk holds the
+earnings advisory lock, so confirmations and cancellations pause for the
+length of one chunk (lower --chunk-days to shorten the pause).
+
+    python -m app.workers.backfill_earnings --since 2025-01-01
+    python -m app.workers.backfill_earnings --since 2026-10-01 --until 2026-10-08
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+
+from pytz import timezone
+
+from app.db import async_session
+from app.services.earnings import rebuild_earnings
+
+
+async def backfill(since: date, until: date, chunk_days: int) -> int:
+    total = 0
+    start = since
+    while start < until:
+        end = min(start + timedelta(days=chunk_days), until)
+        async with async_session() as session:
+            written = await rebuild_earnings(session, start, end)
+            await session.commit()
+        print(f"[Earnings Backfill] {start} .. {end}: {written} rows")
+        total += written
+        start = end
+    return total
+
+
+async def main():
+    today_ist = datetime.now(timezone("Asia/Kolkata")).date()
+
+    parser = argparse.ArgumentParser(description="Earnings rollup backfill")
+    parser.add_argument("--since", type=date.fromisoformat, required=True)
+    parser.add_argument(
+        "--until",
+        type=date.fromisoformat,
+        default=today_ist + timedelta(days=366),
+        help="Exclusive; defaults past the furthest bookable day",
+    )
+    parser.add_argument("--chunk-days", type=int, default=31)
+    args = parser.parse_args()
+
+    total = await backfill(args.since, args.until, args.chunk_days)
+    print(f"[Earnings Backfill] Done: {total} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,189 @@
+# apps/api/app/workers/booking_sweeper.py
+"""
+Expires PENDING bookings whose payment window has passed and releases
+their spot holds, and does the same for unpaid extensions of confirmed
+bookings (their PENDING delta payment and HELD extra time).
+
+Run as a long-lived worker, or once from cron:
+    python -m app.workers.booking_sweeper
+    python -m app.workers.booking_sweeper --once
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, update
+from sqlmodel import select
+
+from app.config import settings
+from app.db import async_session
+from app.models import Booking, Payment
+from app.services.inventory import release_booking_windows
+from app.services.outbox import add_outbox_event
+
+
+async def expire_batch(cutoff: datetime) -> int:
+    """
+    Expires up to SWEEPER_BATCH_SIZE bookings in one short transaction.
+    The capture webhook locks an order's Booking rows before touching its
+    payments or windows, so SKIP LOCKED leaves bookings being confirmed
+    right now alone (the webhook re-reads them after we commit otherwise).
+    The lock_timeout guarantees the sweeper never queues behind a long lock.
+    """
+    async with async_session() as session:
+        await session.execute(text("SET LOCAL lock_timeout = '2s'"))
+
+        # 1. Claim the oldest abandoned checkouts (ix_booking_pending_created_at)
+        stmt = (
+            select(Booking)
+            .where(Booking.status == "PENDING", Booking.created_at < cutoff)
+            .order_by(Booking.created_at)
+            .limit(settings.SWEEPER_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        bookings = (await session.execute(stmt)).scalars().all()
+
+        if not bookings:
+            return 0
+
+        booking_ids = [b.id for b in bookings]
+
+        # 2. Bookings + Payments -> EXPIRED
+        for booking in bookings:
+            booking.status = "EXPIRED"
+            session.add(booking)
+
+        await session.execute(
+            update(Payment)
+            .where(
+                Payment.booking_id.in_(booking_ids),
+                Payment.status.in_(("PENDING", "PENDING_ORDER")),
+            )
+            .values(status="EXPIRED", updated_at=datetime.utcnow())
+        )
+
+        # 3. Release Holds (merged back into the neighbouring free time)
+        await release_booking_windows(session, booking_ids, statuses=("HELD",))
+
+        # 4. Outbox events (delivered by app/workers/outbox_relay.py)
+        for booking in bookings:
+            add_outbox_event(
+                session,
+                "booking_expired",
+                booking.driver_user_id,
+                {
+                    "booking_id": str(booking.id),
+                    "lot_id": str(booking.lot_id),
+                    "created_at": booking.created_at.isoformat(),
+                },
+            )
+
+        await session.commit()
+
+    return len(bookings)
+
+
+async def expire_extensions_batch(cutoff: datetime) -> int:
+    """
+    Expires up to SWEEPER_BATCH_SIZE unpaid extension payments (PENDING
+    payments of CONFIRMED bookings) and releases the extra time they held.
+    The booking itself stays CONFIRMED with its original end. Both rows are
+    claimed with SKIP LOCKED, so an extension whose capture is being
+    confirmed (booking locked by the webhook) is skipped.
+    """
+    async with async_session() as session:
+        await session.execute(text("SET LOCAL lock_timeout = '2s'"))
+
+        # 1. Claim abandoned extension checkouts (ix_payment_pending_created_at)
+        stmt = (
+            select(Payment)
+            .join(Booking, Booking.id == Payment.booking_id)
+            .where(
+                Payment.status == "PENDING",
+                Payment.created_at < cutoff,
+                Booking.status == "CONFIRMED",
+            )
+            .order_by(Payment.created_at)
+            .limit(settings.SWEEPER_BATCH_SIZE)
+            .with_for_update(of=[Booking, Payment], skip_locked=True)
+        )
+        payments = (await session.execute(stmt)).scalars().all()
+
+        if not payments:
+            return 0
+
+        # 2. Payments -> EXPIRED (a late capture is refunded by the webhook)
+        now = datetime.utcnow()
+        for payment in payments:
+            payment.status = "EXPIRED"
+            payment.updated_at = now
+            session.add(payment)
+
+        # 3. Release the held extra time
+        booking_ids = list({p.booking_id for p in payments})
+        await release_booking_windows(session, booking_ids, statuses=("HELD",))
+
+        # 4. Outbox events
+        for payment in payments:
+            add_outbox_event(
+                session,
+                "booking_extension_expired",
+                None,
+                {
+                    "booking_id": str(payment.booking_id),
+                    "razorpay_order_id": payment.razorpay_order_id,
+                    "created_at": payment.created_at.isoformat(),
+                },
+            )
+
+        await session.commit()
+
+    return len(payments)
+
+
+async def _sweep_batches(expire, cutoff: datetime) -> int:
+    total = 0
+    while True:
+        try:
+            expired = await expire(cutoff)
+        except Exception as e:
+            # Usually a lock_timeout; the next run picks the batch up again.
+            print(f"[Sweeper Error] {e}")
+            break
+
+        total += expired
+        if expired < settings.SWEEPER_BATCH_SIZE:
+            break
+    return total
+
+
+async def sweep() -> int:
+    """
+    Runs batches until no expired PENDING bookings or unpaid extensions
+    are left. Returns the number of bookings expired.
+    """
+    cutoff = datetime.utcnow() - timedelta(
+        minutes=settings.BOOKING_PAYMENT_WINDOW_MINUTES
+    )
+    total = await _sweep_batches(expire_batch, cutoff)
+    extensions = await _sweep_batches(expire_extensions_batch, cutoff)
+    if extensions:
+        print(f"[Sweeper] Released {extensions} unpaid extensions")
+    return total
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Pending-booking expiry sweeper")
+    parser.add_argument("--once", action="store_true", help="Run one sweep and exit")
+    args = parser.parse_args()
+
+    while True:
+        expired = await sweep()
+        print(f"[Sweeper] Expired {expired} pending bookings")
+        if args.once:
+            break
+        await asyncio.sleep(settings.SWEEPER_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+# apps/api/app/workers/occupancy_flusher.py
+"""
+Persists the live Redis occupancy counters (app/services/occupancy.py)
+to the lotoccupancy table.
+
+Run alongside the API, or once from cron:
+    python -m app.workers.occupancy_flusher
+    python -m app.workers.occupancy_flusher --once
+"""
+import argparse
+import asyncio
+
+from app.config import settings
+from app.db import async_session
+from app.services.occupancy import flush_occupancy
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Occupancy flusher")
+    parser.add_argument("--once", action="store_true", help="Flush once and exit")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            async with async_session() as session:
+                flushed = await flush_occupancy(session)
+            print(f"[Occupancy Flusher] Persisted {flushed} lots")
+        except Exception as e:
+            print(f"[Occupancy Flusher Error] {e}")
+
+        if args.once:
+            break
+        await asyncio.sleep(settings.OCCUPANCY_FLUSH_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
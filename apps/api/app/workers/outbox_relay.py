@@ -0,0 +1,90 @@
+# apps/api/app/workers/outbox_relay.py
+"""
+Delivers outbox events (SMS, event log, cache invalidation) written by the
+booking and payment transactions.
+
+Run alongside the API (several relays can share the table):
+    python -m app.workers.outbox_relay
+    python -m app.workers.outbox_relay --once
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from sqlmodel import select
+
+from app.config import settings
+from app.db import async_session
+from app.models import OutboxEvent
+from app.services.outbox import dispatch_event
+
+
+async def relay_batch() -> int:
+    """
+    Claims the oldest undelivered events (SKIP LOCKED, so relays never
+    hand out the same row twice), dispatches them in order and records the
+    outcome in the same transaction. Delivery is at-least-once: a crash
+    before the commit re-delivers the whole batch.
+    Returns the number of events delivered.
+    """
+    async with async_session() as session:
+        stmt = (
+            select(OutboxEvent)
+            .where(
+                OutboxEvent.processed_at.is_(None),
+                OutboxEvent.attempts < settings.OUTBOX_MAX_ATTEMPTS,
+            )
+            .order_by(OutboxEvent.id)
+            .limit(settings.OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        events = (await session.execute(stmt)).scalars().all()
+        delivered = 0
+
+        for event in events:
+            try:
+                await dispatch_event(event)
+                event.processed_at = datetime.utcnow()
+                delivered += 1
+            except Exception as e:
+                # Stays pending; retried by the next batch until OUTBOX_MAX_ATTEMPTS
+                event.attempts += 1
+                event.last_error = str(e)[:500]
+                print(f"[Outbox Relay] Event {event.id} ({event.event_type}) failed: {e}")
+            session.add(event)
+
+        await session.commit()
+        return delivered
+
+
+async def drain() -> int:
+    """Relays full batches until the outbox is empty (or a batch had failures)."""
+    total = 0
+    while True:
+        relayed = await relay_batch()
+        total += relayed
+        if relayed < settings.OUTBOX_BATCH_SIZE:
+            return total
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Outbox relay")
+    parser.add_argument("--once", action="store_true", help="Drain once and exit")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            relayed = await drain()
+        except Exception as e:
+            print(f"[Outbox Relay Error] {e}")
+            relayed = 0
+
+        if args.once:
+            print(f"[Outbox Relay] Relayed {relayed} events")
+            break
+        if not relayed:
+            await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+# apps/api/app/workers/payout_runner.py
+"""
+Runs payout jobs queued by POST /api/financials/process-batch, and resumes
+jobs whose runner died (RUNNING without a heartbeat for
+PAYOUT_JOB_STALE_SECONDS) from their last checkpoint.
+
+A live runner stamps its job's updated_at every third of that interval,
+even while a slow chunk is dispatching. Each claim bumps attempts; a runner
+whose job was taken over anyway notices at its next write (LeaseLost) and
+stops without recording anything.
+
+Between jobs it also polls payouts RazorpayX accepted but hadn't finished
+(poll_submitted_transfers), in case their payout.* webhook never arrives.
+
+Run alongside the API:
+    python -m app.workers.payout_runner
+    python -m app.workers.payout_runner --once
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import uuid
+
+from sqlalchemy import and_, or_, update
+from sqlmodel import select
+
+from app.config import settings
+from app.db import async_session
+from app.models import PayoutJob
+from app.services.payout_jobs import (
+    LeaseLost,
+    poll_submitted_transfers,
+    run_payout_job,
+)
+
+
+async def claim_job() -> tuple[uuid.UUID, int] | None:
+    """
+    Marks the oldest runnable job RUNNING (SKIP LOCKED) and returns its id
+    and lease (its new attempts count).
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.PAYOUT_JOB_STALE_SECONDS)
+
+    async with async_session() as session:
+        stmt = (
+            select(PayoutJob)
+            .where(
+                or_(
+                    PayoutJob.status == "PENDING",
+                    and_(PayoutJob.status == "RUNNING", PayoutJob.updated_at < stale_before),
+                ),
+                PayoutJob.attempts < settings.PAYOUT_JOB_MAX_ATTEMPTS,
+            )
+            .order_by(PayoutJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = (await session.execute(stmt)).scalars().first()
+        if not job:
+            return None
+
+        job.status = "RUNNING"
+        job.attempts += 1
+        job.updated_at = datetime.utcnow()
+        session.add(job)
+        await session.commit()
+        return job.id, job.attempts
+
+
+async def heartbeat(job_id: uuid.UUID, lease: int) -> None:
+    """Keeps a held job from looking stale; stops once the lease is gone."""
+    while True:
+        await asyncio.sleep(settings.PAYOUT_JOB_STALE_SECONDS / 3)
+        async with async_session() as session:
+            result = await session.execute(
+                update(PayoutJob)
+                .where(
+                    PayoutJob.id == job_id,
+                    PayoutJob.status == "RUNNING",
+                    PayoutJob.attempts == lease,
+                )
+                .values(updated_at=datetime.utcnow())
+            )
+            await session.commit()
+        if result.rowcount == 0:
+            return
+
+
+async def run_job(job_id: uuid.UUID, lease: int) -> None:
+    beat = asyncio.create_task(heartbeat(job_id, lease))
+    async with async_session() as session:
+        job = await session.get(PayoutJob, job_id)
+        try:
+            await run_payout_job(session, job, lease)
+            print(
+                f"[Payout Runner] Job {job_id} done: {job.sellers_processed} paid, "
+                f"{job.sellers_failed} failed, ₹{job.amount_paid}"
+            )
+        except LeaseLost as e:
+            # The new holder finishes the job; nothing of ours to record
+            print(f"[Payout Runner] {e}")
+        except Exception as e:
+            # Committed chunks stay done; the job resumes from its cursor
+            await session.rollback()
+            print(f"[Payout Runner] Job {job_id} failed: {e}")
+            job = await session.get(PayoutJob, job_id, with_for_update=True)
+            if job.status == "RUNNING" and job.attempts == lease:
+                job.last_error = str(e)[:500]
+                job.status = (
+                    "FAILED"
+                    if job.attempts >= settings.PAYOUT_JOB_MAX_ATTEMPTS
+                    else "PENDING"
+                )
+                job.updated_at = datetime.utcnow()
+                session.add(job)
+            await session.commit()
+        finally:
+            beat.cancel()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Payout job runner")
+    parser.add_argument("--once", action="store_true", help="Run queued jobs once and exit")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            claimed = await claim_job()
+            if claimed:
+                await run_job(*claimed)
+            async with async_session() as session:
+                settled = await poll_submitted_transfers(session)
+            if settled:
+                print(f"[Payout Runner] Settled {settled} submitted payouts")
+        except Exception as e:
+            print(f"[Payout Runner Error] {e}")
+            claimed = None
+
+        if not claimed:
+            if args.once:
+                break
+            await asyncio.sleep(settings.PAYOUT_JOB_POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
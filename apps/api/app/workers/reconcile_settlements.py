@@ -0,0 +1,120 @@
+# apps/api/app/workers/reconcile_settlements.py
+"""
+Reconciles a Razorpay settlement/payout report (CSV, optionally .gz)
+against Payment rows and writes what doesn't match to
+ReconciliationDiscrepancy (see app/services/reconciliation.py).
+
+Memory stays bounded by RECONCILE_BATCH_SIZE whatever the file size.
+
+    python -m app.workers.reconcile_settlements settlements.csv
+    python -m app.workers.reconcile_settlements report.csv.gz --amount-unit paise \\
+        --since 2026-10-01 --until 2026-10-08
+"""
+import argparse
+import asyncio
+from datetime import datetime
+import os
+import uuid
+
+from sqlalchemy import insert, update
+
+from app.config import settings
+from app.db import engine
+from app.models import ReconciliationRun
+from app.services.reconciliation import (
+    create_report_tables,
+    drop_report_tables,
+    iter_report_batches,
+    reconcile_batch,
+    record_missing_in_report,
+)
+
+
+async def reconcile(
+    path: str,
+    amount_unit: str = "inr",
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> uuid.UUID:
+    """Runs one reconciliation; progress is committed after every batch."""
+    run_id = uuid.uuid4()
+    runs = ReconciliationRun.__table__
+
+    # One connection throughout: the temp tables live on it
+    async with engine.connect() as conn:
+        await conn.execute(
+            insert(runs).values(
+                id=run_id,
+                source_file=os.path.basename(path),
+                status="RUNNING",
+                rows_read=0,
+                rows_skipped=0,
+                discrepancies=0,
+                created_at=datetime.utcnow(),
+            )
+        )
+        await create_report_tables(conn)
+        await conn.commit()
+
+        try:
+            for rows, skipped in iter_report_batches(
+                path, settings.RECONCILE_BATCH_SIZE, amount_unit
+            ):
+                found = await reconcile_batch(conn, run_id, rows)
+                await conn.execute(
+                    update(runs)
+                    .where(runs.c.id == run_id)
+                    .values(
+                        rows_read=runs.c.rows_read + len(rows) + skipped,
+                        rows_skipped=runs.c.rows_skipped + skipped,
+                        discrepancies=runs.c.discrepancies + found,
+                    )
+                )
+                await conn.commit()
+
+            if since and until:
+                found = await record_missing_in_report(conn, run_id, since, until)
+                await conn.execute(
+                    update(runs)
+                    .where(runs.c.id == run_id)
+                    .values(discrepancies=runs.c.discrepancies + found)
+                )
+
+            await conn.execute(
+                update(runs)
+                .where(runs.c.id == run_id)
+                .values(status="COMPLETED", finished_at=datetime.utcnow())
+            )
+            await drop_report_tables(conn)
+            await conn.commit()
+        except Exception as e:
+            await conn.rollback()
+            await conn.execute(
+                update(runs)
+                .where(runs.c.id == run_id)
+                .values(status="FAILED", last_error=str(e)[:500], finished_at=datetime.utcnow())
+            )
+            await conn.commit()
+            raise
+
+    return run_id
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Settlement report reconciliation")
+    parser.add_argument("path", help="Report CSV (.csv or .csv.gz)")
+    parser.add_argument("--amount-unit", choices=["inr", "paise"], default="inr")
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="With --until: also flag captured payments (created in the range, UTC) missing from the report",
+    )
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    args = parser.parse_args()
+
+    run_id = await reconcile(args.path, args.amount_unit, args.since, args.until)
+    print(f"[Reconciliation] Run {run_id} complete")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+# apps/api/app/workers/webhook_worker.py
+"""
+Drains the Razorpay webhook stream written by razorpay_webhook in queue mode.
+
+Run alongside the API:
+    python -m app.workers.webhook_worker
+"""
+import asyncio
+import json
+import socket
+
+from app.config import settings
+from app.core.redis_client import redis_client
+from app.db import async_session
+from app.services.payments import handle_webhook_event
+from app.services.webhook_queue import (
+    WEBHOOK_STREAM,
+    WEBHOOK_GROUP,
+    WEBHOOK_DEAD_LETTER_STREAM,
+    ensure_consumer_group,
+)
+
+# Entries a crashed consumer left un-acked are re-claimed after this long.
+CLAIM_IDLE_MS = 60_000
+# After this many deliveries an entry is parked on the dead-letter stream.
+MAX_DELIVERIES = 5
+
+
+async def process_batch(consumer: str, entries: list) -> None:
+    """
+    Applies a batch of stream entries with one DB session.
+    Each event still commits on its own, so one bad event doesn't roll back
+    the rest; failed entries stay pending and are retried via XAUTOCLAIM.
+    """
+    done = []
+
+    async with async_session() as session:
+        for entry_id, fields in entries:
+            if not fields:
+                # Entry was trimmed/deleted while pending; nothing to apply.
+                done.append(entry_id)
+                continue
+
+            try:
+                payload = json.loads(fields["body"])
+                await handle_webhook_event(
+                    session, payload, fields.get("event_id") or None
+                )
+            except Exception as e:
+                await session.rollback()
+                print(f"[Webhook Worker] {consumer} failed on {entry_id}: {e}")
+                await park_if_poisoned(entry_id, fields)
+                continue
+
+            done.append(entry_id)
+
+    if done:
+        await redis_client.xack(WEBHOOK_STREAM, WEBHOOK_GROUP, *done)
+        await redis_client.xdel(WEBHOOK_STREAM, *done)
+
+
+async def park_if_poisoned(entry_id: str, fields: dict) -> None:
+    """Moves an entry that keeps failing to the dead-letter stream."""
+    pending = await redis_client.xpending_range(
+        WEBHOOK_STREAM, WEBHOOK_GROUP, min=entry_id, max=entry_id, count=1
+    )
+    if pending and pending[0]["times_delivered"] >= MAX_DELIVERIES:
+        await redis_client.xadd(WEBHOOK_DEAD_LETTER_STREAM, fields)
+        await redis_client.xack(WEBHOOK_STREAM, WEBHOOK_GROUP, entry_id)
+        await redis_client.xdel(WEBHOOK_STREAM, entry_id)
+
+
+async def consume(consumer: str) -> None:
+    batch_size = settings.WEBHOOK_WORKER_BATCH_SIZE
+
+    while True:
+        # 1. Pick up entries abandoned by dead consumers first
+        _, claimed, *_ = await redis_client.xautoclaim(
+            WEBHOOK_STREAM,
+            WEBHOOK_GROUP,
+            consumer,
+            min_idle_time=CLAIM_IDLE_MS,
+            count=batch_size,
+        )
+        if claimed:
+            await process_batch(consumer, claimed)
+
+        # 2. Then new entries (blocks up to 5s when the stream is empty)
+        response = await redis_client.xreadgroup(
+            WEBHOOK_GROUP,
+            consumer,
+            {WEBHOOK_STREAM: ">"},
+            count=batch_size,
+            block=5000,
+        )
+        for _, entries in response:
+            await process_batch(consumer, entries)
+
+
+async def main():
+    await ensure_consumer_group()
+
+    host = socket.gethostname()
+    consumers = [
+        consume(f"{host}-{i}") for i in range(settings.WEBHOOK_WORKER_CONCURRENCY)
+    ]
+    print(f"[Webhook Worker] {len(consumers)} consumers on {WEBHOOK_STREAM}")
+    await asyncio.gather(*consumers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
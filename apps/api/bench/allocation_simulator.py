@@ -0,0 +1,117 @@
+# apps/api/bench/allocation_simulator.py
+"""
+Replays a synthetic day of bookings against each allocation policy.
+
+Uses the in-memory policies from app/services/allocation.py, so no database
+is needed. Reports accepted bookings, rejected long stays, utilization
+(booked hours / open hours) and per-request allocation latency.
+
+Usage:
+    python -m bench.allocation_simulator --spots 20 --requests 400 --seed 7
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.services.allocation import POLICIES, choose_window
+
+DAY = datetime(2030, 1, 1)
+OPEN = DAY.replace(hour=6)
+CLOSE = DAY.replace(hour=22)
+LONG_STAY_HOURS = 4
+
+
+class Window:
+    __slots__ = ("spot_id", "start_time", "end_time", "status")
+
+    def __init__(self, spot_id, start_time, end_time, status="AVAILABLE"):
+        self.spot_id = spot_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.status = status
+
+
+def generate_requests(count: int, long_share: float, rng: random.Random):
+    """Booking requests in arrival order: (start, end)."""
+    requests = []
+    for _ in range(count):
+        start = OPEN + timedelta(minutes=30 * rng.randrange(0, 30))
+        if rng.random() < long_share:
+            hours = rng.uniform(LONG_STAY_HOURS, 10)
+        else:
+            hours = rng.uniform(1, 2)
+        end = min(CLOSE, start + timedelta(minutes=30 * round(hours * 2)))
+        if end > start:
+            requests.append((start, end))
+    return requests
+
+
+def book(windows: list, window: Window, start: datetime, end: datetime):
+    """In-memory split_window(): carve [start, end] out of `window`."""
+    if window.start_time < start:
+        windows.append(Window(window.spot_id, window.start_time, start))
+    if window.end_time > end:
+        windows.append(Window(window.spot_id, end, window.end_time))
+    window.start_time = start
+    window.end_time = end
+    window.status = "BOOKED"
+
+
+def simulate(policy: str, spots: int, requests: list) -> dict:
+    windows = [Window(i, OPEN, CLOSE) for i in range(spots)]
+    latencies = []
+    accepted = booked_hours = 0
+    rejected_long = 0
+
+    for start, end in requests:
+        t0 = time.perf_counter()
+        window = choose_window(windows, start, end, policy)
+        if window:
+            book(windows, window, start, end)
+        latencies.append((time.perf_counter() - t0) * 1_000_000)
+
+        hours = (end - start).total_seconds() / 3600
+        if window:
+            accepted += 1
+            booked_hours += hours
+        elif hours >= LONG_STAY_HOURS:
+            rejected_long += 1
+
+    open_hours = spots * (CLOSE - OPEN).total_seconds() / 3600
+    latencies.sort()
+    return {
+        "accepted": accepted,
+        "rejected_long": rejected_long,
+        "utilization": booked_hours / open_hours,
+        "p50_us": statistics.median(latencies),
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--spots", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--long-share", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    requests = generate_requests(
+        args.requests, args.long_share, random.Random(args.seed)
+    )
+    print(f"{len(requests)} requests over {args.spots} spots")
+
+    for policy in POLICIES:
+        r = simulate(policy, args.spots, requests)
+        print(
+            f"{policy:<13} accepted {r['accepted']:4d}  "
+            f"long stays rejected {r['rejected_long']:4d}  "
+            f"utilization {r['utilization']:6.1%}  "
+            f"p50 {r['p50_us']:6.1f} us  p99 {r['p99_us']:6.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
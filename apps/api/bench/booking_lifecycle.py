@@ -0,0 +1,348 @@
+# apps/api/bench/booking_lifecycle.py
+"""
+Load-tests the full booking lifecycle over HTTP.
+
+Every simulated driver runs create_booking -> signed payment.captured
+webhook -> fetches the QR from /api/my-bookings -> the lot owner scans it.
+`--contention` drivers share each lot (lots = drivers / contention), so
+raising it (or lowering --spots) makes drivers fight over the same windows.
+
+Reports throughput, p50/p99 per stage, double allocations and lock waits
+(pg_stat_activity sampled during the run).
+
+Usage (migrated Postgres + Redis; API pointed at the fake gateway with the
+same RAZORPAY_WEBHOOK_SECRET as this process):
+    python -m bench.fake_razorpay --port 9100 --latency-ms 150
+    RAZORPAY_API_BASE_URL=http://localhost:9100 uvicorn main:app --port 8000
+    python -m bench.booking_lifecycle --drivers 400 --concurrency 50 --contention 20 --spots 10
+"""
+import argparse
+import asyncio
+import math
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+from geoalchemy2.elements import WKTElement
+from pytz import timezone
+from sqlalchemy import delete, func, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import aliased, sessionmaker
+from sqlmodel import select
+
+from app.config import settings
+from app.db import database_url
+from app.models import (
+    User,
+    ParkingLot,
+    ParkingSpot,
+    PricingRule,
+    SpotAvailability,
+    Booking,
+    Payment,
+    WebhookEvent,
+    OutboxEvent,
+    SellerBalance,
+    LotEarningsDaily,
+)
+from app.security import create_access_token
+from bench.fake_razorpay import captured_webhook
+
+IST = timezone("Asia/Kolkata")
+STAGES = ("book", "webhook", "qr", "scan", "total")
+
+
+def _phone() -> str:
+    return f"+9{uuid.uuid4().int % 10**11:011d}"
+
+
+async def seed(Session, lots: int, spots: int, drivers: int, now: datetime):
+    """A seller owning `lots` priced lots with `spots` CAR spots each, plus drivers."""
+    async with Session() as session:
+        seller = User(phone=_phone(), name="Bench Seller")
+        session.add(seller)
+        driver_ids = []
+        for i in range(drivers):
+            driver = User(phone=_phone(), name=f"Bench Driver {i}")
+            session.add(driver)
+            driver_ids.append(driver.id)
+
+        lot_ids = []
+        for i in range(lots):
+            lot = ParkingLot(
+                owner_user_id=seller.id,
+                name=f"Bench Lot {i}",
+                address="Benchmark",
+                location=WKTElement("POINT(72.8777 19.0760)", srid=4326),
+            )
+            session.add(lot)
+            session.add(PricingRule(lot_id=lot.id, name="Bench", rate=50.0))
+            lot_ids.append(lot.id)
+            for j in range(spots):
+                spot = ParkingSpot(lot_id=lot.id, name=f"B-{j}", spot_type="CAR")
+                session.add(spot)
+                session.add(
+                    SpotAvailability(
+                        spot_id=spot.id,
+                        start_time=now - timedelta(hours=1),
+                        end_time=now + timedelta(hours=4),
+                        status="AVAILABLE",
+                    )
+                )
+        await session.commit()
+        return seller.id, driver_ids, lot_ids
+
+
+async def cleanup(Session, seller_id, driver_ids, lot_ids):
+    async with Session() as session:
+        spot_ids = select(ParkingSpot.id).where(ParkingSpot.lot_id.in_(lot_ids))
+        booking_ids = select(Booking.id).where(Booking.lot_id.in_(lot_ids))
+        user_ids = driver_ids + [seller_id]
+        # Confirmations also write the seller ledger, earnings rollups + outbox
+        await session.execute(
+            delete(LotEarningsDaily).where(LotEarningsDaily.lot_id.in_(lot_ids))
+        )
+        await session.execute(delete(SellerBalance).where(SellerBalance.seller_id == seller_id))
+        await session.execute(delete(OutboxEvent).where(OutboxEvent.user_id.in_(user_ids)))
+        await session.execute(delete(Payment).where(Payment.booking_id.in_(booking_ids)))
+        await session.execute(delete(Booking).where(Booking.lot_id.in_(lot_ids)))
+        await session.execute(
+            delete(SpotAvailability).where(SpotAvailability.spot_id.in_(spot_ids))
+        )
+        await session.execute(delete(ParkingSpot).where(ParkingSpot.lot_id.in_(lot_ids)))
+        await session.execute(delete(PricingRule).where(PricingRule.lot_id.in_(lot_ids)))
+        await session.execute(delete(ParkingLot).where(ParkingLot.id.in_(lot_ids)))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.execute(
+            delete(WebhookEvent).where(WebhookEvent.event_id.like("evt_bench_%"))
+        )
+        await session.commit()
+
+
+async def count_double_allocations(Session, lot_ids) -> int:
+    """Live bookings overlapping another live booking on the same spot."""
+    async with Session() as session:
+        other = aliased(Booking)
+        live = ("PENDING", "CONFIRMED")
+        stmt = (
+            select(func.count())
+            .select_from(Booking)
+            .join(
+                other,
+                (other.spot_id == Booking.spot_id)
+                & (other.id > Booking.id)
+                & (other.start_time < Booking.end_time)
+                & (other.end_time > Booking.start_time),
+            )
+            .where(
+                Booking.lot_id.in_(lot_ids),
+                Booking.status.in_(live),
+                other.status.in_(live),
+            )
+        )
+        return (await session.execute(stmt)).scalar_one()
+
+
+class LockWaitSampler:
+    """Polls pg_stat_activity for backends waiting on a lock."""
+
+    def __init__(self, engine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        query = text(
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+        )
+        async with self.engine.connect() as conn:
+            while True:
+                self.samples.append((await conn.execute(query)).scalar_one())
+                await conn.rollback()
+                await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    @property
+    def peak(self) -> int:
+        return max(self.samples, default=0)
+
+    @property
+    def waited_seconds(self) -> float:
+        """Approximate backend-seconds spent waiting on locks."""
+        return sum(self.samples) * self.interval
+
+
+async def lifecycle(http, driver_id, seller_token, lot_id, start, end, latencies):
+    """One driver's book -> pay -> QR -> scan. Returns the outcome."""
+    headers = {"Authorization": f"Bearer {create_access_token(driver_id)}"}
+    t_start = time.perf_counter()
+
+    # 1. Book
+    t0 = time.perf_counter()
+    resp = await http.post(
+        "/api/book/",
+        headers=headers,
+        json={
+            "lot_id": str(lot_id),
+            "start_time": start.isoformat(),
+            "end_time": end.isoformat(),
+            "vehicle_type": "CAR",
+        },
+    )
+    latencies["book"].append((time.perf_counter() - t0) * 1000)
+    if resp.status_code == 400:
+        return "sold_out"
+    if resp.status_code != 200:
+        return "failed"
+    booking = resp.json()
+
+    # 2. Gateway delivers payment.captured
+    body, webhook_headers = captured_webhook(
+        booking["razorpay_order_id"],
+        int(booking["amount"] * 100),
+        settings.RAZORPAY_WEBHOOK_SECRET,
+    )
+    t0 = time.perf_counter()
+    resp = await http.post("/api/book/webhook", content=body, headers=webhook_headers)
+    latencies["webhook"].append((time.perf_counter() - t0) * 1000)
+    if resp.status_code != 200:
+        return "failed"
+
+    # 3. Driver opens the QR (polls while a queue-mode worker catches up)
+    t0 = time.perf_counter()
+    qr_code = None
+    for _ in range(50):
+        resp = await http.get("/api/my-bookings", headers=headers)
+        confirmed = [
+            b
+            for b in resp.json()
+            if b["id"] == booking["booking_id"] and b["status"] == "CONFIRMED"
+        ]
+        if confirmed:
+            qr_code = confirmed[0]["qr_code_data"]
+            break
+        await asyncio.sleep(0.1)
+    latencies["qr"].append((time.perf_counter() - t0) * 1000)
+    if not qr_code:
+        return "unconfirmed"
+
+    # 4. Lot owner scans at the gate
+    t0 = time.perf_counter()
+    resp = await http.post(
+        "/api/scan",
+        headers={"Authorization": f"Bearer {seller_token}"},
+        json={"qr_code": qr_code},
+    )
+    latencies["scan"].append((time.perf_counter() - t0) * 1000)
+    if resp.status_code != 200 or not resp.json()["success"]:
+        return "scan_rejected"
+
+    latencies["total"].append((time.perf_counter() - t_start) * 1000)
+    return "scanned"
+
+
+def _percentiles(values: list) -> str:
+    if not values:
+        return f"{'-':>9} {'-':>9}"
+    values = sorted(values)
+    p99 = values[max(0, math.ceil(len(values) * 0.99) - 1)]
+    return f"{statistics.median(values):7.1f}ms {p99:7.1f}ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--drivers", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--contention", type=int, default=20, help="Drivers per lot")
+    parser.add_argument("--spots", type=int, default=10, help="Spots per lot")
+    parser.add_argument("--sample-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_async_engine(database_url, pool_size=2, max_overflow=0)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    now = datetime.now(IST).replace(tzinfo=None)
+    lots = math.ceil(args.drivers / args.contention)
+    seller_id, driver_ids, lot_ids = await seed(
+        Session, lots, args.spots, args.drivers, now
+    )
+    seller_token = create_access_token(seller_id)
+
+    # Check-in must be open right away for the scan stage
+    start = IST.localize(now - timedelta(minutes=5))
+    end = start + timedelta(hours=2)
+
+    latencies = {stage: [] for stage in STAGES}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    sampler = LockWaitSampler(engine, args.sample_ms / 1000)
+
+    async with httpx.AsyncClient(
+        base_url=args.api_url,
+        timeout=60,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as http:
+
+        async def one(i, driver_id):
+            async with semaphore:
+                try:
+                    return await lifecycle(
+                        http,
+                        driver_id,
+                        seller_token,
+                        lot_ids[i % lots],
+                        start,
+                        end,
+                        latencies,
+                    )
+                except httpx.HTTPError:
+                    return "failed"
+
+        sampler.start()
+        t0 = time.perf_counter()
+        outcomes = await asyncio.gather(
+            *[one(i, driver_id) for i, driver_id in enumerate(driver_ids)]
+        )
+        elapsed = time.perf_counter() - t0
+        await sampler.stop()
+
+    try:
+        doubles = await count_double_allocations(Session, lot_ids)
+    finally:
+        await cleanup(Session, seller_id, driver_ids, lot_ids)
+        await engine.dispose()
+
+    counts = {o: outcomes.count(o) for o in sorted(set(outcomes))}
+    print(
+        f"{args.drivers} drivers, {lots} lots x {args.spots} spots, "
+        f"concurrency {args.concurrency}"
+    )
+    print(
+        f"{counts.get('scanned', 0) / elapsed:.1f} lifecycles/s "
+        f"({args.drivers / elapsed:.1f} attempts/s) in {elapsed:.1f}s  {counts}"
+    )
+    print(f"{'stage':<8} {'p50':>9} {'p99':>9}")
+    for stage in STAGES:
+        print(f"{stage:<8} {_percentiles(latencies[stage])}")
+    print(f"double-allocated {doubles}")
+    print(
+        f"lock waits: peak {sampler.peak} backends, "
+        f"~{sampler.waited_seconds:.2f} backend-s (sampled every {args.sample_ms} ms)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,301 @@
+# apps/api/bench/booking_write_path.py
+"""
+Benchmarks the booking write path under concurrent load.
+
+Compares three flows:
+- legacy: unlocked spot lookup, commit Booking, refresh, commit Payment;
+- gateway-in-txn: lock + hold the window and call Razorpay inside the same
+  transaction (the window lock is held across the gateway round trip);
+- two-commit: the flow used by create_booking -- lock + hold the window
+  and write Booking + Payment (PENDING_ORDER) in a first commit, call
+  Razorpay with no transaction open, then attach the order id in a
+  second commit.
+
+Razorpay calls go through the SDK (in the default executor, as in the
+API) to bench/fake_razorpay.py, so gateway latency is part of the picture.
+
+Usage (needs a migrated Postgres in DATABASE_URL):
+    python -m bench.fake_razorpay --port 9100 --latency-ms 150
+    python -m bench.booking_write_path --bookings 500 --concurrency 50 --spots 100 \
+        --razorpay-url http://localhost:9100
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import razorpay
+from geoalchemy2.elements import WKTElement
+from sqlalchemy import delete, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import select
+
+from app.config import settings
+from app.db import database_url
+from app.models import (
+    User,
+    ParkingLot,
+    ParkingSpot,
+    SpotAvailability,
+    Booking,
+    Payment,
+)
+from app.services.inventory import lock_available_window, split_window
+
+START = datetime(2030, 1, 1, 10, 0)
+END = START + timedelta(hours=2)
+
+gateway = None  # razorpay.Client, set in main()
+
+
+async def create_order(booking_id: uuid.UUID) -> str:
+    loop = asyncio.get_running_loop()
+    order = await loop.run_in_executor(
+        None,
+        lambda: gateway.order.create(
+            {
+                "amount": 10000,
+                "currency": "INR",
+                "receipt": f"rcpt_{booking_id.hex[:10]}",
+                "notes": {"booking_id": str(booking_id)},
+            }
+        ),
+    )
+    return order["id"]
+
+
+async def seed(Session, spots: int):
+    """Creates a throwaway driver + lot with `spots` spots open all day."""
+    async with Session() as session:
+        driver = User(phone=f"+9{uuid.uuid4().int % 10**11:011d}", name="Bench")
+        lot = ParkingLot(
+            owner_user_id=driver.id,
+            name="Bench Lot",
+            address="Benchmark",
+            location=WKTElement("POINT(72.8777 19.0760)", srid=4326),
+        )
+        session.add(driver)
+        session.add(lot)
+        for i in range(spots):
+            spot = ParkingSpot(lot_id=lot.id, name=f"B-{i}", spot_type="CAR")
+            session.add(spot)
+            session.add(
+                SpotAvailability(
+                    spot_id=spot.id,
+                    start_time=START.replace(hour=0),
+                    end_time=START.replace(hour=23),
+                    status="AVAILABLE",
+                )
+            )
+        await session.commit()
+        return driver.id, lot.id
+
+
+async def cleanup(Session, driver_id, lot_id):
+    async with Session() as session:
+        spot_ids = select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id)
+        booking_ids = select(Booking.id).where(Booking.lot_id == lot_id)
+        await session.execute(delete(Payment).where(Payment.booking_id.in_(booking_ids)))
+        await session.execute(delete(Booking).where(Booking.lot_id == lot_id))
+        await session.execute(
+            delete(SpotAvailability).where(SpotAvailability.spot_id.in_(spot_ids))
+        )
+        await session.execute(delete(ParkingSpot).where(ParkingSpot.lot_id == lot_id))
+        await session.execute(delete(ParkingLot).where(ParkingLot.id == lot_id))
+        await session.execute(delete(User).where(User.id == driver_id))
+        await session.commit()
+
+
+async def legacy_path(Session, driver_id, lot_id) -> bool:
+    async with Session() as session:
+        statement = (
+            select(ParkingSpot)
+            .join(SpotAvailability)
+            .where(ParkingSpot.lot_id == lot_id)
+            .where(ParkingSpot.spot_type == "CAR")
+            .where(
+                SpotAvailability.start_time <= START,
+                SpotAvailability.end_time >= END,
+                SpotAvailability.status == "AVAILABLE",
+            )
+        )
+        spot = (await session.execute(statement)).scalars().first()
+        if not spot:
+            return False
+
+        booking = Booking(
+            driver_user_id=driver_id,
+            lot_id=lot_id,
+            spot_id=spot.id,
+            start_time=START,
+            end_time=END,
+        )
+        session.add(booking)
+        await session.commit()
+        await session.refresh(booking)
+
+        session.add(
+            Payment(
+                booking_id=booking.id,
+                razorpay_order_id="order_bench",
+                amount_charged=100.0,
+                commission_fee=20.0,
+                seller_payout_amount=80.0,
+            )
+        )
+        await session.commit()
+        return True
+
+
+async def gateway_in_txn_path(Session, driver_id, lot_id) -> bool:
+    async with Session() as session:
+        window = await lock_available_window(session, lot_id, "CAR", START, END)
+        if not window:
+            return False
+
+        booking_id = uuid.uuid4()
+        order_id = await create_order(booking_id)
+        split_window(session, window, START, END, "HELD", booking_id)
+        session.add(
+            Booking(
+                id=booking_id,
+                driver_user_id=driver_id,
+                lot_id=lot_id,
+                spot_id=window.spot_id,
+                start_time=START,
+                end_time=END,
+            )
+        )
+        session.add(
+            Payment(
+                booking_id=booking_id,
+                razorpay_order_id=order_id,
+                amount_charged=100.0,
+                commission_fee=20.0,
+                seller_payout_amount=80.0,
+            )
+        )
+        await session.commit()
+        return True
+
+
+async def two_commit_path(Session, driver_id, lot_id) -> bool:
+    async with Session() as session:
+        window = await lock_available_window(session, lot_id, "CAR", START, END)
+        if not window:
+            return False
+
+        booking_id = uuid.uuid4()
+        split_window(session, window, START, END, "HELD", booking_id)
+        session.add(
+            Booking(
+                id=booking_id,
+                driver_user_id=driver_id,
+                lot_id=lot_id,
+                spot_id=window.spot_id,
+                start_time=START,
+                end_time=END,
+            )
+        )
+        payment = Payment(
+            booking_id=booking_id,
+            amount_charged=100.0,
+            commission_fee=20.0,
+            seller_payout_amount=80.0,
+            status="PENDING_ORDER",
+        )
+        session.add(payment)
+        await session.commit()
+
+        payment.razorpay_order_id = await create_order(booking_id)
+        payment.status = "PENDING"
+        session.add(payment)
+        await session.commit()
+        return True
+
+
+async def count_double_allocations(Session, lot_id) -> int:
+    """Bookings that share a spot with another booking for the same window."""
+    async with Session() as session:
+        stmt = (
+            select(Booking.spot_id, func.count())
+            .where(Booking.lot_id == lot_id)
+            .group_by(Booking.spot_id)
+            .having(func.count() > 1)
+        )
+        rows = (await session.execute(stmt)).all()
+        return sum(count - 1 for _, count in rows)
+
+
+async def run(name, path, Session, bookings, concurrency, spots):
+    driver_id, lot_id = await seed(Session, spots)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            t0 = time.perf_counter()
+            ok = await path(Session, driver_id, lot_id)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            return ok
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*[one() for _ in range(bookings)])
+    elapsed = time.perf_counter() - t0
+
+    doubles = await count_double_allocations(Session, lot_id)
+    await cleanup(Session, driver_id, lot_id)
+
+    latencies.sort()
+    print(
+        f"{name:<14} {bookings / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(latencies):7.1f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:7.1f} ms  "
+        f"booked {sum(results):5d}  double-allocated {doubles}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bookings", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--spots", type=int, default=100)
+    parser.add_argument(
+        "--razorpay-url",
+        default=settings.RAZORPAY_API_BASE_URL,
+        help="Point this at bench/fake_razorpay.py",
+    )
+    args = parser.parse_args()
+
+    global gateway
+    gateway = razorpay.Client(
+        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+        base_url=args.razorpay_url,
+    )
+    # The executor must not cap concurrency below the DB pool
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=args.concurrency)
+    )
+
+    engine = create_async_engine(
+        database_url, pool_size=args.concurrency, max_overflow=0
+    )
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    paths = [
+        ("legacy", legacy_path),
+        ("gateway-in-txn", gateway_in_txn_path),
+        ("two-commit", two_commit_path),
+    ]
+    for name, path in paths:
+        await run(name, path, Session, args.bookings, args.concurrency, args.spots)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
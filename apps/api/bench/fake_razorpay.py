@@ -0,0 +1,155 @@
+# apps/api/bench/fake_razorpay.py
+"""
+Local stand-in for the Razorpay API, for load tests.
+
+Serves POST /v1/orders (the only call on the booking path) and the
+RazorpayX POST /v1/payouts with a configurable latency and error rate,
+and builds signed payment.captured webhooks the way Razorpay would
+deliver them. Payouts can be rate limited (429 + Retry-After) to exercise
+the payout dispatcher's backoff.
+
+Usage:
+    python -m bench.fake_razorpay --port 9100 --latency-ms 150
+    python -m bench.fake_razorpay --port 9100 --payout-rps 50
+    RAZORPAY_API_BASE_URL=http://localhost:9100 uvicorn main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake Razorpay")
+app.state.latency_ms = 0.0
+app.state.error_rate = 0.0
+app.state.payout_rps = 0.0  # 0 = unlimited
+app.state.payout_window = (0, 0)  # (second, requests seen in it)
+app.state.payouts = {}  # idempotency key -> payout
+
+
+async def _gateway_delay():
+    if app.state.latency_ms:
+        # Jittered like a real gateway round trip
+        await asyncio.sleep(random.uniform(0.5, 1.5) * app.state.latency_ms / 1000)
+
+
+@app.post("/v1/orders")
+async def create_order(request: Request):
+    body = await request.json()
+    await _gateway_delay()
+
+    if random.random() < app.state.error_rate:
+        raise HTTPException(status_code=503, detail="Fake gateway outage")
+
+    return {
+        "id": f"order_{uuid.uuid4().hex[:14]}",
+        "entity": "order",
+        "amount": body["amount"],
+        "amount_paid": 0,
+        "amount_due": body["amount"],
+        "currency": body.get("currency", "INR"),
+        "receipt": body.get("receipt"),
+        "status": "created",
+        "notes": body.get("notes", {}),
+        "created_at": int(time.time()),
+    }
+
+
+@app.post("/v1/payouts")
+async def create_payout(request: Request):
+    body = await request.json()
+    key = request.headers.get("X-Payout-Idempotency")
+
+    if app.state.payout_rps:
+        second = int(time.time())
+        window, seen = app.state.payout_window
+        seen = seen + 1 if window == second else 1
+        app.state.payout_window = (second, seen)
+        if seen > app.state.payout_rps:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"description": "Too many requests"}},
+                headers={"Retry-After": "1"},
+            )
+
+    await _gateway_delay()
+
+    if random.random() < app.state.error_rate:
+        raise HTTPException(status_code=503, detail="Fake gateway outage")
+
+    if key in app.state.payouts:
+        return app.state.payouts[key]
+
+    payout = {
+        "id": f"pout_{uuid.uuid4().hex[:14]}",
+        "entity": "payout",
+        "fund_account_id": body["fund_account_id"],
+        "amount": body["amount"],
+        "currency": body.get("currency", "INR"),
+        "status": "processing",
+        "mode": body.get("mode"),
+        "reference_id": body.get("reference_id"),
+        "created_at": int(time.time()),
+    }
+    if key:
+        app.state.payouts[key] = payout
+    return payout
+
+
+def captured_webhook(order_id: str, amount_paise: int, secret: str) -> tuple[str, dict]:
+    """
+    Builds a payment.captured delivery for `order_id`.
+    Returns the raw body and the headers Razorpay sends with it
+    (signature = hex HMAC-SHA256 of the body with the webhook secret).
+    """
+    body = json.dumps(
+        {
+            "entity": "event",
+            "event": "payment.captured",
+            "payload": {
+                "payment": {
+                    "entity": {
+                        "id": f"pay_{uuid.uuid4().hex[:14]}",
+                        "entity": "payment",
+                        "order_id": order_id,
+                        "amount": amount_paise,
+                        "currency": "INR",
+                        "status": "captured",
+                    }
+                }
+            },
+            "created_at": int(time.time()),
+        }
+    )
+    signature = hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+    return body, {
+        "Content-Type": "application/json",
+        "X-Razorpay-Signature": signature,
+        "X-Razorpay-Event-Id": f"evt_bench_{uuid.uuid4().hex[:14]}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--payout-rps", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app.state.latency_ms = args.latency_ms
+    app.state.error_rate = args.error_rate
+    app.state.payout_rps = args.payout_rps
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
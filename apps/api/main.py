@@ -18,6 +18,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors / sync validators travel in headers
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
@@ -0,0 +1,49 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.allocation import choose_window
+
+
+def window(spot_id, start_hour, end_hour, status="AVAILABLE"):
+    return SimpleNamespace(
+        spot_id=spot_id,
+        start_time=datetime(2030, 1, 1, start_hour),
+        end_time=datetime(2030, 1, 1, end_hour),
+        status=status,
+    )
+
+
+START = datetime(2030, 1, 1, 10)
+END = datetime(2030, 1, 1, 11)
+
+
+def test_best_fit_picks_smallest_containing_window():
+    long_window = window("a", 6, 22)
+    short_window = window("b", 9, 12)
+    chosen = choose_window([long_window, short_window], START, END, "best_fit")
+    assert chosen is short_window
+
+
+def test_first_fit_picks_earliest_window():
+    early = window("a", 6, 22)
+    late = window("b", 9, 12)
+    assert choose_window([late, early], START, END, "first_fit") is early
+
+
+def test_pack_by_spot_prefers_busy_spot():
+    busy_free = window("a", 9, 20)
+    idle = window("b", 9, 12)
+    windows = [busy_free, window("a", 6, 9, status="BOOKED"), idle]
+    assert choose_window(windows, START, END, "pack_by_spot") is busy_free
+
+
+def test_no_containing_window():
+    windows = [window("a", 6, 10), window("a", 10, 12, status="BOOKED")]
+    assert choose_window(windows, START, END, "best_fit") is None
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        choose_window([], START, END, "random")
@@ -0,0 +1,290 @@
+"""
+Booking/payment races against a real Postgres.
+
+Runs only when TEST_DATABASE_URL points at a disposable database migrated
+to head (`alembic upgrade head`); the sweeper batches expire any stale
+PENDING rows they find there. Redis is not needed.
+"""
+import os
+import random
+import uuid
+from datetime import date, datetime, time, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from geoalchemy2 import WKTElement
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlmodel import select
+
+from app.models import (
+    Booking,
+    LotEarningsDaily,
+    OutboxEvent,
+    ParkingLot,
+    ParkingSpot,
+    Payment,
+    PricingRule,
+    SellerBalance,
+    SpotAvailability,
+    User,
+)
+from app.routes.bookings import cancel_booking
+from app.services.inventory import hold_extension_window
+from app.services.payments import confirm_captured_payment
+from app.services.payout_jobs import _reserve_payments
+from app.workers import booking_sweeper
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+
+pytestmark = [
+    pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set"),
+    pytest.mark.asyncio,
+]
+
+START = datetime.combine(date.today() + timedelta(days=1), time(10))
+END = START + timedelta(hours=2)
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch):
+    url = TEST_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    engine = create_async_engine(url, poolclass=NullPool)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    # The sweeper opens its own sessions; point them at the test database
+    monkeypatch.setattr(booking_sweeper, "async_session", factory)
+    yield factory
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def lot(sessions):
+    """A seller's one-spot lot (₹100/h) and a driver; removed afterwards."""
+    seller = User(phone=_phone(), name="Seller", role="SELLER")
+    driver = User(phone=_phone(), name="Driver")
+    parking_lot = ParkingLot(
+        owner_user_id=seller.id,
+        name="Test Lot",
+        address="1 Test Road",
+        location=WKTElement("POINT(77.59 12.97)", srid=4326),
+    )
+    spot = ParkingSpot(lot_id=parking_lot.id, name="A1", spot_type="CAR")
+    rule = PricingRule(lot_id=parking_lot.id, name="Hourly", rate=100.0)
+
+    async with sessions() as session:
+        session.add_all([seller, driver])
+        await session.flush()
+        session.add(parking_lot)
+        await session.flush()
+        session.add_all([spot, rule])
+        await session.commit()
+
+    yield {"seller": seller, "driver": driver, "lot": parking_lot, "spot": spot}
+
+    async with sessions() as session:
+        booking_ids = select(Booking.id).where(Booking.lot_id == parking_lot.id)
+        for stmt in (
+            delete(Payment).where(Payment.booking_id.in_(booking_ids)),
+            delete(SpotAvailability).where(SpotAvailability.spot_id == spot.id),
+            delete(Booking).where(Booking.lot_id == parking_lot.id),
+            delete(LotEarningsDaily).where(LotEarningsDaily.lot_id == parking_lot.id),
+            delete(SellerBalance).where(SellerBalance.seller_id == seller.id),
+            delete(PricingRule).where(PricingRule.id == rule.id),
+            delete(ParkingSpot).where(ParkingSpot.id == spot.id),
+            delete(ParkingLot).where(ParkingLot.id == parking_lot.id),
+            delete(User).where(User.id.in_([seller.id, driver.id])),
+        ):
+            await session.execute(stmt)
+        await session.commit()
+
+
+def _phone() -> str:
+    return f"+9199{random.randrange(10**8):08d}"
+
+
+async def _book(sessions, lot, status: str, window_status: str, payment_status: str):
+    """A booking for [START, END] on the lot's spot, its window and payment."""
+    booking = Booking(
+        driver_user_id=lot["driver"].id,
+        lot_id=lot["lot"].id,
+        spot_id=lot["spot"].id,
+        start_time=START,
+        end_time=END,
+        status=status,
+        created_at=datetime.utcnow() - timedelta(hours=1),
+    )
+    payment = Payment(
+        booking_id=booking.id,
+        razorpay_order_id=f"order_{uuid.uuid4().hex[:14]}",
+        amount_charged=200.0,
+        commission_fee=40.0,
+        seller_payout_amount=160.0,
+        status=payment_status,
+    )
+    day = START.replace(hour=0)
+    windows = [
+        SpotAvailability(spot_id=lot["spot"].id, start_time=day, end_time=START),
+        SpotAvailability(
+            spot_id=lot["spot"].id,
+            start_time=START,
+            end_time=END,
+            status=window_status,
+            booking_id=booking.id,
+        ),
+        SpotAvailability(
+            spot_id=lot["spot"].id, start_time=END, end_time=day + timedelta(days=1)
+        ),
+    ]
+    async with sessions() as session:
+        session.add(booking)
+        await session.flush()
+        session.add_all([payment, *windows])
+        await session.commit()
+    return booking, payment
+
+
+def _captured(payment: Payment) -> dict:
+    return {
+        "id": f"pay_{uuid.uuid4().hex[:14]}",
+        "order_id": payment.razorpay_order_id,
+        "amount": int(payment.amount_charged * 100),
+    }
+
+
+async def _windows(session, booking_id):
+    stmt = (
+        select(SpotAvailability.status, SpotAvailability.end_time)
+        .where(SpotAvailability.booking_id == booking_id)
+        .order_by(SpotAvailability.start_time)
+    )
+    return (await session.execute(stmt)).all()
+
+
+async def test_sweeper_skips_booking_being_confirmed(sessions, lot):
+    booking, payment = await _book(sessions, lot, "PENDING", "HELD", "PENDING")
+
+    async with sessions() as webhook:
+        await confirm_captured_payment(webhook, _captured(payment))
+        # The webhook holds the booking lock: the sweep must leave it alone
+        await booking_sweeper.expire_batch(datetime.utcnow())
+        await webhook.commit()
+
+    await booking_sweeper.expire_batch(datetime.utcnow())
+
+    async with sessions() as session:
+        assert (await session.get(Booking, booking.id)).status == "CONFIRMED"
+        assert (await session.get(Payment, payment.id)).status == "PAID_BY_DRIVER"
+        assert [w.status for w in await _windows(session, booking.id)] == ["BOOKED"]
+        balance = await session.get(SellerBalance, lot["seller"].id)
+        assert (balance.amount_due, balance.payment_count) == (160.0, 1)
+
+
+async def test_capture_after_expiry_is_refunded(sessions, lot):
+    booking, payment = await _book(sessions, lot, "PENDING", "HELD", "PENDING")
+
+    await booking_sweeper.expire_batch(datetime.utcnow())
+    async with sessions() as webhook:
+        await confirm_captured_payment(webhook, _captured(payment))
+        await webhook.commit()
+
+    async with sessions() as session:
+        assert (await session.get(Booking, booking.id)).status == "EXPIRED"
+        assert (await session.get(Payment, payment.id)).status == "REFUND_PENDING"
+        assert await _windows(session, booking.id) == []
+        refunds = (
+            await session.execute(
+                select(OutboxEvent).where(
+                    OutboxEvent.event_type == "refund_requested",
+                    OutboxEvent.payload["razorpay_order_id"].as_string()
+                    == payment.razorpay_order_id,
+                )
+            )
+        ).scalars().all()
+        assert len(refunds) == 1
+        assert await session.get(SellerBalance, lot["seller"].id) is None
+
+
+async def test_cancel_after_payout_reservation_is_rejected(sessions, lot):
+    booking, payment = await _book(sessions, lot, "CONFIRMED", "BOOKED", "PAID_BY_DRIVER")
+
+    async with sessions() as runner:
+        assert set(await _reserve_payments(runner, [payment.id])) == {payment.id}
+        await runner.commit()
+
+    async with sessions() as session:
+        with pytest.raises(HTTPException) as exc:
+            await cancel_booking(booking.id, current_user=lot["driver"], session=session)
+        assert exc.value.status_code == 409
+        await session.rollback()
+
+    async with sessions() as session:
+        assert (await session.get(Booking, booking.id)).status == "CONFIRMED"
+        assert (await session.get(Payment, payment.id)).status == "PAYOUT_IN_PROGRESS"
+        assert [w.status for w in await _windows(session, booking.id)] == ["BOOKED"]
+
+
+async def _extend(sessions, booking: Booking, minutes: int) -> Payment:
+    """The paid branch of extend_booking, minus the gateway call."""
+    new_end = booking.end_time + timedelta(minutes=minutes)
+    delta = 100.0 * minutes / 60
+    async with sessions() as session:
+        held = await hold_extension_window(
+            session, booking.spot_id, booking.id, booking.end_time, new_end
+        )
+        assert held is not None
+        payment = Payment(
+            booking_id=booking.id,
+            razorpay_order_id=f"order_{uuid.uuid4().hex[:14]}",
+            amount_charged=delta,
+            commission_fee=delta * 0.20,
+            seller_payout_amount=delta * 0.80,
+            status="PENDING",
+        )
+        session.add(payment)
+        await session.commit()
+    return payment
+
+
+async def test_paid_extension_moves_end_on_capture(sessions, lot):
+    booking, _ = await _book(sessions, lot, "CONFIRMED", "BOOKED", "PAID_BY_DRIVER")
+    async with sessions() as session:
+        booking = await session.get(Booking, booking.id)
+        booking.qr_code_data = "qr_before_extension"
+        session.add(booking)
+        await session.commit()
+
+    extension = await _extend(sessions, booking, 60)
+
+    async with sessions() as webhook:
+        await confirm_captured_payment(webhook, _captured(extension))
+        await webhook.commit()
+
+    async with sessions() as session:
+        extended = await session.get(Booking, booking.id)
+        assert extended.status == "CONFIRMED"
+        assert extended.end_time == END + timedelta(hours=1)
+        assert extended.qr_code_data not in (None, "qr_before_extension")
+        assert (await session.get(Payment, extension.id)).status == "PAID_BY_DRIVER"
+        windows = await _windows(session, booking.id)
+        assert [w.status for w in windows] == ["BOOKED", "BOOKED"]
+        assert windows[-1].end_time == END + timedelta(hours=1)
+
+
+async def test_unpaid_extension_is_released(sessions, lot):
+    booking, _ = await _book(sessions, lot, "CONFIRMED", "BOOKED", "PAID_BY_DRIVER")
+    extension = await _extend(sessions, booking, 60)
+    async with sessions() as session:
+        payment = await session.get(Payment, extension.id)
+        payment.created_at = datetime.utcnow() - timedelta(hours=1)
+        session.add(payment)
+        await session.commit()
+
+    await booking_sweeper.expire_extensions_batch(datetime.utcnow())
+
+    async with sessions() as session:
+        assert (await session.get(Booking, booking.id)).end_time == END
+        assert (await session.get(Payment, extension.id)).status == "EXPIRED"
+        assert [w.status for w in await _windows(session, booking.id)] == ["BOOKED"]
@@ -0,0 +1,31 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.routes.redemption import _decode_booking_cursor, _paginate_bookings
+
+
+def _rows(n):
+    base = datetime(2026, 1, 1)
+    return [
+        {"id": uuid.UUID(int=n - i), "created_at": base - timedelta(minutes=i)}
+        for i in range(n)
+    ]
+
+
+def test_exactly_limit_rows_is_last_page():
+    page, cursor = _paginate_bookings(_rows(3), limit=3)
+    assert len(page) == 3
+    assert cursor is None
+
+
+def test_one_extra_row_yields_cursor_at_last_kept_row():
+    rows = _rows(4)
+    page, cursor = _paginate_bookings(rows, limit=3)
+    assert page == rows[:3]
+    assert _decode_booking_cursor(cursor) == (rows[2]["created_at"], rows[2]["id"])
+
+
+def test_short_page_has_no_cursor():
+    page, cursor = _paginate_bookings(_rows(1), limit=3)
+    assert len(page) == 1
+    assert cursor is None
@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+
+from app.services.payout_dispatch import (
+    _Backoff,
+    _send_transfer,
+    payout_error,
+    payout_outcome,
+)
+
+TRANSFER = {
+    "seller_id": "seller_1",
+    "amount": 250.0,
+    "fund_account_id": "fa_1",
+    "idempotency_key": "key_1",
+}
+
+
+def _send(payout: dict) -> dict:
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=payout))
+        async with httpx.AsyncClient(transport=transport, base_url="https://x") as client:
+            return await _send_transfer(client, _Backoff(), TRANSFER)
+
+    return asyncio.run(run())
+
+
+def test_only_processed_payouts_settle():
+    assert payout_outcome("processed") == "processed"
+    for status in ("queued", "pending", "processing", None):
+        assert payout_outcome(status) == "submitted"
+    for status in ("failed", "reversed", "rejected", "cancelled"):
+        assert payout_outcome(status) == "failed"
+
+
+def test_accepted_payout_is_submitted_not_processed():
+    outcome = _send({"id": "pout_1", "status": "processing"})
+    assert outcome["status"] == "submitted"
+    assert outcome["payout_id"] == "pout_1"
+    assert outcome["payout_status"] == "processing"
+    assert outcome["error"] is None
+
+
+def test_rejected_payout_in_2xx_is_failed():
+    payout = {
+        "id": "pout_2",
+        "status": "rejected",
+        "status_details": {"description": "Beneficiary bank offline"},
+    }
+    outcome = _send(payout)
+    assert outcome["status"] == "failed"
+    assert outcome["error"] == "Beneficiary bank offline"
+    assert payout_error({"status": "reversed"}) == "Payout reversed"
@@ -0,0 +1,42 @@
+from datetime import datetime
+import uuid
+
+from app.models import Booking
+from app.services.qr_tokens import issue_qr_token, lot_key, verify_qr_token
+from app.services.signing import read_payload, sign_payload
+
+BOOKING = Booking(
+    id=uuid.uuid4(),
+    driver_user_id=uuid.uuid4(),
+    lot_id=uuid.uuid4(),
+    spot_id=uuid.uuid4(),
+    start_time=datetime(2030, 1, 7, 9),
+    end_time=datetime(2030, 1, 7, 18),
+    vehicle_plate="MH12AB1234",
+)
+
+
+def test_round_trip():
+    claims = verify_qr_token(issue_qr_token(BOOKING, "Asha"))
+    assert claims == {
+        "booking_id": BOOKING.id,
+        "lot_id": BOOKING.lot_id,
+        "start_time": BOOKING.start_time,
+        "end_time": BOOKING.end_time,
+        "vehicle_plate": "MH12AB1234",
+        "driver_name": "Asha",
+    }
+
+
+def test_tampered_window_is_rejected():
+    token = issue_qr_token(BOOKING, "Asha")
+    claims = read_payload(token)
+    claims["en"] = datetime(2030, 1, 9, 18).isoformat()
+    forged = sign_payload(claims, b"not-the-lot-key").split(".")[0]
+    assert verify_qr_token(f"{forged}.{token.split('.')[1]}") is None
+
+
+def test_other_lots_key_cannot_sign():
+    claims = read_payload(issue_qr_token(BOOKING, "Asha"))
+    assert verify_qr_token(sign_payload(claims, lot_key(uuid.uuid4()))) is None
+    assert verify_qr_token("pk_0123456789ab") is None
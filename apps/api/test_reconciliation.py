@@ -0,0 +1,38 @@
+import gzip
+
+from app.services.reconciliation import iter_report_batches, parse_report_row
+
+
+def test_parses_settlement_payment_line():
+    row = {"Entity_ID": " pay_1 ", "Type": "payment", "Amount": "250.00", "Order_ID": "order_1"}
+    assert parse_report_row(row) == {
+        "razorpay_payment_id": "pay_1",
+        "razorpay_order_id": "order_1",
+        "amount": 250.0,
+    }
+
+
+def test_skips_non_payment_and_unusable_lines():
+    assert parse_report_row({"type": "refund", "entity_id": "rfnd_1", "amount": "5"}) is None
+    assert parse_report_row({"type": "payment", "amount": "5"}) is None
+    assert parse_report_row({"entity_id": "pay_1", "amount": "n/a"}) is None
+
+
+def test_paise_amounts():
+    row = {"payment_id": "pay_1", "amount": "25000"}
+    assert parse_report_row(row, amount_unit="paise")["amount"] == 250.0
+
+
+def test_batches_stream_with_line_numbers(tmp_path):
+    path = tmp_path / "report.csv.gz"
+    with gzip.open(path, "wt", newline="") as f:
+        f.write("entity_id,type,amount,order_id\n")
+        for i in range(5):
+            f.write(f"pay_{i},payment,10.00,order_{i}\n")
+        f.write("rfnd_1,refund,10.00,\n")
+
+    batches = list(iter_report_batches(str(path), batch_size=2))
+    assert [len(rows) for rows, _ in batches] == [2, 2, 1]
+    assert sum(skipped for _, skipped in batches) == 1
+    assert batches[0][0][0]["line_number"] == 2
+    assert batches[-1][0][-1]["razorpay_order_id"] == "order_4"
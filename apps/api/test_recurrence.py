@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.recurrence import assign_spots, expand_occurrences
+
+# Monday 9-18h
+START = datetime(2030, 1, 7, 9)
+END = datetime(2030, 1, 7, 18)
+
+
+def test_weekdays_for_two_weeks():
+    occurrences = expand_occurrences(
+        START, END, "WEEKLY", by_weekday=["MO", "TU", "WE", "TH", "FR"], count=10
+    )
+    assert len(occurrences) == 10
+    assert occurrences[0] == (START, END)
+    assert occurrences[-1][0] == datetime(2030, 1, 18, 9)
+    assert all(s.weekday() < 5 for s, _ in occurrences)
+
+
+def test_daily_until_is_inclusive():
+    occurrences = expand_occurrences(
+        START, END, "DAILY", interval=2, until=datetime(2030, 1, 11, 9)
+    )
+    assert [s.day for s, _ in occurrences] == [7, 9, 11]
+
+
+def test_weekly_skips_days_before_start():
+    # Starts on a Wednesday; the Monday of that week must not be booked
+    wed = datetime(2030, 1, 9, 9)
+    occurrences = expand_occurrences(
+        wed, wed.replace(hour=18), "WEEKLY", by_weekday=["MO", "WE"], count=3
+    )
+    assert [s.day for s, _ in occurrences] == [9, 14, 16]
+
+
+def test_capped_at_max_occurrences():
+    assert len(expand_occurrences(START, END, "DAILY", count=500)) == 62
+
+
+def test_requires_an_end():
+    with pytest.raises(ValueError):
+        expand_occurrences(START, END, "DAILY")
+
+
+def test_assign_spots_prefers_one_consistent_spot():
+    # Spot "a" is free for occurrences 0-2, spot "b" for 1-3
+    candidates = [(0, 10, "a"), (1, 11, "a"), (2, 12, "a")]
+    candidates += [(1, 21, "b"), (2, 22, "b"), (3, 23, "b")]
+    assignment = assign_spots(candidates, 5)
+    assert {idx: spot for idx, (_, spot) in assignment.items()} == {
+        0: "a",
+        1: "a",
+        2: "a",
+        3: "b",
+    }